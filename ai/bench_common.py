@@ -0,0 +1,102 @@
+"""
+Shared helpers for the AI service benchmarks (bench_*.py).
+
+Runs the FastAPI app in-process on a real uvicorn server so the numbers include
+the event loop behaviour, and replaces the Gemini model with a stub whose
+latency is configurable.
+"""
+import json
+import time
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import uvicorn
+
+SAMPLE_PROFILE = {
+    "experience_level": "Beginner",
+    "skills": ["python", "sql"],
+    "learning_goals": ["data analysis"],
+    "interests": ["coding"],
+    "time_commitment": "5 hours/week",
+    "learning_style": "Visual",
+    "difficulty_preference": "Beginner-friendly",
+}
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel: sleeps for `latency` seconds, then answers."""
+
+    def __init__(self, latency=0.5, text="### 🚀 Your Personalized Curriculum\n\nStub path."):
+        self.latency = latency
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if stream:
+            return self._stream()
+        time.sleep(self.latency)
+        return StubResponse(self.text)
+
+    def _stream(self, chunks=8):
+        # Spreads the total latency evenly across chunks, like a token stream
+        size = max(1, len(self.text) // chunks)
+        for start in range(0, len(self.text), size):
+            time.sleep(self.latency / chunks)
+            yield StubResponse(self.text[start:start + size])
+
+
+def start_server(app, port):
+    """Starts uvicorn in a background thread and returns the server once it accepts connections."""
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def stop_server(server):
+    server.should_exit = True
+
+
+def request(method, url, payload=None, timeout=120):
+    """Sends one request and returns (status, elapsed_seconds)."""
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
+        status = resp.status
+    return status, time.perf_counter() - start
+
+
+def run_load(method, url, payloads, concurrency):
+    """Fires `payloads` at `url` with `concurrency` parallel clients. Returns (wall_seconds, latencies)."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda p: request(method, url, p), payloads))
+    return time.perf_counter() - start, [elapsed for _, elapsed in results]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def probe_health(base_url, stop_event, samples):
+    """Polls /health until `stop_event` is set, appending each latency to `samples`."""
+    while not stop_event.is_set():
+        _, elapsed = request("GET", f"{base_url}/health")
+        samples.append(elapsed)
+        time.sleep(0.02)
@@ -0,0 +1,79 @@
+"""
+Event loop responsiveness benchmark for /run-code while C++ submissions compile.
+
+Fires `--compiles` concurrent /run-code requests, each with a distinct C++ source so
+every one misses the compile cache and runs g++, and reports /health latency measured
+while idle and while the compiles are in flight. With the compilers running as async
+subprocesses the two should be about the same; a blocking runner stalls /health for
+whole compile times.
+
+Usage:
+    python bench_cpp_compiles.py [--compiles 20] [--port 8767]
+"""
+import time
+import argparse
+import threading
+
+import main
+from bench_common import start_server, stop_server, run_load, percentile, probe_health
+
+CPP_SOURCE = """#include <iostream>
+#include <vector>
+int main() {
+    std::vector<int> values;
+    for (int i = 0; i < %d; ++i) values.push_back(i * i);
+    long long total = 0;
+    for (int v : values) total += v;
+    std::cout << "run %s " << total << std::endl;
+    return 0;
+}
+"""
+
+
+def measure_health(base_url, seconds):
+    samples = []
+    stop_event = threading.Event()
+    prober = threading.Thread(target=probe_health, args=(base_url, stop_event, samples), daemon=True)
+    prober.start()
+    time.sleep(seconds)
+    stop_event.set()
+    prober.join()
+    return samples
+
+
+def run(compiles, port):
+    server = start_server(main.app, port)
+    base_url = f"http://127.0.0.1:{port}"
+    # Unique per run so repeated runs do not hit the compile cache
+    nonce = str(time.time_ns())
+    payloads = [{"language": "cpp", "code": CPP_SOURCE % (1000 + i, f"{nonce}-{i}")} for i in range(compiles)]
+
+    try:
+        idle = measure_health(base_url, 2.0)
+
+        health_samples = []
+        stop_event = threading.Event()
+        prober = threading.Thread(target=probe_health, args=(base_url, stop_event, health_samples), daemon=True)
+        prober.start()
+        wall, latencies = run_load("POST", f"{base_url}/run-code", payloads, compiles)
+        stop_event.set()
+        prober.join()
+
+        print(f"{compiles} concurrent C++ compiles finished in {wall:.2f} s "
+              f"(request p50 {percentile(latencies, 50) * 1000:.0f} ms, p99 {percentile(latencies, 99) * 1000:.0f} ms)")
+        print(f"{'':>18} {'samples':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}")
+        for label, samples in (("idle", idle), ("under load", health_samples)):
+            print(
+                f"{'/health ' + label:>18} {len(samples):>8} {percentile(samples, 50) * 1000:>9.1f} "
+                f"{percentile(samples, 99) * 1000:>9.1f} {max(samples) * 1000:>9.1f}"
+            )
+    finally:
+        stop_server(server)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compiles", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+    run(args.compiles, args.port)
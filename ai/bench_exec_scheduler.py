@@ -0,0 +1,105 @@
+"""
+Execution scheduler benchmark: interactive /run-code latency while a class submits
+graded work to /evaluate-code.
+
+`--students` users each submit one evaluation and a single `--flood` user submits many
+at once; every evaluation sleeps for `--grading-seconds`, so it holds its slot without
+loading the CPU. Meanwhile `--runs` interactive runs, one every 0.25 s from different
+users, measure how long a Run click waits for a slot ("queue_ms" in the response) and
+end to end. Interactive queueing should stay near zero however much grading is queued.
+
+Usage:
+    python bench_exec_scheduler.py [--students 30] [--flood 20] [--runs 20] [--port 8768]
+"""
+import os
+import json
+import time
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+# One Python worker per slot, so runs wait in the scheduler rather than in the worker pool
+os.environ.setdefault("EXEC_SLOTS", "4")
+os.environ.setdefault("PYTHON_WORKERS", os.environ["EXEC_SLOTS"])
+
+import main
+from bench_common import start_server, stop_server, percentile
+
+
+def post(url, payload, user):
+    """Returns (status, response body, elapsed seconds); `user` is sent the way the gateway sends it."""
+    req = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), method="POST",
+        headers={"Content-Type": "application/json", "X-Execution-User": user},
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=180) as resp:
+            return resp.status, json.loads(resp.read()), time.perf_counter() - start
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read()), time.perf_counter() - start
+
+
+def summarize(label, results):
+    ok = [(body, elapsed) for status, body, elapsed in results if status == 200]
+    queue = [body["usage"]["queue_ms"] for body, _ in ok]
+    total = [elapsed * 1000 for _, elapsed in ok]
+    print(
+        f"{label:>12} {len(results):>6} {len(results) - len(ok):>9} {percentile(queue, 50):>10.1f} "
+        f"{percentile(queue, 95):>10.1f} {max(queue, default=0):>10.1f} {percentile(total, 50):>10.1f} {max(total, default=0):>10.1f}"
+    )
+
+
+def run(students, flood, runs, grading_seconds, port):
+    server = start_server(main.app, port)
+    base_url = f"http://127.0.0.1:{port}"
+    grading_code = f"import time\ntime.sleep({grading_seconds})\ndef answer(x):\n    return x * 2"
+    cases = [{"input": "answer(21)", "expected_output": "42"}]
+    submission = {"code": grading_code, "language": "python", "test_cases": cases}
+    users = [f"student-{i}" for i in range(students)] + ["flooder"] * flood
+
+    try:
+        # Warm the worker pool
+        post(f"{base_url}/run-code", {"code": "print(1)", "language": "python"}, "warmup")
+        pool = ThreadPoolExecutor(max_workers=len(users))
+        futures = [pool.submit(post, f"{base_url}/evaluate-code", submission, user) for user in users]
+        time.sleep(0.2)
+
+        interactive = []
+        threads = []
+        for i in range(runs):
+            payload = {"code": f"print({i} * {i})", "language": "python"}
+            thread = threading.Thread(
+                target=lambda p=payload, u=f"ide-{i}": interactive.append(post(f"{base_url}/run-code", p, u))
+            )
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.25)
+        for thread in threads:
+            thread.join()
+        grading = [future.result() for future in futures]
+        pool.shutdown()
+
+        flooder = [r for r, user in zip(grading, users) if user == "flooder"]
+        print(f"{students} students + {flood} submissions from one user, {grading_seconds:g} s each, "
+              f"{main.exec_scheduler.slots} slots")
+        print(f"{'':>12} {'count':>6} {'rejected':>9} {'queue p50':>10} {'queue p95':>10} {'queue max':>10} "
+              f"{'total p50':>10} {'total max':>10}")
+        summarize("interactive", interactive)
+        summarize("students", grading[:students])
+        summarize("flooder", flooder)
+    finally:
+        stop_server(server)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--flood", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--grading-seconds", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+    run(args.students, args.flood, args.runs, args.grading_seconds, args.port)
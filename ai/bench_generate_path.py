@@ -0,0 +1,59 @@
+"""
+Throughput benchmark for /generate-path against a stubbed Gemini model.
+
+Reports requests/second at 1, 10 and 50 concurrent clients, plus /health latency
+measured while the load is running (it should stay flat if generation is not
+blocking the event loop).
+
+Usage:
+    python bench_generate_path.py [--latency 0.5] [--requests-per-client 4] [--port 8765]
+"""
+import argparse
+import threading
+
+import main
+from model_router import ModelRouter
+from bench_common import StubModel, SAMPLE_PROFILE, start_server, stop_server, run_load, percentile, probe_health
+
+
+def run(latency, requests_per_client, port, levels):
+    stub = StubModel(latency=latency)
+    main.llm.router = ModelRouter({"stub": stub})
+    # Measures the service itself, not the configured Gemini quota
+    main.llm.limiter = None
+    server = start_server(main.app, port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    print(f"Stub model latency: {latency * 1000:.0f} ms, LLM concurrency limit: {main.llm.max_concurrency}")
+    print(f"{'clients':>8} {'requests':>9} {'wall (s)':>9} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'health p99 (ms)':>16}")
+    try:
+        for concurrency in levels:
+            # Distinct goals and cache bypass so every request reaches the (stub) model
+            payloads = [
+                {"user_profile": SAMPLE_PROFILE, "goal": f"Data Analyst {concurrency}-{i}", "cache": "bypass"}
+                for i in range(concurrency * requests_per_client)
+            ]
+            health_samples = []
+            stop_event = threading.Event()
+            prober = threading.Thread(target=probe_health, args=(base_url, stop_event, health_samples), daemon=True)
+            prober.start()
+            wall, latencies = run_load("POST", f"{base_url}/generate-path", payloads, concurrency)
+            stop_event.set()
+            prober.join()
+            print(
+                f"{concurrency:>8} {len(payloads):>9} {wall:>9.2f} {len(payloads) / wall:>8.1f} "
+                f"{percentile(latencies, 50) * 1000:>9.0f} {percentile(latencies, 99) * 1000:>9.0f} "
+                f"{percentile(health_samples, 99) * 1000:>16.1f}"
+            )
+    finally:
+        stop_server(server)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub model latency in seconds")
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+    run(args.latency, args.requests_per_client, args.port, args.levels)
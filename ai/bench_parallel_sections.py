@@ -0,0 +1,83 @@
+"""
+Latency benchmark for /generate-path: one full-document call vs parallel sections.
+
+The stub model's latency grows with the number of headings the prompt asks for,
+the way real generation time grows with output length. The single-call mode
+should take about the sum of all sections and the parallel mode about the
+slowest one. Also reports time to the first `section` event on the stream.
+
+Usage:
+    python bench_parallel_sections.py [--seconds-per-heading 0.2] [--runs 5] [--port 8766]
+"""
+import re
+import json
+import time
+import argparse
+import urllib.request
+
+import main
+from model_router import ModelRouter
+from bench_common import StubModel, StubResponse, SAMPLE_PROFILE, start_server, stop_server, request, percentile
+
+
+class OutputSizedStub(StubModel):
+    """Sleeps `latency` seconds per markdown heading in the requested output format."""
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        headings = len(re.findall(r"^\s*#{3,4} ", prompt, flags=re.MULTILINE))
+        time.sleep(self.latency * headings)
+        return StubResponse(self.text)
+
+
+def first_section_latency(base_url, payload):
+    req = urllib.request.Request(
+        f"{base_url}/generate-path/stream", data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=120) as response:
+        for line in response:
+            if line.startswith(b"event: section"):
+                return time.perf_counter() - start
+    return None
+
+
+def run(seconds_per_heading, runs, port):
+    stub = OutputSizedStub(latency=seconds_per_heading)
+    main.llm.router = ModelRouter({"stub": stub})
+    # Measures the service itself, not the configured Gemini quota
+    main.llm.limiter = None
+    server = start_server(main.app, port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    print(f"Stub model latency: {seconds_per_heading * 1000:.0f} ms per heading, {len(main.PATH_SECTIONS)} sections")
+    print(f"{'mode':>9} {'runs':>5} {'p50 (ms)':>9} {'max (ms)':>9} {'calls/path':>11}")
+    try:
+        for parallel in (False, True):
+            latencies = []
+            calls_before = stub.calls
+            for i in range(runs):
+                payload = {"user_profile": SAMPLE_PROFILE, "goal": f"Data Analyst {i}", "cache": "bypass", "parallel": parallel}
+                _, elapsed = request("POST", f"{base_url}/generate-path", payload)
+                latencies.append(elapsed)
+            print(
+                f"{'parallel' if parallel else 'single':>9} {runs:>5} {percentile(latencies, 50) * 1000:>9.0f} "
+                f"{max(latencies) * 1000:>9.0f} {(stub.calls - calls_before) / runs:>11.1f}"
+            )
+
+        payload = {"user_profile": SAMPLE_PROFILE, "goal": "Data Analyst stream", "cache": "bypass", "parallel": True}
+        first = first_section_latency(base_url, payload)
+        if first is not None:
+            print(f"Time to first streamed section: {first * 1000:.0f} ms")
+    finally:
+        stop_server(server)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds-per-heading", type=float, default=0.2)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    run(args.seconds_per_heading, args.runs, args.port)
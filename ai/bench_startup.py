@@ -0,0 +1,125 @@
+"""
+Cold start benchmark: how long `import main` takes and how long a fresh server
+takes to answer its first /health.
+
+The import is profiled with `python -X importtime` in a fresh interpreter; the
+report lists the total and the slowest modules main imports directly. Each
+server is a new `uvicorn main:app` process polled until /health returns 200, once
+as deployed (heavy dependencies load on first use) and once with AI_WARMUP=1.
+`--max-import-ms` and `--max-health-ms` turn the numbers into a CI check: the
+script exits non-zero when the median exceeds either budget.
+
+Usage:
+    python bench_startup.py [--runs 3] [--port 8769] [--max-import-ms 1500] [--max-health-ms 5000] [--json out.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+
+from bench_common import percentile
+
+AI_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def import_profile():
+    """Returns (total ms for `import main`, [(cumulative ms, module)] of main's direct imports)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=AI_DIR,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{result.stderr[-2000:]}")
+    total, children = None, []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        depth = (len(match.group(3)) - 1) // 2
+        if match.group(4) == "main" and depth == 0:
+            total = cumulative_ms
+        elif depth == 1:
+            children.append((cumulative_ms, match.group(4)))
+    if total is None:
+        raise RuntimeError("no importtime line for main")
+    return total, sorted(children, reverse=True)
+
+
+def time_to_health(port, warmup, timeout=120.0):
+    """Starts a server process and returns ms from spawn to the first 200 from /health."""
+    env = dict(os.environ, AI_WARMUP="1" if warmup else "0")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=AI_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with code {server.returncode} before answering /health")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"/health did not answer within {timeout:g}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def run(runs, port, max_import_ms, max_health_ms, json_path):
+    imports, slowest = [], []
+    for _ in range(runs):
+        total, children = import_profile()
+        imports.append(total)
+        slowest = children
+    cold = [time_to_health(port, warmup=False) for _ in range(runs)]
+    warm = [time_to_health(port, warmup=True) for _ in range(runs)]
+
+    report = {
+        "import_ms": round(percentile(imports, 50), 1),
+        "health_ms": round(percentile(cold, 50), 1),
+        "health_ms_warmup": round(percentile(warm, 50), 1),
+        "slowest_imports": [{"module": name, "ms": round(ms, 1)} for ms, name in slowest[:10]],
+    }
+    print(f"median of {runs} runs")
+    print(f"{'import main':>28} {report['import_ms']:>9.1f} ms")
+    print(f"{'first /health':>28} {report['health_ms']:>9.1f} ms")
+    print(f"{'first /health, AI_WARMUP=1':>28} {report['health_ms_warmup']:>9.1f} ms")
+    print("slowest direct imports of main:")
+    for entry in report["slowest_imports"]:
+        print(f"{entry['module']:>28} {entry['ms']:>9.1f} ms")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if max_import_ms is not None and report["import_ms"] > max_import_ms:
+        failures.append(f"import main took {report['import_ms']:.0f} ms (budget {max_import_ms:.0f} ms)")
+    if max_health_ms is not None and report["health_ms"] > max_health_ms:
+        failures.append(f"first /health took {report['health_ms']:.0f} ms (budget {max_health_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8769)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-health-ms", type=float, default=None)
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+    sys.exit(run(args.runs, args.port, args.max_import_ms, args.max_health_ms, args.json))
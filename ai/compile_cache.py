@@ -0,0 +1,121 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from collections import OrderedDict
+from typing import List, Optional
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class CompileCache:
+    """
+    Content-addressed on-disk store of compiler output (class files, executables).
+
+    Each entry is a directory named by the hash of (language, flags, source), so
+    unchanged code is run straight from the cached artifacts without compiling again.
+    Entries are published with an atomic rename and evicted least recently used once
+    the total size passes `max_bytes`. Recency survives restarts via the directory mtime.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        # key -> size in bytes, least recently used first
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key(language: str, source: str, flags: List[str]) -> str:
+        payload = json.dumps({"language": language, "flags": flags, "source": source}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _load(self):
+        found = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(".tmp-"):
+                # Left behind by a crash between copying and publishing
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.isdir(path):
+                found.append((os.path.getmtime(path), name, _dir_size(path)))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """Directory holding the cached artifacts for `key`, or None on a miss."""
+        path = self._path(key)
+        if key in self._entries and os.path.isdir(path):
+            self._entries.move_to_end(key)
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return path
+        self._entries.pop(key, None)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, files: List[str]) -> str:
+        """Copies freshly compiled `files` into the cache and returns the entry's directory."""
+        path = self._path(key)
+        tmp_path = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        for file in files:
+            # copy2 keeps the executable bit on compiled binaries
+            shutil.copy2(file, tmp_path)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another request compiled the same source first; its entry is identical
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if key in self._entries:
+                return path
+        size = _dir_size(path)
+        self._entries[key] = size
+        self.bytes += size
+        self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: Optional[str] = None):
+        while self.bytes > self.max_bytes and self._entries:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                # Never evict the entry the caller is about to run
+                break
+            del self._entries[key]
+            self.bytes -= size
+            self.evictions += 1
+            shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
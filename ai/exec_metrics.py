@@ -0,0 +1,79 @@
+from collections import deque
+from typing import Dict, List
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def combine_usage(usages: List[dict]) -> dict:
+    """
+    Totals for several executions of one request: CPU time, run time and output bytes
+    add up. Peak RSS is the largest of the peaks, and so is compile time, since the
+    runs share one (coalesced) build.
+    """
+    total = {}
+    for usage in usages:
+        for key, value in usage.items():
+            if key in ("peak_rss_kb", "compile_ms"):
+                total[key] = max(total.get(key, 0), value)
+            elif key != "wall_ms":
+                total[key] = round(total.get(key, 0) + value, 1)
+    return total
+
+
+class _UsageSeries:
+    def __init__(self, window: int):
+        self.count = 0
+        self.failures = 0
+        self.wall_ms = deque(maxlen=window)
+        self.totals = {}
+        self.peak_rss_kb = 0
+
+    def add(self, usage: dict, success: bool):
+        self.count += 1
+        if not success:
+            self.failures += 1
+        self.wall_ms.append(usage.get("wall_ms", 0.0))
+        for key in ("cpu_user_ms", "cpu_sys_ms", "compile_ms", "run_ms", "queue_ms", "stdout_bytes"):
+            if key in usage:
+                self.totals[key] = self.totals.get(key, 0) + usage[key]
+        self.peak_rss_kb = max(self.peak_rss_kb, usage.get("peak_rss_kb", 0))
+
+    def stats(self) -> dict:
+        stats = {
+            "count": self.count,
+            "failures": self.failures,
+            "wall_ms_p50": round(_percentile(self.wall_ms, 50), 1) if self.wall_ms else 0.0,
+            "wall_ms_p95": round(_percentile(self.wall_ms, 95), 1) if self.wall_ms else 0.0,
+            "wall_ms_max": round(max(self.wall_ms), 1) if self.wall_ms else 0.0,
+            "peak_rss_kb_max": self.peak_rss_kb,
+        }
+        for key, total in self.totals.items():
+            stats[f"{key}_avg"] = round(total / self.count, 1)
+        return stats
+
+
+class ExecutionMetrics:
+    """
+    Aggregates the per-execution usage reported by /run-code and /evaluate-code, by
+    endpoint and language. Percentiles cover the last `window` executions; counts and
+    averages cover the process lifetime.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._series: Dict[str, Dict[str, _UsageSeries]] = {}
+
+    def record(self, kind: str, language: str, usage: dict, success: bool):
+        languages = self._series.setdefault(kind, {})
+        if language not in languages:
+            languages[language] = _UsageSeries(self.window)
+        languages[language].add(usage, success)
+
+    def stats(self) -> dict:
+        return {
+            kind: {language: series.stats() for language, series in sorted(languages.items())}
+            for kind, languages in self._series.items()
+        }
@@ -0,0 +1,218 @@
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+INTERACTIVE = "interactive"
+GRADING = "grading"
+# Suggested Retry-After for a rejected execution; most runs take well under this
+RETRY_AFTER = 5.0
+
+
+class SchedulerBusy(Exception):
+    """Raised when an execution cannot be queued (or waited too long); maps to HTTP 429."""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(f"Execution queue {reason}; retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("user", "priority", "start_tag", "enqueued_at", "future")
+
+    def __init__(self, user: str, priority: str, start_tag: float):
+        self.user = user
+        self.priority = priority
+        self.start_tag = start_tag
+        self.enqueued_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class _WaitSeries:
+    def __init__(self, window: int):
+        self.granted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_ms = deque(maxlen=window)
+
+    def stats(self) -> dict:
+        ordered = sorted(self.wait_ms)
+
+        def pct(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))], 1) if ordered else 0.0
+
+        return {
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_ms_p50": pct(50),
+            "wait_ms_p95": pct(95),
+            "wait_ms_max": round(ordered[-1], 1) if ordered else 0.0,
+        }
+
+
+class ExecutionScheduler:
+    """
+    Admission control for /run-code and /evaluate-code: at most `slots` executions run
+    at once, and the rest wait in per-(class, user) queues.
+
+    Waiting executions are started in start-time fair queuing order. Each (class, user)
+    flow gets a share of the slots in proportion to its class weight, so interactive
+    runs overtake queued grading work and a user with many submissions queued cannot
+    starve one with a single submission. Grading never holds more than `class_slots`
+    slots, which keeps slots free for interactive runs however much grading is queued.
+    A user never has more than `user_concurrency` executions running; the rest of
+    their work waits even when slots are free.
+
+    A request is rejected with SchedulerBusy when the queue holds `max_queue`
+    executions, its user already has `max_user_queue` waiting, or it waits longer than
+    `queue_timeout`.
+    """
+
+    def __init__(self, slots: int, user_concurrency: int = 2, weights: Optional[Dict[str, float]] = None,
+                 class_slots: Optional[Dict[str, int]] = None, max_queue: int = 500, max_user_queue: int = 20,
+                 queue_timeout: float = 30.0, window: int = 500):
+        self.slots = slots
+        self.user_concurrency = user_concurrency
+        self.weights = weights or {INTERACTIVE: 4.0, GRADING: 1.0}
+        self.class_slots = class_slots or {}
+        self.max_queue = max_queue
+        self.max_user_queue = max_user_queue
+        self.queue_timeout = queue_timeout
+        self._flows: Dict[Tuple[str, str], Deque[_Waiter]] = {}
+        self._finish_tags: Dict[Tuple[str, str], float] = {}
+        self._virtual_time = 0.0
+        self.queued = 0
+        self.running = 0
+        self._queued_by_user: Dict[str, int] = {}
+        self._running_by_user: Dict[str, int] = {}
+        self._running_by_class: Dict[str, int] = {priority: 0 for priority in self.weights}
+        self._series = {priority: _WaitSeries(window) for priority in self.weights}
+
+    @asynccontextmanager
+    async def slot(self, user: str, priority: str, cost: float = 1.0):
+        """Holds an execution slot for the body of the `async with`; yields the queueing time in ms."""
+        waited_ms = await self.acquire(user, priority, cost)
+        try:
+            yield waited_ms
+        finally:
+            self.release(user, priority)
+
+    async def acquire(self, user: str, priority: str, cost: float = 1.0) -> float:
+        """
+        Waits for a slot and returns how long that took in ms. `cost` is the expected
+        work relative to a single run (an evaluation's test case count, say); a flow's
+        next start is pushed back by cost / weight.
+        """
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        series = self._series[priority]
+        if self.queued >= self.max_queue:
+            series.rejected += 1
+            raise SchedulerBusy(RETRY_AFTER, "is full")
+        if self._queued_by_user.get(user, 0) >= self.max_user_queue:
+            series.rejected += 1
+            raise SchedulerBusy(RETRY_AFTER, f"holds {self.max_user_queue} executions for this user")
+
+        flow = (priority, user)
+        start_tag = max(self._virtual_time, self._finish_tags.get(flow, 0.0))
+        self._finish_tags[flow] = start_tag + cost / self.weights[priority]
+        waiter = _Waiter(user, priority, start_tag)
+        self._flows.setdefault(flow, deque()).append(waiter)
+        self.queued += 1
+        self._queued_by_user[user] = self._queued_by_user.get(user, 0) + 1
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            series.timed_out += 1
+            raise SchedulerBusy(RETRY_AFTER, f"wait exceeded {self.queue_timeout:g}s")
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        waited_ms = (time.monotonic() - waiter.enqueued_at) * 1000
+        series.granted += 1
+        series.wait_ms.append(waited_ms)
+        return round(waited_ms, 1)
+
+    def release(self, user: str, priority: str):
+        self.running -= 1
+        self._running_by_class[priority] -= 1
+        self._running_by_user[user] -= 1
+        if not self._running_by_user[user]:
+            del self._running_by_user[user]
+        self._dispatch()
+
+    def _abandon(self, waiter: _Waiter):
+        if waiter.future.done() and not waiter.future.cancelled():
+            # Granted just as the waiter gave up: hand the slot straight back
+            self.release(waiter.user, waiter.priority)
+            return
+        waiter.future.cancel()
+        flow = self._flows.get((waiter.priority, waiter.user))
+        if flow is not None and waiter in flow:
+            flow.remove(waiter)
+            self._dequeued(waiter)
+            if not flow:
+                del self._flows[(waiter.priority, waiter.user)]
+
+    def _dequeued(self, waiter: _Waiter):
+        self.queued -= 1
+        self._queued_by_user[waiter.user] -= 1
+        if not self._queued_by_user[waiter.user]:
+            del self._queued_by_user[waiter.user]
+
+    def _eligible(self, flow: Tuple[str, str]) -> bool:
+        priority, user = flow
+        if self._running_by_user.get(user, 0) >= self.user_concurrency:
+            return False
+        return self._running_by_class[priority] < self.class_slots.get(priority, self.slots)
+
+    def _dispatch(self):
+        while self.running < self.slots:
+            # Only the head of each flow can start; flows are FIFO
+            candidates = [(queue[0].start_tag, flow) for flow, queue in self._flows.items() if self._eligible(flow)]
+            if not candidates:
+                break
+            _, flow = min(candidates)
+            waiter = self._flows[flow].popleft()
+            if not self._flows[flow]:
+                del self._flows[flow]
+            self._dequeued(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self.running += 1
+            self._running_by_class[waiter.priority] += 1
+            self._running_by_user[waiter.user] = self._running_by_user.get(waiter.user, 0) + 1
+            waiter.future.set_result(None)
+        if not self._flows and not self.running:
+            # Idle: work done before now should not push anyone's next start back
+            self._finish_tags.clear()
+            return
+        # Idle flows whose tags virtual time has passed would start at virtual time anyway
+        for flow in [flow for flow, tag in self._finish_tags.items() if tag <= self._virtual_time and flow not in self._flows]:
+            del self._finish_tags[flow]
+
+    def stats(self) -> dict:
+        depth: Dict[str, int] = {priority: 0 for priority in self.weights}
+        for (priority, _), queue in self._flows.items():
+            depth[priority] += len(queue)
+        return {
+            "slots": self.slots,
+            "running": self.running,
+            "queued": self.queued,
+            "users_running": len(self._running_by_user),
+            "users_queued": len(self._queued_by_user),
+            "classes": {
+                priority: {
+                    "running": self._running_by_class[priority],
+                    "queued": depth[priority],
+                    "weight": self.weights[priority],
+                    **series.stats(),
+                }
+                for priority, series in self._series.items()
+            },
+        }
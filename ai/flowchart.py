@@ -0,0 +1,234 @@
+"""
+Learning path flowcharts for /generate-flowchart.
+
+A flowchart is fully determined by (goal, steps, theme, format), so rendered images
+are cached under a hash of those fields plus RENDERER_VERSION; the hash doubles as
+the HTTP ETag. SVG, the default, is templated directly as markup in well under a
+millisecond. PNG goes through matplotlib in a process pool: rasterizing is CPU bound and
+pyplot state is global, so renders on the event loop would stall every other request
+and could not overlap. Workers draw on their own Figure objects and never touch pyplot.
+"""
+import io
+import math
+import time
+import asyncio
+import hashlib
+import json
+import textwrap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from response_cache import TTLCache
+from singleflight import SingleFlight
+
+# Part of every cache key and ETag; bump it whenever the drawing changes
+RENDERER_VERSION = "1"
+
+DEFAULT_STEPS = ["Identify Skills", "Resources", "AI Adoption", "Resume", "Dashboard"]
+
+THEMES = {
+    "dark": {
+        "background": "#0f172a",
+        "path": "white",
+        "text": "white",
+        "colors": ["#3b82f6", "#10b981", "#10b981", "#f59e0b", "#f97316"],
+    },
+    "light": {
+        "background": "#ffffff",
+        "path": "#94a3b8",
+        "text": "#0f172a",
+        "colors": ["#2563eb", "#059669", "#059669", "#d97706", "#ea580c"],
+    },
+}
+
+FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+
+
+def flowchart_key(goal: str, steps: List[str], theme: str, fmt: str) -> str:
+    canonical = json.dumps(
+        {"goal": goal, "steps": steps, "theme": theme, "format": fmt, "renderer": RENDERER_VERSION},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def step_positions(count: int) -> List[float]:
+    """x of each step along the path; five steps land at 0.15, 0.33, ... 0.87."""
+    if count == 1:
+        return [0.5]
+    return [0.15 + i * 0.72 / (count - 1) for i in range(count)]
+
+
+def path_y(x: float) -> float:
+    return 0.5 + 0.2 * math.sin(x * 10)
+
+
+# The SVG canvas matches the PNG figure: 12x8 inches at 100 user units per inch
+SVG_WIDTH, SVG_HEIGHT = 1200, 800
+PT = 100 / 72
+# The path is the same in every chart; the same 100 points as np.linspace(0.1, 0.9, 100)
+SVG_PATH_POINTS = " ".join(
+    f"{x * SVG_WIDTH:.1f},{(1 - path_y(x)) * SVG_HEIGHT:.1f}" for x in (0.1 + i * 0.8 / 99 for i in range(100))
+)
+
+
+def render_svg(goal: str, steps: List[str], theme: str) -> bytes:
+    """The same drawing as render_png, templated as SVG markup (x, y in [0, 1], y up)."""
+    palette = THEMES[theme]
+
+    def sx(x: float) -> float:
+        return x * SVG_WIDTH
+
+    def sy(y: float) -> float:
+        return (1 - y) * SVG_HEIGHT
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" '
+        f'font-family="DejaVu Sans, Arial, sans-serif" font-weight="bold">',
+        f'<rect width="100%" height="100%" fill="{palette["background"]}"/>',
+        f'<polyline points="{SVG_PATH_POINTS}" fill="none" stroke="{palette["path"]}" stroke-width="{4 * PT:.1f}" '
+        f'stroke-opacity="0.6" stroke-linejoin="round" stroke-linecap="round"/>',
+    ]
+
+    colors = palette["colors"]
+    line_height = 10 * PT * 1.2
+    for i, (step, px) in enumerate(zip(steps, step_positions(len(steps)))):
+        py = path_y(px)
+        # matplotlib's Circle has its radius in data units, so on the 3:2 axes it is an ellipse
+        parts.append(f'<ellipse cx="{sx(px):.1f}" cy="{sy(py):.1f}" rx="{0.05 * SVG_WIDTH:.1f}" '
+                     f'ry="{0.05 * SVG_HEIGHT:.1f}" fill="{colors[i % len(colors)]}" fill-opacity="0.9"/>')
+        lines = "".join(
+            f'<tspan x="{sx(px):.1f}" dy="{0 if n == 0 else line_height:.1f}">{escape(line)}</tspan>'
+            for n, line in enumerate(textwrap.fill(step, 18).splitlines())
+        )
+        parts.append(f'<text y="{sy(py - 0.12):.1f}" fill="{palette["text"]}" font-size="{10 * PT:.1f}" '
+                     f'text-anchor="middle" dominant-baseline="hanging">{lines}</text>')
+
+    parts.append(f'<text x="{sx(0.5):.1f}" y="{sy(0.95):.1f}" fill="{palette["text"]}" font-size="{16 * PT:.1f}" '
+                 f'text-anchor="middle">{escape(goal)}</text>')
+    parts.append("</svg>")
+    return "\n".join(parts).encode("utf-8")
+
+
+def render_png(goal: str, steps: List[str], theme: str) -> bytes:
+    """Draws the winding path with one circle per step. Runs in a pool worker."""
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Circle
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    palette = THEMES[theme]
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.set_facecolor(palette["background"])
+    fig.patch.set_facecolor(palette["background"])
+
+    # Draw a winding path
+    x = np.linspace(0.1, 0.9, 100)
+    y = 0.5 + 0.2 * np.sin(x * 10)
+    ax.plot(x, y, color=palette["path"], linewidth=4, alpha=0.6)
+
+    colors = palette["colors"]
+    for i, (step, px) in enumerate(zip(steps, step_positions(len(steps)))):
+        py = 0.5 + 0.2 * np.sin(px * 10)
+        circle = Circle((px, py), 0.05, color=colors[i % len(colors)], alpha=0.9)
+        ax.add_patch(circle)
+        ax.text(px, py - 0.12, textwrap.fill(step, 18), color=palette["text"], ha='center', va='top',
+                fontsize=10, weight='bold')
+
+    ax.text(0.5, 0.95, goal, color=palette["text"], ha='center', fontsize=16, weight='bold')
+    ax.axis('off')
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight', facecolor=palette["background"])
+    return buf.getvalue()
+
+
+def preload():
+    """Imports what render_png needs; run in each pool worker by FlowchartRenderer.warmup."""
+    import numpy  # noqa: F401
+    from matplotlib.backends import backend_agg  # noqa: F401
+
+
+def render(goal: str, steps: List[str], theme: str, fmt: str) -> bytes:
+    if fmt == "svg":
+        return render_svg(goal, steps, theme)
+    return render_png(goal, steps, theme)
+
+
+class FlowchartRenderer:
+    """
+    Cache of rendered flowcharts. SVGs are drawn inline; PNGs go to a pool of `workers`
+    render processes, started on the first PNG request, and concurrent requests for
+    the same PNG share one render.
+    """
+
+    def __init__(self, workers: int = 2, cache_size: int = 256, cache_ttl: float = 24 * 3600):
+        self.workers = workers
+        self.cache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self.flights = SingleFlight("flowchart")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.renders: Dict[str, int] = {fmt: 0 for fmt in FORMATS}
+        self.render_seconds: Dict[str, float] = {fmt: 0.0 for fmt in FORMATS}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the server process has threads (and an event loop) a fork would copy mid-flight.
+            # Spawned workers re-import the launching script, which is why main.py keeps uvicorn.run under __main__.
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def warmup(self):
+        """Starts the render processes and has each import matplotlib, so the first PNG is not a cold one."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._get_pool(), preload) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def render(self, goal: str, steps: List[str], theme: str, fmt: str) -> Tuple[str, bytes]:
+        """Returns (cache key, image bytes)."""
+        key = flowchart_key(goal, steps, theme, fmt)
+        image = self.cache.get(key)
+        if image is not None:
+            self.hits += 1
+            return key, image
+
+        if fmt == "svg":
+            start = time.perf_counter()
+            image = render_svg(goal, steps, theme)
+            self._rendered(key, fmt, image, start)
+            return key, image
+
+        async def render_once() -> bytes:
+            start = time.perf_counter()
+            image = await asyncio.get_running_loop().run_in_executor(self._get_pool(), render, goal, steps, theme, fmt)
+            self._rendered(key, fmt, image, start)
+            return image
+
+        return key, await self.flights.do(key, render_once)
+
+    def _rendered(self, key: str, fmt: str, image: bytes, start: float):
+        self.renders[fmt] += 1
+        self.render_seconds[fmt] += time.perf_counter() - start
+        self.cache.set(key, image)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "cached": len(self.cache),
+            "hits": self.hits,
+            "renders": dict(self.renders),
+            "render_ms_avg": {
+                fmt: round(self.render_seconds[fmt] * 1000 / count, 3) if count else 0.0
+                for fmt, count in self.renders.items()
+            },
+            "singleflight": self.flights.stats(),
+        }
@@ -0,0 +1,95 @@
+"""
+Multi-test-case harnesses for /evaluate-code.
+
+A harness loads the submission once and evaluates every test case input against it
+in the same process, instead of re-running the whole program per case. Python cases
+run through the worker pool (see sandbox_worker.run_job); this module builds the
+JavaScript harness and reads its results back.
+
+The harness reports on one stdout line, which has to survive the output cap
+(output_capture keeps the head and tail of a stream). The program's top-level output
+is sent once rather than with every case, and each case's output and error are cut
+down (head and tail) to a share of half the cap, so the line always fits in the tail.
+"""
+import json
+from typing import List
+
+from output_capture import OUTPUT_MAX_BYTES
+
+# Prefixes the harness's result line so it cannot be confused with the program's own output
+RESULT_MARKER = "__EVALUATE_HARNESS_RESULT__"
+
+# Kept on one line with no trailing newline, so error line numbers still match the submission.
+# console.log output is what the test cases compare, so it is captured instead of printed.
+JAVASCRIPT_PRELUDE = (
+    "const __harness = (() => { const util = require('util'); const emit = console.log.bind(console); let buffer = []; "
+    "console.log = console.info = console.debug = (...args) => { buffer.push(util.format(...args) + '\\n'); }; "
+    "return { emit, take() { const text = buffer.join(''); buffer = []; return text; } }; })(); "
+)
+
+# Appended after the submission: direct eval inside a top-level arrow function can see the
+# submission's top-level const/let/function bindings, and a bad input only fails its own case.
+# __bound keeps a string's JSON encoding within `budget` bytes (0: no limit).
+JAVASCRIPT_RUNNER = """
+;
+const __programOutput = __harness.take();
+const __evaluateCase = (source) => eval(source);
+const __bound = (text, budget) => {
+    let size = Buffer.byteLength(JSON.stringify(text));
+    let keep = text.length;
+    while (budget && size > budget && keep > 0) {
+        keep = Math.floor(keep * budget / size * 0.9);
+        const half = Math.floor(keep / 2);
+        const omitted = text.length - 2 * half;
+        const cut = text.slice(0, half) + `\\n... [${omitted} characters of output omitted] ...\\n` + text.slice(text.length - half);
+        size = Buffer.byteLength(JSON.stringify(cut));
+        if (size <= budget) return cut;
+    }
+    return !budget || size <= budget ? text : '';
+};
+const __cases = __CASES__.map((source) => {
+    try {
+        if (source) console.log(__evaluateCase(source));
+        return { output: __bound(__harness.take(), __BUDGET__), error: null };
+    } catch (e) {
+        __harness.take();
+        return { output: '', error: __bound(String((e && e.stack) || e), __BUDGET__) };
+    }
+});
+__harness.emit('\\n__MARKER__' + JSON.stringify({ program: __bound(__programOutput, __BUDGET__), cases: __cases }));
+"""
+
+# Room left in the result line for the JSON around the strings and the marker
+RESULT_OVERHEAD = 1024
+
+
+def case_budget(count: int, max_output: int) -> int:
+    """Bytes of JSON each case (and the shared program output) may use; 0 when output is not capped."""
+    if not max_output:
+        return 0
+    return max(256, (max_output // 2 - RESULT_OVERHEAD) // (count + 1))
+
+
+def build_javascript_harness(code: str, inputs: List[str], max_output: int = OUTPUT_MAX_BYTES) -> str:
+    runner = (JAVASCRIPT_RUNNER.replace("__CASES__", json.dumps(inputs)).replace("__MARKER__", RESULT_MARKER)
+              .replace("__BUDGET__", str(case_budget(len(inputs), max_output))))
+    return JAVASCRIPT_PRELUDE + code + "\n" + runner
+
+
+def parse_harness_output(stdout: str, stderr: str, returncode: int, count: int) -> List[dict]:
+    """
+    Per-case {"output", "error"} from a harness run, each output starting with the
+    program's top-level output. A run that died before reporting, or whose report
+    cannot be read, fails every case.
+    """
+    for line in reversed(stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            try:
+                report = json.loads(line[len(RESULT_MARKER):])
+            except json.JSONDecodeError as e:
+                error = f"Could not read the test harness results ({e}); the output may have been cut off"
+                return [{"output": "", "error": error} for _ in range(count)]
+            program = report["program"]
+            return [{"output": program + case["output"], "error": case["error"]} for case in report["cases"]]
+    error = stderr.strip() or f"Process exited with code {returncode}"
+    return [{"output": "", "error": error} for _ in range(count)]
@@ -0,0 +1,141 @@
+import time
+import uuid
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, run: Callable[[], Awaitable]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.run = run
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Replaced on every status change so subscribers can wait for the next one
+        self.changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def _set_status(self, status: str):
+        self.status = status
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def to_dict(self) -> dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == SUCCEEDED:
+            data["result"] = self.result
+        elif self.status == FAILED:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """
+    In-process job queue for long-running generations.
+
+    Submitting returns a job id straight away; a fixed pool of worker tasks runs the
+    jobs in arrival order. Finished jobs keep their result for `result_ttl` seconds
+    and are then dropped by a janitor task.
+    """
+
+    def __init__(self, workers: int = 8, max_queue: int = 1000, result_ttl: float = 3600):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.jobs: Dict[str, Job] = {}
+        self._queue = None
+        self._tasks = []
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.expired = 0
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._janitor()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, run: Callable[[], Awaitable]) -> Job:
+        job = Job(kind, run)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"{self._queue.qsize()} jobs already queued")
+        self.jobs[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.started_at = time.time()
+            job._set_status(RUNNING)
+            try:
+                job.result = await job.run()
+                job.finished_at = time.time()
+                self.succeeded += 1
+                job._set_status(SUCCEEDED)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job {job.id} ({job.kind}) failed: {e}")
+                job.error = str(e)
+                job.finished_at = time.time()
+                self.failed += 1
+                job._set_status(FAILED)
+            finally:
+                job.run = None
+                self._queue.task_done()
+
+    async def _janitor(self, interval: float = 60.0):
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.time() - self.result_ttl
+            expired = [job_id for job_id, job in self.jobs.items() if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+            self.expired += len(expired)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for job in self.jobs.values() if job.status == RUNNING),
+            "retained": len(self.jobs),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "expired": self.expired,
+        }
@@ -0,0 +1,60 @@
+"""
+Deferred imports for the service's heavy dependencies.
+
+google.generativeai alone takes about a second to import and numpy another tenth,
+which every worker would pay at startup whether or not it ever serves a request
+that needs them. A LazyModule stands in for the module and imports it on first
+attribute access; warmup code can call load() ahead of time instead. The proxy's
+own attributes are all underscored so they cannot shadow the module's (numpy.load).
+"""
+import time
+import importlib
+import threading
+from types import ModuleType
+from typing import Callable, Dict, Optional
+
+_modules: Dict[str, "LazyModule"] = {}
+
+
+class LazyModule:
+    """`name`, imported on first use; `setup(module)` runs once right after the import."""
+
+    def __init__(self, name: str, setup: Optional[Callable[[ModuleType], None]] = None):
+        self._name = name
+        self._setup = setup
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+        self._load_ms: Optional[float] = None
+        _modules[name] = self
+
+    def _resolve(self) -> ModuleType:
+        if self._module is None:
+            # Model calls run in executor threads; only one of them imports
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if self._setup is not None:
+                        self._setup(module)
+                    self._load_ms = round((time.perf_counter() - start) * 1000, 1)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._resolve(), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyModule {self._name} ({'loaded' if self._module is not None else 'not loaded'})>"
+
+
+def load(module: LazyModule) -> ModuleType:
+    """Imports `module` now (if it is not already) and returns the real module."""
+    return module._resolve()
+
+
+def stats() -> dict:
+    """Which lazy modules have been imported so far, and how long each import took."""
+    return {
+        name: {"loaded": module._module is not None, "load_ms": module._load_ms}
+        for name, module in _modules.items()
+    }
@@ -0,0 +1,358 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from model_router import ModelRouter, is_retryable_error
+from rate_limiter import RateLimiter, estimate_tokens
+
+# Maximum number of Gemini calls allowed in flight per worker process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+# Hard ceiling on a single (possibly hedged) generation
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+# Output size assumed when charging a call against the tokens-per-minute quota
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "2000"))
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class HedgePolicy:
+    """
+    Decides when a slow call gets a backup request, and tracks what that bought.
+
+    A hedge fires once the primary call has been running longer than the given
+    percentile of recent primary latencies, as long as hedges stay under
+    `max_ratio` of all hedge-eligible requests. Each primary call's own latency is
+    recorded even when the hedge wins, so the p99 with hedging can be compared with
+    the p99 the primaries alone would have produced.
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = 95.0, max_ratio: float = 0.05,
+                 min_samples: int = 20, window: int = 500):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.primary_latencies = deque(maxlen=window)
+        self.actual_latencies = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> Optional[float]:
+        if not self.enabled or len(self.primary_latencies) < self.min_samples:
+            return None
+        return _percentile(self.primary_latencies, self.percentile)
+
+    def allow(self) -> bool:
+        return self.hedges < self.max_ratio * self.requests
+
+    def stats(self) -> dict:
+        stats = {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "hedge_delay_ms": round(self.delay() * 1000, 1) if self.delay() is not None else None,
+        }
+        if self.actual_latencies and self.primary_latencies:
+            p99_actual = _percentile(self.actual_latencies, 99)
+            p99_primary = _percentile(self.primary_latencies, 99)
+            stats.update({
+                "p99_ms": round(p99_actual * 1000, 1),
+                "p99_unhedged_ms": round(p99_primary * 1000, 1),
+                "p99_improvement_ms": round((p99_primary - p99_actual) * 1000, 1),
+            })
+        return stats
+
+
+class NoHealthyModelError(RuntimeError):
+    pass
+
+
+class AsyncLLMClient:
+    """
+    Async wrapper around a pool of Gemini GenerativeModels.
+
+    The google-generativeai SDK call is blocking, so each request is offloaded to a
+    bounded thread pool. A semaphore caps how many calls are in flight at once; extra
+    callers wait on the event loop instead of tying up threads. The ModelRouter picks
+    which model serves each call and fails over on 429/5xx errors.
+    """
+
+    def __init__(self, router: ModelRouter, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 timeout: float = LLM_TIMEOUT_SECONDS, hedging: Optional[HedgePolicy] = None,
+                 limiter: Optional[RateLimiter] = None):
+        self.router = router
+        self.limiter = limiter
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.hedging = hedging or HedgePolicy()
+        # Headroom above the semaphore: timed-out calls and losing hedges keep a thread until the SDK returns
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency * 2, thread_name_prefix="llm")
+        # Created lazily so it binds to the server's running loop, not the import-time one
+        self._semaphore = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def admit(self, prompt: str):
+        """Waits for Gemini quota for `prompt`; raises QuotaExceeded when the admission queue is full."""
+        if self.limiter is not None:
+            await self.limiter.acquire(estimate_tokens(prompt, LLM_EXPECTED_OUTPUT_TOKENS))
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _failover_charge(self, loop: asyncio.AbstractEventLoop, prompt: str) -> Optional[Callable[[], None]]:
+        """
+        What a worker thread calls before each failover attempt: only the first attempt went
+        through admit(), so every retry is charged to the limiter (on the loop, which owns it).
+        """
+        if self.limiter is None:
+            return None
+        tokens = estimate_tokens(prompt, LLM_EXPECTED_OUTPUT_TOKENS)
+        return lambda: loop.call_soon_threadsafe(self.limiter.charge, tokens)
+
+    def _generate_sync(self, prompt: str, rotate: int = 0, cancelled: Optional[threading.Event] = None,
+                       charge: Optional[Callable[[], None]] = None, **kwargs) -> str:
+        candidates = self.router.candidates()
+        # A hedge starts one model further down the ranking so it does not queue behind the same model
+        if rotate and len(candidates) > 1:
+            rotate %= len(candidates)
+            candidates = candidates[rotate:] + candidates[:rotate]
+        last_error = None
+        try:
+            while candidates:
+                if cancelled is not None and cancelled.is_set():
+                    break
+                name, model = candidates.pop(0)
+                if last_error is not None and charge is not None:
+                    charge()
+                start = time.perf_counter()
+                try:
+                    # .text is read here too: it can raise (e.g. blocked responses) and must not run on the loop
+                    text = model.generate_content(prompt, **kwargs).text
+                except Exception as e:
+                    if not is_retryable_error(e):
+                        self.router.release_probe(name)
+                        raise
+                    self.router.record_failure(name, e)
+                    last_error = e
+                    continue
+                self.router.record_success(name, time.perf_counter() - start)
+                return text
+        finally:
+            for name, _ in candidates:
+                self.router.release_probe(name)
+        if cancelled is not None and cancelled.is_set():
+            raise asyncio.CancelledError()
+        raise last_error or NoHealthyModelError("Every Gemini model circuit is open")
+
+    def _stream_sync(self, prompt: str, emit, is_cancelled, charge: Optional[Callable[[], None]] = None, **kwargs):
+        candidates = self.router.candidates()
+        last_error = None
+        try:
+            while candidates:
+                name, model = candidates.pop(0)
+                if last_error is not None and charge is not None:
+                    charge()
+                sent = False
+                try:
+                    for chunk in model.generate_content(prompt, stream=True, **kwargs):
+                        if is_cancelled():
+                            break
+                        text = chunk.text
+                        if text:
+                            sent = True
+                            emit(text)
+                except Exception as e:
+                    if not is_retryable_error(e):
+                        self.router.release_probe(name)
+                        raise
+                    self.router.record_failure(name, e)
+                    # Once text has reached the client, switching models would splice two answers
+                    if sent:
+                        raise
+                    last_error = e
+                    continue
+                # Streamed calls only feed the error rate; their duration is not comparable to a unary call
+                self.router.record_success(name)
+                return
+        finally:
+            for name, _ in candidates:
+                self.router.release_probe(name)
+        raise last_error or NoHealthyModelError("Every Gemini model circuit is open")
+
+    async def generate(self, prompt: str, hedge: bool = False, admitted: bool = False, **kwargs) -> str:
+        """
+        Generates content for `prompt` without blocking the event loop and returns the text.
+
+        Raises asyncio.TimeoutError after `timeout` seconds. With `hedge=True` the
+        HedgePolicy may race a backup request against a slow primary. Raises
+        QuotaExceeded when the rate limiter's queue is full; pass `admitted=True` if
+        admit() was already awaited for this prompt.
+        """
+        if not admitted:
+            await self.admit(prompt)
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            text = await asyncio.wait_for(self._generate_hedged(prompt, hedge, kwargs), timeout=self.timeout)
+            self.completed += 1
+            return text
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    def _submit(self, prompt: str, kwargs: dict, rotate: int = 0):
+        cancelled = threading.Event()
+        loop = asyncio.get_running_loop()
+        charge = self._failover_charge(loop, prompt)
+        future = loop.run_in_executor(
+            self._executor,
+            functools.partial(self._generate_sync, prompt, rotate=rotate, cancelled=cancelled, charge=charge, **kwargs),
+        )
+        return future, cancelled
+
+    async def _generate_hedged(self, prompt: str, hedge: bool, kwargs: dict) -> str:
+        policy = self.hedging
+        start = time.perf_counter()
+        primary, primary_cancelled = self._submit(prompt, kwargs)
+        backup_cancelled = None
+        if hedge:
+            policy.requests += 1
+            # Recorded whenever the primary finishes, even after a hedge has already answered
+            primary.add_done_callback(
+                lambda f: policy.primary_latencies.append(time.perf_counter() - start)
+                if not f.cancelled() and f.exception() is None else None
+            )
+
+        try:
+            delay = policy.delay() if hedge else None
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                # A hedge is a second upstream call, so it needs quota of its own but never queues for it
+                if not done and policy.allow() and (
+                    self.limiter is None
+                    or self.limiter.try_acquire(estimate_tokens(prompt, LLM_EXPECTED_OUTPUT_TOKENS))
+                ):
+                    policy.hedges += 1
+                    backup, backup_cancelled = self._submit(prompt, kwargs, rotate=1)
+                    text, winner = await self._first_success(primary, backup)
+                    if winner is backup:
+                        policy.hedge_wins += 1
+                    policy.actual_latencies.append(time.perf_counter() - start)
+                    return text
+
+            text = await asyncio.shield(primary)
+            if hedge:
+                policy.actual_latencies.append(time.perf_counter() - start)
+            return text
+        finally:
+            # The SDK call cannot be interrupted; whether we got an answer, an error or were
+            # cancelled by the timeout (even during the hedge delay), calls still running stop
+            # before trying another model. A call that already finished ignores its event.
+            primary_cancelled.set()
+            if backup_cancelled is not None:
+                backup_cancelled.set()
+
+    @staticmethod
+    async def _first_success(*futures):
+        """Returns (result, future) for the first future to succeed; raises the first error if all fail."""
+        pending = set(futures)
+        first_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result(), future
+                first_error = first_error or future.exception()
+        raise first_error
+
+    async def stream(self, prompt: str, admitted: bool = False, **kwargs):
+        """
+        Async generator yielding text chunks as Gemini streams them.
+
+        The blocking SDK iterator is drained on the thread pool and chunks are handed
+        back to the event loop through a queue, so the first chunk can be forwarded
+        as soon as it arrives. Raises asyncio.TimeoutError if no chunk arrives for
+        `timeout` seconds. Pass `admitted=True` if admit() was already awaited
+        (e.g. before the HTTP response started, so a full queue can still become a 429).
+        """
+        if not admitted:
+            await self.admit(prompt)
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = False
+        done = object()
+
+        def emit(text):
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+        def pump():
+            try:
+                self._stream_sync(prompt, emit, lambda: cancelled, charge=self._failover_charge(loop, prompt), **kwargs)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        self.in_flight += 1
+        loop.run_in_executor(self._executor, pump)
+        try:
+            while True:
+                # A stalled upstream stream would otherwise hold the request (and a slot) forever
+                item = await asyncio.wait_for(queue.get(), timeout=self.timeout)
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            # Stops the producer thread early if the client went away mid-stream
+            cancelled = True
+            self.in_flight -= 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeout_s": self.timeout,
+            "hedging": self.hedging.stats(),
+            "rate_limit": self.limiter.stats() if self.limiter is not None else None,
+        }
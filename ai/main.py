@@ -1,20 +1,39 @@
 import os
-import io
+import time
+import asyncio
 import json
+import re
 import base64
 from datetime import datetime
-from typing import Optional, List, Dict
-from fastapi import FastAPI, HTTPException, Body
-from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional, List, Dict, Tuple
+from fastapi import FastAPI, HTTPException, Body, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-import google.generativeai as genai
-import matplotlib.pyplot as plt
-from matplotlib.patches import Circle
-import numpy as np
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import textwrap
+import tempfile
 import subprocess
+from llm_client import AsyncLLMClient, HedgePolicy
+from rate_limiter import RateLimiter, QuotaExceeded
+from model_router import ModelRouter
+from response_cache import TwoTierCache, make_cache_key, CACHE_DIR
+from semantic_cache import SemanticCache
+from singleflight import SingleFlight
+from jobs import JobManager, JobQueueFull
+from sandbox import PythonWorkerPool
+from harness import build_javascript_harness, parse_harness_output
+from compile_cache import CompileCache
+from runtime_daemons import RuntimeUnavailable, node_daemon, java_daemon
+from process_runner import ProcessResult, run_process
+from exec_metrics import ExecutionMetrics, combine_usage
+from sql_runner import SQLRunner, FIXTURES, hash_rows, parse_expected_rows
+from output_capture import OutputCallback, OUTPUT_MAX_BYTES
+from exec_scheduler import ExecutionScheduler, SchedulerBusy, INTERACTIVE, GRADING
+from runner_registry import RunnerRegistry
+from flowchart import FlowchartRenderer, flowchart_key, DEFAULT_STEPS, THEMES, FORMATS
+from path_outline import parse_path_outline, PARSER_VERSION
+from lazy_imports import LazyModule, load as load_module, stats as lazy_import_stats
 
 load_dotenv()
 
@@ -31,15 +50,97 @@ app.add_middleware(
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "llm": llm.stats(),
+        "warmup": {"enabled": AI_WARMUP, "ms": warmup_ms},
+    }
 
 # AI Models Configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     print("Error: GEMINI_API_KEY not found in environment variables. Please set it in your .env file.")
-else:
-    genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+
+def configure_gemini(module):
+    if GEMINI_API_KEY:
+        module.configure(api_key=GEMINI_API_KEY)
+
+# The SDK takes about a second to import, so it is loaded by the first Gemini call (or the warmup)
+genai = LazyModule("google.generativeai", setup=configure_gemini)
+# Ordered model pool; the router sends each call to the fastest healthy one and fails over on 429/5xx
+GEMINI_MODELS = [name.strip() for name in os.getenv(
+    "GEMINI_MODELS", "gemini-1.5-flash,gemini-2.0-flash-lite,gemini-1.5-flash-8b"
+).split(",") if name.strip()]
+model_router = ModelRouter.from_names(
+    GEMINI_MODELS,
+    lambda name: genai.GenerativeModel(name),
+    failure_threshold=int(os.getenv("MODEL_FAILURE_THRESHOLD", "3")),
+    cooldown=float(os.getenv("MODEL_COOLDOWN_SECONDS", "30")),
+)
+# All endpoints go through this client so Gemini calls never block the event loop
+llm = AsyncLLMClient(
+    model_router,
+    hedging=HedgePolicy(
+        enabled=os.getenv("LLM_HEDGE_ENABLED", "0") == "1",
+        percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+        max_ratio=float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.05")),
+    ),
+    # Shared by every endpoint: quota spikes queue up here instead of becoming fallbacks
+    limiter=RateLimiter(
+        rpm=float(os.getenv("GEMINI_RPM", "15")),
+        tpm=float(os.getenv("GEMINI_TPM", "1000000")),
+        max_queue=int(os.getenv("LLM_QUEUE_SIZE", "100")),
+        max_wait=float(os.getenv("LLM_QUEUE_MAX_WAIT", "30")),
+    ),
+)
+
+@app.exception_handler(QuotaExceeded)
+async def quota_exceeded_handler(request, exc: QuotaExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"success": False, "error": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+@app.exception_handler(SchedulerBusy)
+async def scheduler_busy_handler(request, exc: SchedulerBusy):
+    return JSONResponse(
+        status_code=429,
+        content={"success": False, "error": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+def list_generation_models() -> List[str]:
+    return [m.name.split("/", 1)[-1] for m in genai.list_models()
+            if "generateContent" in m.supported_generation_methods]
+
+async def check_model_availability():
+    try:
+        available = await asyncio.get_running_loop().run_in_executor(None, list_generation_models)
+    except Exception as e:
+        print(f"Model discovery failed, keeping the configured pool: {e}")
+        return
+    missing = [name for name in GEMINI_MODELS if name not in available]
+    if missing:
+        print(f"Models not available for this API key: {', '.join(missing)}")
+        model_router.mark_unavailable(missing)
+
+model_discovery: Optional[asyncio.Future] = None
+
+@app.on_event("startup")
+async def discover_models():
+    """
+    Replaces the manual check_all_models.py run: models this key cannot use start with an open circuit.
+    Runs in the background, since it imports the SDK and calls Gemini; neither needs to delay readiness.
+    """
+    global model_discovery
+    if GEMINI_API_KEY:
+        model_discovery = asyncio.ensure_future(check_model_availability())
+
+@app.get("/models")
+async def model_status():
+    return {"pool": GEMINI_MODELS, "models": model_router.stats()}
 
 class UserProfile(BaseModel):
     experience_level: str
@@ -57,6 +158,83 @@ class PathRequest(BaseModel):
     preferences: Optional[str] = ""
     resume_content: Optional[str] = ""
     use_previous_skills: bool = True
+    # "bypass" skips the cache entirely, "refresh" regenerates and overwrites the cached path
+    cache: Optional[str] = None
+    # Generate the path as concurrent per-section calls; defaults to PATH_PARALLEL_SECTIONS
+    parallel: Optional[bool] = None
+
+# Generated paths, keyed by the profile fields that actually shape the prompt
+path_cache = TwoTierCache(
+    "generate_path",
+    max_size=int(os.getenv("PATH_CACHE_SIZE", "256")),
+    memory_ttl=float(os.getenv("PATH_CACHE_TTL", "3600")),
+    disk_ttl=float(os.getenv("PATH_CACHE_DISK_TTL", str(7 * 24 * 3600))),
+)
+
+# Concurrent identical generations share one upstream Gemini call
+path_flights = SingleFlight("generate_path")
+task_flights = SingleFlight("generate_tasks")
+
+# Near-duplicate goals ("ML engineer" vs "machine learning engineer") reuse an existing path
+semantic_cache = (
+    SemanticCache(os.path.join(CACHE_DIR, "goal_index"), threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")))
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1" else None
+)
+
+def path_profile_fields(request: PathRequest) -> dict:
+    return {
+        "experience_level": request.user_profile.experience_level.strip().casefold(),
+        "skills": sorted({s.strip().casefold() for s in request.user_profile.skills if s.strip()}),
+        "use_previous_skills": request.use_previous_skills,
+    }
+
+def path_cache_key(request: PathRequest) -> str:
+    return make_cache_key("path", {"goal": " ".join(request.goal.split()).casefold(), **path_profile_fields(request)})
+
+def path_profile_key(request: PathRequest) -> str:
+    # Everything in the cache key except the goal; semantic matches must agree on all of it
+    return make_cache_key("path-profile", path_profile_fields(request))
+
+def lookup_cached_path(request: PathRequest, cache_key: str) -> Optional[dict]:
+    """Checks the exact-key cache, then the semantic index. Returns the response fields on a hit."""
+    if request.cache in ("bypass", "refresh"):
+        return None
+    cached_path = path_cache.get(cache_key)
+    if cached_path is not None:
+        return {"path": cached_path, "cached": True}
+    if semantic_cache is not None:
+        match = semantic_cache.lookup(request.goal, path_profile_key(request))
+        if match is not None:
+            similar_key, similar_goal, similarity = match
+            cached_path = path_cache.get(similar_key)
+            if cached_path is not None:
+                return {"path": cached_path, "cached": True, "similar_goal": similar_goal, "similarity": round(similarity, 4)}
+    return None
+
+def store_generated_path(request: PathRequest, cache_key: str, path: str):
+    if request.cache == "bypass":
+        return
+    path_cache.set(cache_key, path)
+    if semantic_cache is not None:
+        semantic_cache.add(request.goal, path_profile_key(request), cache_key)
+
+# Parsed outlines (phases, milestones) of generated paths, keyed by the markdown itself
+outline_cache = TwoTierCache(
+    "path_outline",
+    max_size=int(os.getenv("PATH_OUTLINE_CACHE_SIZE", "1024")),
+    memory_ttl=float(os.getenv("PATH_CACHE_TTL", "3600")),
+    disk_ttl=float(os.getenv("PATH_CACHE_DISK_TTL", str(7 * 24 * 3600))),
+)
+
+def path_outline(path: str) -> dict:
+    """The outline of a path's markdown, parsed once per distinct path (see path_outline.py)."""
+    cache_key = make_cache_key("outline", {"path": path, "parser": PARSER_VERSION})
+    cached = outline_cache.get(cache_key)
+    if cached is not None:
+        return json.loads(cached)
+    outline = parse_path_outline(path)
+    outline_cache.set(cache_key, json.dumps(outline))
+    return outline
 
 class TaskRequest(BaseModel):
     goal: str
@@ -64,141 +242,339 @@ class TaskRequest(BaseModel):
     experience_level: str
     focus_area: Optional[str] = "General"
 
-@app.post("/generate-path")
-async def generate_path(request: PathRequest):
-    try:
-        skill_strategy = ("Leveraging your existing expertise to fast-track your progress." 
-                         if request.use_previous_skills else "Starting from foundational principles for a solid base.")
-        
-        prompt = f"""
-        Act as a Principal Engineer and Career Architect. Generate a RIGOROUSLY ACCURATE and hyper-specific learning path for becoming a: {request.goal}
-
-        USER CONTEXT:
-        - Experience Level: {request.user_profile.experience_level}
-        - Current Skills: {', '.join(request.user_profile.skills)}
-        - Learning Strategy: {skill_strategy}
-
-        CRITICAL REQUIREMENTS:
-        1. You MUST provide SPECIFIC, REAL URLs - no generic Google/YouTube search links
-        2. Include actual course names, GitHub repositories, official documentation sites
-        3. For {request.goal}, research and provide the TOP industry-standard resources
-        4. Include at least 8-10 specific resources in the Global Master Resources table
-        5. Each learning phase should have 5-7 specific, clickable resources with real URLs
-        6. Add specialized learning tracks if relevant to {request.goal}
-        7. Include practice platforms, communities, and career resources specific to {request.goal}
-
-        EXAMPLES OF GOOD RESOURCES (adapt to {request.goal}):
-        - For ML: Coursera ML Specialization, Fast.ai, Kaggle, Papers with Code, scikit-learn docs
-        - For Web Dev: MDN Web Docs, FreeCodeCamp, The Odin Project, web.dev, specific framework docs
-        - For Data Science: Kaggle Learn, DataCamp, Mode Analytics SQL Tutorial, Pandas docs
-        - For Cloud: AWS/GCP/Azure official tutorials, Cloud Academy, A Cloud Guru
-        
-        OUTPUT FORMAT (Markdown) - FOLLOW THIS EXACT STRUCTURE:
+# Output sections of the learning path, in document order. build_path_prompt asks for all of them in
+# one call; the parallel mode asks for each one separately and stitches the answers back in this order.
+PATH_SECTIONS = [
+    ("overview", """
+    ### 🚀 Your Personalized Curriculum: {goal}
+    
+    [Write a motivational 2-3 sentence intro referencing their {level} level and how this path will accelerate their journey to {goal}]
 
-        ### 🚀 Your Personalized Curriculum: {request.goal}
-        
-        [Write a motivational 2-3 sentence intro referencing their {request.user_profile.experience_level} level and how this path will accelerate their journey to {request.goal}]
+    ### 📚 Essential {goal} Resources
+    
+    | 🎓 Resource / Course | 🔗 Direct Link | 💡 Why This Matters |
+    | :--- | :--- | :--- |
+    | **[Specific Course/Platform Name]** | [Real URL with https://] | [Specific benefit for {goal}] |
+    | **[Another Specific Resource]** | [Real URL] | [Why it's essential] |
+    | **[GitHub Repo or Tool]** | [Real URL] | [What you'll learn] |
+    [Continue with 8-10 total resources - ALL with real, working URLs]
+"""),
+    ("phase_1", """
+    ### 🗂️ Detailed Learning Modules
+    
+    #### 1. Phase 1: Foundations & Core Concepts (Weeks 1-8)
+    *   **Focus:** [Specific foundational topics for {goal}]
+    *   **📖 Key Resources:**
+        *   [Specific Resource Name](https://real-url.com) - Detailed explanation of why needed
+        *   [Another Resource](https://real-url.com) - What you'll learn from this
+        *   [Third Resource](https://real-url.com) - How it builds your foundation
+        *   [Fourth Resource](https://real-url.com) - Practical application
+        *   [Fifth Resource](https://real-url.com) - Additional context
+    *   **🏁 Milestone Project:** [Specific project idea with technologies to use]
+"""),
+    ("phase_2", """
+    #### 2. Phase 2: Core Expertise & Advanced Skills (Weeks 9-16)
+    *   **Focus:** [Intermediate to advanced {goal} concepts]
+    *   **📖 Key Resources:**
+        *   [Specific Resource](https://real-url.com) - Why this matters for Phase 2
+        *   [Another Resource](https://real-url.com) - Advanced concepts covered
+        *   [Third Resource](https://real-url.com) - Practical implementation
+        *   [Fourth Resource](https://real-url.com) - Industry best practices
+        *   [Fifth Resource](https://real-url.com) - Real-world applications
+    *   **🏁 Milestone Project:** [More complex project description]
+"""),
+    ("phase_3", """
+    #### 3. Phase 3: Advanced Mastery & Specialization (Weeks 17-24)
+    *   **Focus:** [Production-level skills and specializations for {goal}]
+    *   **📖 Key Resources:**
+        *   [Advanced Resource](https://real-url.com) - Expert-level content
+        *   [Specialization Resource](https://real-url.com) - Deep dive topic
+        *   [Production Resource](https://real-url.com) - Deployment and scaling
+        *   [Best Practices](https://real-url.com) - Industry standards
+        *   [Advanced Tool](https://real-url.com) - Professional workflows
+    *   **🏁 Capstone Project:** [Comprehensive project that demonstrates mastery]
+"""),
+    ("tracks_and_tools", """
+    ### 🎯 Specialized Learning Paths
+    [If relevant to {goal}, add 2-3 specialization tracks with specific resources]
+    
+    ### 🛠️ Essential Tools & Frameworks
+    [Table of specific tools for {goal} with real URLs]
+"""),
+    ("practice_and_courses", """
+    ### 📊 Practice Platforms & Communities
+    *   **[Platform Name](real-url)** - What you can practice here
+    *   **[Community Name](real-url)** - Why join this community
+    *   **[Competition Platform](real-url)** - How to gain experience
+    [Add 5-8 specific platforms]
+
+    ### 🎓 Top Courses & Certifications
+    *   **[Specific Course Name](real-url)** - Institution/Platform
+    *   **[Certification Name](real-url)** - Why it matters
+    [Add 4-6 specific courses]
+"""),
+    ("next_steps_and_career", """
+    ### 🚀 Next Steps: Your Journey to {goal} Mastery
+    
+    1. **Week 1-2:** [Specific actionable steps]
+    2. **Week 3-4:** [Specific learning goals]
+    3. **Week 5-8:** [Specific milestones]
+    [Continue with 8-week breakdown]
+    
+    ### 📚 Recommended Books
+    *   **"[Actual Book Title]" by [Author]** - Why read this
+    [Add 3-5 real books]
+    
+    ### 🎯 Career Resources
+    *   **[Interview Prep Resource](real-url)** - Description
+    *   **[Job Board](real-url)** - Where to find {goal} jobs
+    [Add 3-5 career resources]
+"""),
+]
+
+def path_prompt_context(request: PathRequest) -> str:
+    """The part of the path prompt shared by the full prompt and every section prompt."""
+    skill_strategy = ("Leveraging your existing expertise to fast-track your progress." 
+                     if request.use_previous_skills else "Starting from foundational principles for a solid base.")
+    
+    return f"""
+    Act as a Principal Engineer and Career Architect. Generate a RIGOROUSLY ACCURATE and hyper-specific learning path for becoming a: {request.goal}
+
+    USER CONTEXT:
+    - Experience Level: {request.user_profile.experience_level}
+    - Current Skills: {', '.join(request.user_profile.skills)}
+    - Learning Strategy: {skill_strategy}
+
+    CRITICAL REQUIREMENTS:
+    1. You MUST provide SPECIFIC, REAL URLs - no generic Google/YouTube search links
+    2. Include actual course names, GitHub repositories, official documentation sites
+    3. For {request.goal}, research and provide the TOP industry-standard resources
+    4. Include at least 8-10 specific resources in the Global Master Resources table
+    5. Each learning phase should have 5-7 specific, clickable resources with real URLs
+    6. Add specialized learning tracks if relevant to {request.goal}
+    7. Include practice platforms, communities, and career resources specific to {request.goal}
+
+    EXAMPLES OF GOOD RESOURCES (adapt to {request.goal}):
+    - For ML: Coursera ML Specialization, Fast.ai, Kaggle, Papers with Code, scikit-learn docs
+    - For Web Dev: MDN Web Docs, FreeCodeCamp, The Odin Project, web.dev, specific framework docs
+    - For Data Science: Kaggle Learn, DataCamp, Mode Analytics SQL Tutorial, Pandas docs
+    - For Cloud: AWS/GCP/Azure official tutorials, Cloud Academy, A Cloud Guru
+    """
 
-        ### 📚 Essential {request.goal} Resources
-        
-        | 🎓 Resource / Course | 🔗 Direct Link | 💡 Why This Matters |
-        | :--- | :--- | :--- |
-        | **[Specific Course/Platform Name]** | [Real URL with https://] | [Specific benefit for {request.goal}] |
-        | **[Another Specific Resource]** | [Real URL] | [Why it's essential] |
-        | **[GitHub Repo or Tool]** | [Real URL] | [What you'll learn] |
-        [Continue with 8-10 total resources - ALL with real, working URLs]
-
-        ### 🗂️ Detailed Learning Modules
-        
-        #### 1. Phase 1: Foundations & Core Concepts (Weeks 1-8)
-        *   **Focus:** [Specific foundational topics for {request.goal}]
-        *   **📖 Key Resources:**
-            *   [Specific Resource Name](https://real-url.com) - Detailed explanation of why needed
-            *   [Another Resource](https://real-url.com) - What you'll learn from this
-            *   [Third Resource](https://real-url.com) - How it builds your foundation
-            *   [Fourth Resource](https://real-url.com) - Practical application
-            *   [Fifth Resource](https://real-url.com) - Additional context
-        *   **🏁 Milestone Project:** [Specific project idea with technologies to use]
-        
-        #### 2. Phase 2: Core Expertise & Advanced Skills (Weeks 9-16)
-        *   **Focus:** [Intermediate to advanced {request.goal} concepts]
-        *   **📖 Key Resources:**
-            *   [Specific Resource](https://real-url.com) - Why this matters for Phase 2
-            *   [Another Resource](https://real-url.com) - Advanced concepts covered
-            *   [Third Resource](https://real-url.com) - Practical implementation
-            *   [Fourth Resource](https://real-url.com) - Industry best practices
-            *   [Fifth Resource](https://real-url.com) - Real-world applications
-        *   **🏁 Milestone Project:** [More complex project description]
-
-        #### 3. Phase 3: Advanced Mastery & Specialization (Weeks 17-24)
-        *   **Focus:** [Production-level skills and specializations for {request.goal}]
-        *   **📖 Key Resources:**
-            *   [Advanced Resource](https://real-url.com) - Expert-level content
-            *   [Specialization Resource](https://real-url.com) - Deep dive topic
-            *   [Production Resource](https://real-url.com) - Deployment and scaling
-            *   [Best Practices](https://real-url.com) - Industry standards
-            *   [Advanced Tool](https://real-url.com) - Professional workflows
-        *   **🏁 Capstone Project:** [Comprehensive project that demonstrates mastery]
-
-        ### 🎯 Specialized Learning Paths
-        [If relevant to {request.goal}, add 2-3 specialization tracks with specific resources]
-        
-        ### 🛠️ Essential Tools & Frameworks
-        [Table of specific tools for {request.goal} with real URLs]
-        
-        ### 📊 Practice Platforms & Communities
-        *   **[Platform Name](real-url)** - What you can practice here
-        *   **[Community Name](real-url)** - Why join this community
-        *   **[Competition Platform](real-url)** - How to gain experience
-        [Add 5-8 specific platforms]
-
-        ### 🎓 Top Courses & Certifications
-        *   **[Specific Course Name](real-url)** - Institution/Platform
-        *   **[Certification Name](real-url)** - Why it matters
-        [Add 4-6 specific courses]
-
-        ### 🚀 Next Steps: Your Journey to {request.goal} Mastery
-        
-        1. **Week 1-2:** [Specific actionable steps]
-        2. **Week 3-4:** [Specific learning goals]
-        3. **Week 5-8:** [Specific milestones]
-        [Continue with 8-week breakdown]
-        
-        ### 📚 Recommended Books
-        *   **"[Actual Book Title]" by [Author]** - Why read this
-        [Add 3-5 real books]
-        
-        ### 🎯 Career Resources
-        *   **[Interview Prep Resource](real-url)** - Description
-        *   **[Job Board](real-url)** - Where to find {request.goal} jobs
-        [Add 3-5 career resources]
+def format_path_section(request: PathRequest, index: int) -> str:
+    _, template = PATH_SECTIONS[index]
+    return template.format(goal=request.goal, level=request.user_profile.experience_level)
 
-        FINAL CHECK: Every resource MUST have a real, specific URL. No placeholders, no generic search links!
-        """
-        
-        response = model.generate_content(prompt)
-        return {"success": True, "path": response.text}
+def build_path_prompt(request: PathRequest) -> str:
+    sections = "".join(format_path_section(request, i) for i in range(len(PATH_SECTIONS)))
+    return f"""{path_prompt_context(request)}
+    OUTPUT FORMAT (Markdown) - FOLLOW THIS EXACT STRUCTURE:
+{sections}
+    FINAL CHECK: Every resource MUST have a real, specific URL. No placeholders, no generic search links!
+    """
+
+def build_path_section_prompt(request: PathRequest, index: int) -> str:
+    name, _ = PATH_SECTIONS[index]
+    return f"""{path_prompt_context(request)}
+    This curriculum is written in {len(PATH_SECTIONS)} parts that are generated separately and joined in order.
+    Write ONLY part {index + 1} ("{name}") below. Start directly with its heading and add no introduction,
+    summary or closing remarks of your own - the other parts cover everything else.
+
+    OUTPUT FORMAT (Markdown) - FOLLOW THIS EXACT STRUCTURE:
+{format_path_section(request, index)}
+    FINAL CHECK: Every resource MUST have a real, specific URL. No placeholders, no generic search links!
+    """
+
+
+# Off by default: one path then costs len(PATH_SECTIONS) requests against the Gemini RPM quota
+PATH_PARALLEL_SECTIONS = os.getenv("PATH_PARALLEL_SECTIONS", "0") == "1"
+
+def use_parallel_sections(request: PathRequest) -> bool:
+    return PATH_PARALLEL_SECTIONS if request.parallel is None else request.parallel
+
+async def generate_path_sections(request: PathRequest, admitted: bool = False):
+    """
+    Async generator yielding (index, text) for each path section as soon as it is generated.
+
+    All sections are requested at once, so the total latency is roughly that of the
+    slowest section. If one section fails the others are cancelled and the error is raised.
+    """
+    pending = {
+        asyncio.ensure_future(llm.generate(build_path_section_prompt(request, i), hedge=True, admitted=admitted)): i
+        for i in range(len(PATH_SECTIONS))
+    }
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                # Sections are joined with a blank line, whatever whitespace the model put around them
+                yield index, future.result().strip("\n") + "\n\n"
+    finally:
+        for future in pending:
+            future.cancel()
+
+async def generate_path_parallel(request: PathRequest) -> str:
+    sections = [""] * len(PATH_SECTIONS)
+    async for index, text in generate_path_sections(request):
+        sections[index] = text
+    return "".join(sections)
+
+def select_fallback_path(goal: str) -> str:
+    """Picks the curated fallback curriculum that best matches the goal."""
+    goal_lower = goal.lower()
+
+    if any(keyword in goal_lower for keyword in ['machine learning', 'ml', 'deep learning', 'ai', 'artificial intelligence']):
+        return generate_ml_fallback(goal)
+    elif any(keyword in goal_lower for keyword in ['data analyst', 'data analysis', 'data science', 'analytics']):
+        return generate_data_analyst_fallback(goal)
+    elif any(keyword in goal_lower for keyword in ['web dev', 'frontend', 'backend', 'full stack', 'react', 'javascript']):
+        return generate_webdev_fallback(goal)
+    else:
+        # Generic comprehensive fallback
+        return generate_generic_fallback(goal)
+
+@app.post("/generate-path")
+async def generate_path(request: PathRequest):
+    cache_key = path_cache_key(request)
+    cached = lookup_cached_path(request, cache_key)
+    if cached is not None:
+        return {"success": True, **cached, "outline": path_outline(cached["path"])}
+
+    try:
+        if use_parallel_sections(request):
+            path = await path_flights.do(cache_key, lambda: generate_path_parallel(request))
+        else:
+            path = await path_flights.do(cache_key, lambda: llm.generate(build_path_prompt(request), hedge=True))
+    except QuotaExceeded:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         print(f"AI Generation Failed: {e}. Returning fallback content.")
         print(f"Goal: {request.goal}, Level: {request.user_profile.experience_level}")
-        
-        # Dynamic fallback based on goal
-        goal_lower = request.goal.lower()
-        
-        # Determine which fallback to use
-        if any(keyword in goal_lower for keyword in ['machine learning', 'ml', 'deep learning', 'ai', 'artificial intelligence']):
-            fallback_path = generate_ml_fallback(request.goal)
-        elif any(keyword in goal_lower for keyword in ['data analyst', 'data analysis', 'data science', 'analytics']):
-            fallback_path = generate_data_analyst_fallback(request.goal)
-        elif any(keyword in goal_lower for keyword in ['web dev', 'frontend', 'backend', 'full stack', 'react', 'javascript']):
-            fallback_path = generate_webdev_fallback(request.goal)
+        path = select_fallback_path(request.goal)
+        return {"success": True, "path": path, "is_fallback": True, "outline": path_outline(path)}
+
+    # Fallbacks are never cached, so a recovered Gemini quota is picked up immediately
+    store_generated_path(request, cache_key, path)
+    return {"success": True, "path": path, "outline": path_outline(path)}
+
+class PathOutlineRequest(BaseModel):
+    path: str
+
+@app.post("/path-outline")
+async def get_path_outline(request: PathOutlineRequest):
+    """Phases, milestones and flowchart steps of a learning path's markdown (e.g. one saved before outlines existed)."""
+    return {"success": True, "outline": path_outline(request.path)}
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return {
+        "generate_path": path_cache.stats(),
+        "semantic": semantic_cache.stats() if semantic_cache is not None else None,
+        "compile": compile_cache.stats(),
+        "judge": judge_cache.stats(),
+        "path_outline": outline_cache.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "llm": llm.stats(),
+        "models": model_router.stats(),
+        "cache": await cache_stats(),
+        "singleflight": {"generate_path": path_flights.stats(), "generate_tasks": task_flights.stats(), "compile": compile_flights.stats()},
+        "jobs": job_manager.stats(),
+        "python_pool": python_pool.stats(),
+        "sql": sql_runner.stats(),
+        "executions": execution_metrics.stats(),
+        "scheduler": exec_scheduler.stats(),
+        "runtimes": {"node": node_runtime.stats(), "java": java_runtime.stats()},
+        "flowchart": flowchart_renderer.stats(),
+        "imports": lazy_import_stats(),
+    }
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def split_markdown_sections(text: str) -> List[str]:
+    """Splits a markdown document before each heading so it can be streamed section by section."""
+    sections, current = [], []
+    for line in text.splitlines(keepends=True):
+        if re.match(r"\s*#{1,6}\s", line) and "".join(current).strip():
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+@app.post("/generate-path/stream")
+async def generate_path_stream(request: PathRequest):
+    """
+    Server-Sent Events version of /generate-path.
+
+    Emits `chunk` events ({"text": ...}) as the curriculum is generated, then a final
+    `done` event with the path's outline. In parallel mode each section arrives whole,
+    in completion order, as a `section` event ({"index", "name", "total", "text"}); the
+    client places it by index.
+    If Gemini fails part-way, a `reset` event tells the client to drop what it has
+    received and the curated fallback is streamed section by section.
+    """
+    cache_key = path_cache_key(request)
+    cached = lookup_cached_path(request, cache_key)
+    parallel = use_parallel_sections(request)
+    prompt = None
+    if cached is None:
+        # Admitted before the response starts, so a full quota queue is still a proper 429
+        if parallel:
+            for i in range(len(PATH_SECTIONS)):
+                await llm.admit(build_path_section_prompt(request, i))
         else:
-            # Generic comprehensive fallback
-            fallback_path = generate_generic_fallback(request.goal)
-        
-        return {"success": True, "path": fallback_path, "is_fallback": True}
+            prompt = build_path_prompt(request)
+            await llm.admit(prompt)
+
+    async def events():
+        if cached is not None:
+            path = cached.pop("path")
+            for section in split_markdown_sections(path):
+                yield sse_event("chunk", {"text": section})
+            yield sse_event("done", {**cached, "outline": path_outline(path)})
+            return
+
+        parts = []
+        try:
+            if parallel:
+                parts = [""] * len(PATH_SECTIONS)
+                async for index, text in generate_path_sections(request, admitted=True):
+                    parts[index] = text
+                    yield sse_event("section", {
+                        "index": index, "name": PATH_SECTIONS[index][0], "total": len(PATH_SECTIONS), "text": text,
+                    })
+            else:
+                async for text in llm.stream(prompt, admitted=True):
+                    parts.append(text)
+                    yield sse_event("chunk", {"text": text})
+        except Exception as e:
+            print(f"AI Streaming Failed: {e}. Streaming fallback content.")
+            if any(parts):
+                yield sse_event("reset", {})
+            path = select_fallback_path(request.goal)
+            for section in split_markdown_sections(path):
+                yield sse_event("chunk", {"text": section})
+            yield sse_event("done", {"is_fallback": True, "outline": path_outline(path)})
+            return
+
+        path = "".join(parts)
+        store_generated_path(request, cache_key, path)
+        yield sse_event("done", {"cached": False, "outline": path_outline(path)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 def generate_ml_fallback(goal):
     return f"""
@@ -853,8 +1229,14 @@ async def generate_tasks(request: TaskRequest):
             }}
         ]
         """
-        response = model.generate_content(prompt)
-        text = response.text
+        task_key = make_cache_key("tasks", {
+            "goal": " ".join(request.goal.split()).casefold(),
+            "skills": sorted({s.strip().casefold() for s in request.skills if s.strip()}),
+            "experience_level": request.experience_level.strip().casefold(),
+            "focus_area": request.focus_area.strip().casefold(),
+            "language": request.language.strip().casefold(),
+        })
+        text = await task_flights.do(task_key, lambda: llm.generate(prompt))
         # Clean markdown
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0].strip()
@@ -863,6 +1245,8 @@ async def generate_tasks(request: TaskRequest):
             
         tasks = json.loads(text)
         return {"success": True, "tasks": tasks}
+    except QuotaExceeded:
+        raise
     except Exception as e:
         print(f"Task generation error: {e}")
         # Return 3 distinct fallback tasks related to the goal
@@ -896,500 +1280,883 @@ async def generate_tasks(request: TaskRequest):
             ]
         }
 
+# User Python code runs in a pool of warm worker processes, never in the service process itself
+python_pool = PythonWorkerPool(
+    size=int(os.getenv("PYTHON_WORKERS", str(os.cpu_count() or 2))),
+    wall_timeout=float(os.getenv("PYTHON_WALL_TIMEOUT", "10")),
+    cpu_limit=float(os.getenv("PYTHON_CPU_LIMIT", "5")),
+    max_runs=int(os.getenv("PYTHON_WORKER_MAX_RUNS", "100")),
+    max_rss_mb=int(os.getenv("PYTHON_WORKER_MAX_RSS_MB", "512")),
+    memory_mb=int(os.getenv("PYTHON_WORKER_MEMORY_MB", "1024")),
+)
+
+# Workers (and their numpy/pandas imports) start with the first Python run, or in the warmup
+@app.on_event("shutdown")
+async def stop_python_pool():
+    await python_pool.stop()
+
 class EvaluationRequest(BaseModel):
     code: str
     language: str
     test_cases: List[Dict[str, str]]
+    fixture: Optional[str] = None
+    # "bypass" skips the judge cache, "refresh" re-runs the tests and overwrites the cached result
+    cache: Optional[str] = None
+
+COMPILED_LANGUAGES = ("java", "cpp", "c++", "csharp", "c#")
+
+# Test case runs one evaluation may have in flight at once
+EVALUATE_PARALLELISM = int(os.getenv("EVALUATE_PARALLELISM", "4"))
+
+# Bump whenever a change to the runners or to evaluate_submission can change a verdict
+JUDGE_RUNNER_VERSION = "1"
+
+# Evaluation results keyed by submission and test suite; resubmitted code is not run again.
+# Verdicts are only as trustworthy as the file: submitted SQL cannot ATTACH it (see
+# sql_runner.authorize), and tests/test_judge_cache.py keeps it that way.
+judge_cache = TwoTierCache(
+    "judge",
+    max_size=int(os.getenv("JUDGE_CACHE_SIZE", "1024")),
+    memory_ttl=float(os.getenv("JUDGE_CACHE_TTL", "3600")),
+    disk_ttl=float(os.getenv("JUDGE_CACHE_DISK_TTL", str(7 * 24 * 3600))),
+    persist=os.getenv("JUDGE_CACHE_PERSIST", "1") == "1",
+)
+
+def judge_cache_key(request: EvaluationRequest) -> str:
+    return make_cache_key("judge", {
+        "language": request.language.lower(),
+        "code": request.code,
+        "test_cases": request.test_cases,
+        "fixture": request.fixture,
+        "runner": JUDGE_RUNNER_VERSION,
+        "toolchain": runners.version(request.language.lower()),
+        # Compiler flags and the output cap also decide what a run produces
+        "flags": {"java": JAVAC_FLAGS, "cpp": CPP_FLAGS, "csharp": CSC_FLAGS},
+        "max_output": OUTPUT_MAX_BYTES,
+    })
+
+def cacheable_evaluation(response: dict) -> bool:
+    """
+    Only verdicts the code itself decided: every case ran to completion and passed or
+    printed the wrong thing. An error can be a timeout on a busy host or a full worker
+    pool, which the next submission may not hit.
+    """
+    return bool(response["results"]) and all(result.get("error") is None for result in response["results"])
+
+async def run_once(lang: str, code: str, stdin: Optional[str] = None) -> dict:
+    """One /run-code execution as a test case outcome {"output", "error", "usage"}."""
+    try:
+        exec_result = await run_code_with_usage(CodeExecutionRequest(code=code, language=lang, stdin=stdin))
+    except Exception as e:
+        exec_result = {"success": False, "error": str(e), "usage": {}}
+    if exec_result["success"]:
+        return {"output": exec_result["output"], "error": None, "usage": exec_result["usage"]}
+    default_error = "SQL execution failed" if lang == "sql" else "Execution failed"
+    return {"output": "", "error": exec_result.get("error") or default_error, "usage": exec_result["usage"]}
+
+async def run_test_cases(lang: str, code: str, inputs: List[str], fixture: Optional[str] = None) -> Optional[List[dict]]:
+    """
+    Runs the submission once and evaluates every test case input against it.
+
+    Returns one {"output", "error", "usage"} per input, or None if the language is not
+    supported; cases that share a run share its usage.
+    Python and JavaScript load the program once and evaluate each input in the same
+    process. The compiled languages are built once and run once per distinct input,
+    which is passed as stdin; up to EVALUATE_PARALLELISM of those runs are in flight
+    at a time. SQL and HTML/CSS do not take per-case input, so they run (or are
+    validated) once and every case shares that result; SQL outcomes also carry the
+    last result set's hashes under "result". Languages whose toolchain is missing get
+    the runner registry's error for every case without running anything.
+    """
+    await runners.ready(lang)
+    runner, unavailable = runners.resolve(lang)
+    if runner is None:
+        return None if unavailable is None else [{"output": "", "error": unavailable, "usage": {}} for _ in inputs]
+
+    if lang == "python":
+        return await python_pool.run_cases(code, inputs)
+
+    if lang == "javascript":
+        try:
+            result = await run_javascript(build_javascript_harness(code, inputs), timeout=5)
+            outcomes = parse_harness_output(result.stdout, result.stderr, result.returncode, len(inputs))
+            return [{**outcome, "usage": result.usage} for outcome in outcomes]
+        except Exception as e:
+            return [{"output": "", "error": str(e), "usage": {}} for _ in inputs]
+
+    if lang in COMPILED_LANGUAGES:
+        # Concurrent runs of an uncached build wait on the same compile (see compile_flights)
+        semaphore = asyncio.Semaphore(EVALUATE_PARALLELISM)
+
+        async def run_input(stdin: str) -> dict:
+            async with semaphore:
+                return await run_once(lang, code, stdin or None)
+
+        distinct = list(dict.fromkeys(inputs))
+        outcomes = dict(zip(distinct, await asyncio.gather(*(run_input(stdin) for stdin in distinct))))
+        return [outcomes[stdin] for stdin in inputs]
+
+    if lang == "sql":
+        try:
+            execution = await run_sql(code, fixture)
+        except Exception as e:
+            execution = {"output": "", "error": f"SQL execution failed: {str(e)}", "result": None, "usage": {}}
+        return [execution for _ in inputs]
+
+    if lang in ("html", "css"):
+        outcome = await run_once(lang, code)
+        return [outcome for _ in inputs]
+
+    return None
+
+async def sql_case_passed(outcome: dict, tc: Dict[str, str], actual_output: str, fixture: Optional[str]) -> bool:
+    """
+    Compares the submission's last result set with the expected one by hash.
+
+    The expected rows come from the case's "expected_query" (a reference solution run
+    on the same fixture) or else from "expected_output" written as `a | b` lines, with
+    an optional header line. Row order only matters when the reference query (or, for
+    expected_output, the submission) has an ORDER BY. Scripts without a result set are
+    compared on their text output.
+    """
+    result = outcome.get("result")
+    expected = tc.get("expected_output", "").strip()
+    if tc.get("expected_query"):
+        reference = await run_sql(tc["expected_query"], fixture)
+        expected_result = reference["result"]
+        if result is None or expected_result is None:
+            return result is None and expected_result is None and actual_output == reference["output"].strip()
+        key = "ordered" if expected_result["ordered"] else "unordered"
+        return result["hashes"][key] == expected_result["hashes"][key]
+
+    if result is None:
+        return actual_output == expected
+    rows = parse_expected_rows(expected)
+    if rows and [cell.lower() for cell in rows[0]] == [column.lower() for column in result["columns"]]:
+        rows = rows[1:]
+    key = "ordered" if result["ordered"] else "unordered"
+    return hash_rows(rows, ordered=result["ordered"]) == result["hashes"][key]
 
 @app.post("/evaluate-code")
-async def evaluate_code(request: EvaluationRequest):
+async def evaluate_code(request: EvaluationRequest, http_request: Request):
     """
     Evaluates code against test cases.
+
+    The submission is loaded (or compiled) once per request and all test cases run
+    against it; see run_test_cases. Each result carries the usage of the run that
+    produced it, and the response's "usage" totals the evaluation's runs plus the
+    time spent waiting for the scheduler as "queue_ms". Evaluations are scheduled as
+    grading work, behind interactive runs.
+
+    Verdicts are cached by language, code, test cases and runner version (see
+    judge_cache_key). A hit returns the stored results and usage of the run that
+    produced them, with "cached": true, without queueing or running anything.
     """
+    # The key includes the toolchain versions the probe finds
+    await runners.ready(request.language.lower())
+    cache_key = judge_cache_key(request)
+    if request.cache not in ("bypass", "refresh"):
+        cached = judge_cache.get(cache_key)
+        if cached is not None:
+            return {**json.loads(cached), "cached": True}
+
+    user = execution_user(http_request)
+    async with exec_scheduler.slot(user, GRADING, cost=max(1, len(request.test_cases))) as queue_ms:
+        response = await evaluate_submission(request)
+    if request.cache != "bypass" and cacheable_evaluation(response):
+        judge_cache.set(cache_key, json.dumps(response))
+    response["usage"]["queue_ms"] = queue_ms
+    response["cached"] = False
+    return response
+
+async def evaluate_submission(request: EvaluationRequest) -> dict:
+    start = time.perf_counter()
     results = []
-    all_passed = True
     lang = request.language.lower()
+    inputs = [tc.get("input", "") for tc in request.test_cases]
+    outcomes = await run_test_cases(lang, request.code, inputs, request.fixture)
 
     for i, tc in enumerate(request.test_cases):
-        input_code = tc.get("input", "")
+        input_code = inputs[i]
         expected = tc.get("expected_output", "").strip()
-        
-        # Construct code to run: user code + the test case call (if any)
-        # For Python, we'll try to execute and get the last expression result or stdout
-        if lang == "python":
-            full_code = request.code + "\n"
-            if input_code:
-                # If there's a call like add(5,3), we want its result
-                full_code += f"\nprint({input_code})"
-                
-            try:
-                import sys
-                from contextlib import redirect_stdout
-                f = io.StringIO()
-                with redirect_stdout(f):
-                    exec_globals = {"__builtins__": __builtins__}
-                    exec(full_code, exec_globals)
-                
-                actual_output = f.getvalue().strip()
-                passed = actual_output == expected
-                results.append({
-                    "test_id": i + 1,
-                    "input": input_code,
-                    "expected": expected,
-                    "actual": actual_output,
-                    "passed": passed
-                })
-                if not passed: all_passed = False
-            except Exception as e:
-                all_passed = False
-                results.append({
-                    "test_id": i + 1,
-                    "error": str(e),
-                    "passed": False
-                })
-        
-        elif lang == "javascript":
-            # For JS, we'll append a console.log of the input code
-            full_code = request.code + "\n"
-            if input_code:
-                full_code += f"\nconsole.log({input_code});"
-            
-            try:
-                result = subprocess.run(
-                    ["node", "-e", full_code], 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=3
-                )
-                actual_output = result.stdout.strip()
-                if result.returncode != 0:
-                    passed = False
-                    error = result.stderr
-                else:
-                    passed = actual_output == expected
-                    error = None
-                
-                results.append({
-                    "test_id": i + 1,
-                    "input": input_code,
-                    "expected": expected,
-                    "actual": actual_output,
-                    "passed": passed,
-                    "error": error
-                })
-                if not passed: all_passed = False
-            except Exception as e:
-                all_passed = False
-                results.append({"test_id": i+1, "error": str(e), "passed": False})
-
-        elif lang == "java" or lang == "cpp" or lang == "c++" or lang == "csharp" or lang == "c#":
-            # For compiled languages, we'll run the full code and check output
-            try:
-                # Use the run_code function internally
-                exec_request = CodeExecutionRequest(code=request.code, language=lang)
-                exec_result = await run_code(exec_request)
-                
-                if exec_result["success"]:
-                    actual_output = exec_result["output"].strip()
-                    passed = actual_output == expected
-                    results.append({
-                        "test_id": i + 1,
-                        "input": input_code,
-                        "expected": expected,
-                        "actual": actual_output,
-                        "passed": passed
-                    })
-                    if not passed: all_passed = False
-                else:
-                    all_passed = False
-                    results.append({
-                        "test_id": i + 1,
-                        "error": exec_result.get("error", "Execution failed"),
-                        "passed": False
-                    })
-            except Exception as e:
-                all_passed = False
-                results.append({"test_id": i+1, "error": str(e), "passed": False})
-        
-        elif lang == "sql":
-            # For SQL, execute and check results
-            try:
-                exec_request = CodeExecutionRequest(code=request.code, language="sql")
-                exec_result = await run_code(exec_request)
-                
-                if exec_result["success"]:
-                    actual_output = exec_result["output"].strip()
-                    passed = expected.lower() in actual_output.lower() or actual_output == expected
-                    results.append({
-                        "test_id": i + 1,
-                        "input": input_code,
-                        "expected": expected,
-                        "actual": actual_output,
-                        "passed": passed
-                    })
-                    if not passed: all_passed = False
-                else:
-                    all_passed = False
-                    results.append({
-                        "test_id": i + 1,
-                        "error": exec_result.get("error", "SQL execution failed"),
-                        "passed": False
-                    })
-            except Exception as e:
-                all_passed = False
-                results.append({"test_id": i+1, "error": str(e), "passed": False})
-        
-        elif lang == "html" or lang == "css":
-            # For HTML/CSS, validation is the test
-            try:
-                exec_request = CodeExecutionRequest(code=request.code, language=lang)
-                exec_result = await run_code(exec_request)
-                
-                passed = exec_result["success"]
-                results.append({
-                    "test_id": i + 1,
-                    "input": "Validation check",
-                    "expected": "Valid code",
-                    "actual": "Valid" if passed else exec_result.get("error", "Invalid"),
-                    "passed": passed
-                })
-                if not passed: all_passed = False
-            except Exception as e:
-                all_passed = False
-                results.append({"test_id": i+1, "error": str(e), "passed": False})
-        
-        else:
-            all_passed = False
+
+        if outcomes is None:
             results.append({
                 "test_id": i + 1,
                 "error": f"Language '{lang}' not supported for evaluation",
                 "passed": False
             })
+            continue
+
+        outcome = outcomes[i]
+        if lang == "html" or lang == "css":
+            # For HTML/CSS, validation is the test
+            passed = outcome["error"] is None
+            results.append({
+                "test_id": i + 1,
+                "input": "Validation check",
+                "expected": "Valid code",
+                "actual": "Valid" if passed else outcome["error"],
+                "passed": passed
+            })
+        elif outcome["error"] is not None:
+            results.append({
+                "test_id": i + 1,
+                "input": input_code,
+                "expected": expected,
+                "actual": outcome["output"].strip(),
+                "error": outcome["error"],
+                "passed": False
+            })
+        else:
+            actual_output = outcome["output"].strip()
+            if lang == "sql":
+                passed = await sql_case_passed(outcome, tc, actual_output, request.fixture)
+            else:
+                passed = actual_output == expected
+            results.append({
+                "test_id": i + 1,
+                "input": input_code,
+                "expected": expected,
+                "actual": actual_output,
+                "passed": passed
+            })
+        results[-1]["usage"] = outcome.get("usage") or {}
+
+    # Cases that shared a run share one usage dict; count each run once
+    runs = {id(outcome.get("usage")): outcome.get("usage") or {} for outcome in outcomes or []}
+    usage = combine_usage(list(runs.values()))
+    usage["wall_ms"] = elapsed_ms(start)
+    all_passed = all(r["passed"] for r in results)
+    execution_metrics.record("evaluate", lang, usage, all_passed)
+    return {"success": True, "all_passed": all_passed, "results": results, "usage": usage}
+
+# Compiled artifacts keyed by (language, flags, source); re-running unchanged code skips the compiler
+compile_cache = CompileCache(
+    os.path.join(CACHE_DIR, "compile"),
+    max_bytes=int(os.getenv("COMPILE_CACHE_MAX_MB", "512")) * 1024 * 1024,
+)
+JAVAC_FLAGS: List[str] = []
+CPP_FLAGS: List[str] = []
+CSC_FLAGS: List[str] = []
+
+# Warm Node and JVM processes that run jobs without paying runtime startup each time
+RUNTIME_DAEMONS_ENABLED = os.getenv("RUNTIME_DAEMONS_ENABLED", "1") == "1"
+daemon_limits = dict(
+    max_rss_mb=int(os.getenv("RUNTIME_DAEMON_MAX_RSS_MB", "512")),
+    max_jobs=int(os.getenv("RUNTIME_DAEMON_MAX_JOBS", "1000")),
+)
+node_runtime = node_daemon(**daemon_limits)
+java_runtime = java_daemon(os.path.join(CACHE_DIR, "runtimes"), **daemon_limits)
+
+@app.on_event("startup")
+async def start_runtime_daemons():
+    if RUNTIME_DAEMONS_ENABLED:
+        node_runtime.start()
+        java_runtime.start()
+
+@app.on_event("shutdown")
+async def stop_runtime_daemons():
+    await node_runtime.stop()
+    await java_runtime.stop()
+
+async def run_in_daemon(daemon, fields: List[str], args: List[str], timeout: float) -> Optional[ProcessResult]:
+    """Runs a job in a warm daemon; None means the daemon is unavailable and the caller should spawn a process."""
+    if not RUNTIME_DAEMONS_ENABLED:
+        return None
+    start = time.perf_counter()
+    try:
+        status, stdout, stderr, usage = await daemon.call(fields, timeout=timeout + 1)
+    except RuntimeUnavailable:
+        return None
+    if status == "TIMEOUT":
+        raise subprocess.TimeoutExpired(args, timeout)
+    usage = {"wall_ms": round((time.perf_counter() - start) * 1000, 1), **usage, "stdout_bytes": len(stdout.encode("utf-8"))}
+    return ProcessResult(args, 0 if status == "OK" else 1, stdout, stderr, usage)
+
+async def run_javascript(code: str, timeout: float, stdin: Optional[str] = None,
+                         on_output: Optional[OutputCallback] = None) -> ProcessResult:
+    args = ["node", "-e", code]
+    result = None
+    # The daemon's jobs have no stdin and return their output at the end; programs that
+    # read input or stream their output get a real node process
+    if stdin is None and on_output is None:
+        result = await run_in_daemon(node_runtime, ["RUN", code, int(timeout * 1000)], args, timeout)
+    if result is None:
+        result = await run_process(args, timeout=timeout, input=stdin, on_output=on_output)
+    return result
+
+async def compile_java(java_file: str, out_dir: str) -> ProcessResult:
+    args = ["javac", *JAVAC_FLAGS, "-d", out_dir, java_file]
+    result = None
+    # The daemon's in-process compiler only takes the output directory; extra flags need real javac
+    if not JAVAC_FLAGS:
+        result = await run_in_daemon(java_runtime, ["COMPILE", java_file, out_dir], args, 10)
+    if result is None:
+        result = await run_process(args, timeout=10)
+    return result
+
+async def run_java(class_dir: str, class_name: str, stdin: Optional[str] = None,
+                   on_output: Optional[OutputCallback] = None) -> ProcessResult:
+    args = ["java", "-cp", class_dir, class_name]
+    fields = ["RUN", class_dir, class_name, 5000]
+    if stdin is not None:
+        fields.append(stdin)
+    result = None
+    # Streaming needs the output as it is written, which only a real java process provides
+    if on_output is None:
+        result = await run_in_daemon(java_runtime, fields, args, 5)
+    if result is None:
+        result = await run_process(args, timeout=5, input=stdin, on_output=on_output)
+    return result
+
+# Concurrent compiles of the same source (the same exercise submitted by a whole class, or
+# one evaluation's test cases) share a single compiler run
+compile_flights = SingleFlight("compile")
+
+# Compilers are CPU bound; more of them than cores only makes every one of them slower
+COMPILE_CONCURRENCY = int(os.getenv("COMPILE_CONCURRENCY", str(os.cpu_count() or 1)))
+_compile_slots: Optional[asyncio.Semaphore] = None
+
+def compile_slots() -> asyncio.Semaphore:
+    """Limits compiler processes so compiles waiting for a slot do not time out on each other's CPU."""
+    global _compile_slots
+    if _compile_slots is None:
+        _compile_slots = asyncio.Semaphore(COMPILE_CONCURRENCY)
+    return _compile_slots
+
+async def build_java(code: str, class_name: str) -> Tuple[Optional[str], Optional[str]]:
+    """Returns (directory holding the compiled classes, None) or (None, compiler errors)."""
+    cache_key = compile_cache.key("java", code, JAVAC_FLAGS)
+    class_dir = compile_cache.get(cache_key)
+    if class_dir is not None:
+        return class_dir, None
+
+    async def compile_once():
+        with tempfile.TemporaryDirectory() as tmpdir:
+            java_file = os.path.join(tmpdir, f"{class_name}.java")
+            with open(java_file, 'w') as f:
+                f.write(code)
+
+            async with compile_slots():
+                compile_result = await compile_java(java_file, tmpdir)
+            if compile_result.returncode != 0:
+                return None, compile_result.stderr
+
+            class_files = [os.path.join(tmpdir, name) for name in os.listdir(tmpdir) if name.endswith(".class")]
+            return compile_cache.put(cache_key, class_files), None
+
+    return await compile_flights.do(cache_key, compile_once)
+
+CPP_EXE_NAME = "main.exe" if os.name == 'nt' else "main"
+
+async def build_cpp(code: str) -> Tuple[Optional[str], Optional[str]]:
+    """Returns (directory holding the executable, None) or (None, compiler errors)."""
+    cache_key = compile_cache.key("cpp", code, CPP_FLAGS)
+    build_dir = compile_cache.get(cache_key)
+    if build_dir is not None:
+        return build_dir, None
+
+    async def compile_once():
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cpp_file = os.path.join(tmpdir, "main.cpp")
+            exe_file = os.path.join(tmpdir, CPP_EXE_NAME)
+            with open(cpp_file, 'w') as f:
+                f.write(code)
+
+            async with compile_slots():
+                compile_result = await run_process(["g++", *CPP_FLAGS, cpp_file, "-o", exe_file], timeout=10)
+            if compile_result.returncode != 0:
+                return None, compile_result.stderr
+
+            return compile_cache.put(cache_key, [exe_file]), None
+
+    return await compile_flights.do(cache_key, compile_once)
+
+async def run_csharp_executable(exe_file: str, usage: dict, stdin: Optional[str] = None,
+                                on_output: Optional[OutputCallback] = None) -> dict:
+    run_result = await run_process([exe_file], timeout=5, input=stdin, on_output=on_output)
+    record_run(usage, run_result.usage)
+    
+    if run_result.returncode == 0:
+        return {"success": True, "output": run_result.stdout if run_result.stdout else "Code executed successfully (no output)."}
+    else:
+        return {"success": False, "error": run_result.stderr}
+
+# Named SQL datasets (see sql_runner.FIXTURES), built once; each SQL run gets a private copy
+sql_runner = SQLRunner(
+    FIXTURES,
+    max_rows=int(os.getenv("SQL_MAX_ROWS", "200")),
+    time_limit=float(os.getenv("SQL_TIME_LIMIT", "5")),
+)
+
+@app.on_event("startup")
+async def build_sql_fixtures():
+    sql_runner.build()
 
-    return {"success": True, "all_passed": all_passed, "results": results}
+async def run_sql(code: str, fixture: Optional[str]) -> dict:
+    # sqlite3 holds the GIL only between VM steps; a thread keeps long queries off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, sql_runner.run, code, fixture)
+
+@app.get("/sql-fixtures")
+async def sql_fixtures():
+    """Fixture datasets that /run-code and /evaluate-code accept as `fixture`, with their tables."""
+    return {"success": True, "fixtures": sql_runner.tables()}
 
 class CodeExecutionRequest(BaseModel):
     code: str
     language: str = "python" # Added language field
+    stdin: Optional[str] = None
+    fixture: Optional[str] = None # SQL only: name of a fixture dataset to run against
+
+# Aggregate resource usage of /run-code and /evaluate-code, by language
+execution_metrics = ExecutionMetrics()
+
+# Every execution waits for a slot here; interactive runs go ahead of grading, users share fairly
+EXEC_SLOTS = int(os.getenv("EXEC_SLOTS", str(max(4, 2 * (os.cpu_count() or 1)))))
+exec_scheduler = ExecutionScheduler(
+    EXEC_SLOTS,
+    user_concurrency=int(os.getenv("EXEC_USER_CONCURRENCY", "2")),
+    weights={INTERACTIVE: float(os.getenv("EXEC_INTERACTIVE_WEIGHT", "4")), GRADING: 1.0},
+    # Slots grading can never take, so a run click does not queue behind a class's submissions
+    class_slots={GRADING: max(1, EXEC_SLOTS - int(os.getenv("EXEC_INTERACTIVE_RESERVED", "1")))},
+    max_queue=int(os.getenv("EXEC_QUEUE_SIZE", "500")),
+    max_user_queue=int(os.getenv("EXEC_USER_QUEUE_SIZE", "20")),
+    queue_timeout=float(os.getenv("EXEC_QUEUE_TIMEOUT", "60")),
+)
+
+def execution_user(http_request: Request) -> str:
+    """
+    Scheduler fairness key: the X-Execution-User header the gateway derives from the
+    client, else the connecting address. Nothing the client sends in the body counts, so
+    a user cannot take a fresh key per request; the header is trusted because only the
+    gateway can reach this service.
+    """
+    user = http_request.headers.get("x-execution-user", "").strip()
+    if user:
+        return user
+    return f"ip:{http_request.client.host if http_request.client else 'unknown'}"
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+def record_run(usage: dict, run_usage: dict):
+    """Adds a program run's measurements to a request's usage, with the run's wall time as run_ms."""
+    for key, value in run_usage.items():
+        usage["run_ms" if key == "wall_ms" else key] = value
 
 @app.post("/run-code")
-async def run_code(request: CodeExecutionRequest):
+async def run_code(request: CodeExecutionRequest, http_request: Request):
     """
-    Executes code. Currently supports Python (exec) and Node.js (subprocess).
+    Executes code. Python runs in the sandboxed worker pool, other languages in subprocesses.
+
+    The response's "usage" has the request's wall time, compile and run time, CPU
+    user/sys time, peak RSS and stdout bytes, as far as the runtime can measure them,
+    and "queue_ms", the time spent waiting for the scheduler (as interactive work).
     """
-    lang = request.language.lower()
-    
-    if lang == "python":
-        try:
-            # Create a buffer to capture stdout
-            import sys
-            from contextlib import redirect_stdout
-            
-            f = io.StringIO()
-            with redirect_stdout(f):
-                # Execute the code in a restricted namespace
-                exec_globals = {"__builtins__": __builtins__}
-                try:
-                    import pandas as pd
-                    import numpy as np
-                    exec_globals['pd'] = pd
-                    exec_globals['np'] = np
-                except:
-                    pass
-                    
-                exec(request.code, exec_globals)
-                
-            output = f.getvalue()
-            return {"success": True, "output": output if output else "Code executed successfully (no output)."}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    async with exec_scheduler.slot(execution_user(http_request), INTERACTIVE) as queue_ms:
+        response = await run_code_with_usage(request)
+    response["usage"]["queue_ms"] = queue_ms
+    execution_metrics.record("run", request.language.lower(), response["usage"], response["success"])
+    return response
+
+@app.post("/run-code/stream")
+async def run_code_stream(request: CodeExecutionRequest, http_request: Request):
+    """
+    Server-Sent Events version of /run-code.
 
-    elif lang == "javascript":
-        try:
-            # Run node.js subprocess
-            result = subprocess.run(
-                ["node", "-e", request.code], 
-                capture_output=True, 
-                text=True, 
-                timeout=5
-            )
-            if result.returncode == 0:
-                return {"success": True, "output": result.stdout if result.stdout else "Code executed successfully (no output)."}
-            else:
-                 return {"success": False, "error": result.stderr}
-        except Exception as e:
-            return {"success": False, "error": f"Node.js execution failed: {str(e)}"}
-            
-    elif lang == "sql":
-        try:
-            import sqlite3
-            # Create an in-memory database
-            conn = sqlite3.connect(':memory:')
-            cursor = conn.cursor()
-            
-            # Allow multiple statements (e.g., CREATE TABLE; INSERT; SELECT)
-            # separates statements by semi-colon
-            statements = [s for s in request.code.split(';') if s.strip()]
-            
-            output_buffer = []
-            
-            for statement in statements:
-                try:
-                    cursor.execute(statement)
-                    if statement.strip().lower().startswith("select"):
-                        # Fetch results for SELECT queries
-                        rows = cursor.fetchall()
-                        # Get column names
-                        if cursor.description:
-                            columns = [description[0] for description in cursor.description]
-                            output_buffer.append(f"Result for: {statement.strip()[:50]}...")
-                            output_buffer.append(f"{' | '.join(columns)}")
-                            output_buffer.append("-" * 30)
-                            for row in rows:
-                                output_buffer.append(' | '.join(map(str, row)))
-                            output_buffer.append("\n")
-                    else:
-                        conn.commit()
-                        output_buffer.append(f"Executed: {statement.strip()[:50]}... (Rows affected: {cursor.rowcount})")
-                except Exception as stmt_err:
-                     output_buffer.append(f"Error executing statement '{statement.strip()[:30]}...': {str(stmt_err)}")
-            
-            conn.close()
-            final_output = "\n".join(output_buffer)
-            return {"success": True, "output": final_output if final_output else "SQL executed successfully (no text output)."}
-            
-        except Exception as e:
-            return {"success": False, "error": f"SQL execution failed: {str(e)}"}
+    Emits `output` events ({"stream": "stdout" | "stderr", "text": ...}) while the
+    program runs, then a `result` event with the same body /run-code would return.
+    Streamed output stops at the output cap; the result's output still ends with the
+    tail. If the client disconnects, the run is cancelled and its process killed.
+    A run the scheduler cannot queue ends with an unsuccessful `result`.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    user = execution_user(http_request)
 
-    elif lang == "java":
+    async def execute():
         try:
-            # Save code to a temporary file
-            import tempfile
-            import os
-            
-            # Extract class name from code
-            class_name = "Main"
-            for line in request.code.split('\n'):
-                if 'public class' in line:
-                    class_name = line.split('public class')[1].split('{')[0].strip()
-                    break
-            
-            with tempfile.TemporaryDirectory() as tmpdir:
-                java_file = os.path.join(tmpdir, f"{class_name}.java")
-                with open(java_file, 'w') as f:
-                    f.write(request.code)
-                
-                # Compile
-                compile_result = subprocess.run(
-                    ["javac", java_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if compile_result.returncode != 0:
-                    return {"success": False, "error": f"Compilation Error:\n{compile_result.stderr}"}
-                
-                # Run
-                run_result = subprocess.run(
-                    ["java", "-cp", tmpdir, class_name],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                
-                if run_result.returncode == 0:
-                    return {"success": True, "output": run_result.stdout if run_result.stdout else "Code executed successfully (no output)."}
-                else:
-                    return {"success": False, "error": run_result.stderr}
-        except FileNotFoundError:
-            return {"success": False, "error": "Java compiler (javac) not found. Please install JDK to run Java code."}
+            async with exec_scheduler.slot(user, INTERACTIVE) as queue_ms:
+                response = await run_code_with_usage(request, lambda stream, text: queue.put_nowait(("output", (stream, text))))
+            response["usage"]["queue_ms"] = queue_ms
+            execution_metrics.record("run", request.language.lower(), response["usage"], response["success"])
         except Exception as e:
-            return {"success": False, "error": f"Java execution failed: {str(e)}"}
-    
-    elif lang == "cpp" or lang == "c++":
+            response = {"success": False, "error": f"Execution failed: {str(e)}"}
+        queue.put_nowait(("result", response))
+
+    async def events():
+        task = asyncio.ensure_future(execute())
         try:
-            import tempfile
-            import os
+            while True:
+                kind, data = await queue.get()
+                if kind == "result":
+                    yield sse_event("result", data)
+                    return
+                stream, text = data
+                yield sse_event("output", {"stream": stream, "text": text})
+        finally:
+            # Still running only if the client went away
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def run_code_with_usage(request: CodeExecutionRequest, on_output: Optional[OutputCallback] = None) -> dict:
+    usage = {}
+    start = time.perf_counter()
+    response = await execute_code(request, usage, on_output)
+    usage["wall_ms"] = elapsed_ms(start)
+    response["usage"] = usage
+    return response
+
+# Toolchains are probed in the background from startup, and unavailable ones again on use;
+# requests go straight to a runner that can work here
+runners = RunnerRegistry(
+    probe_timeout=float(os.getenv("TOOLCHAIN_PROBE_TIMEOUT", "15")),
+    reprobe_interval=float(os.getenv("TOOLCHAIN_REPROBE_INTERVAL", "60")),
+)
+runners.toolchain("node", "node", "--version")
+runners.toolchain("javac", "javac", "-version")
+runners.toolchain("java", "java", "-version")
+runners.toolchain("g++", "g++", "--version")
+runners.toolchain("dotnet-script", "dotnet", "script", "--version")
+runners.toolchain("csc", "csc", "-version")
+
+def report_toolchains(probe: asyncio.Future):
+    if probe.cancelled() or probe.exception() is not None:
+        return
+    found = [f"{name} ({t.version})" for name, t in runners.toolchains.items() if t.available]
+    missing = [name for name, t in runners.toolchains.items() if not t.available]
+    print(f"Toolchains found: {', '.join(found) or 'none'}; missing: {', '.join(missing) or 'none'}")
+
+@app.on_event("startup")
+async def probe_toolchains():
+    """
+    Runs in the background like model discovery, so a slow toolchain (up to
+    TOOLCHAIN_PROBE_TIMEOUT) does not delay the first /health. Code requests that
+    arrive before it finishes wait for it in runners.ready().
+    """
+    runners.start_probe().add_done_callback(report_toolchains)
+
+@app.get("/runtimes")
+async def runtimes():
+    """
+    Languages /run-code can execute here, the runner each one uses, and what the latest
+    probe of each toolchain found. `status` is "probing" until the startup probe finishes.
+    """
+    return {"success": True, **runners.stats()}
+
+@runners.register("python", label="Python")
+async def run_python_code(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    execution = await python_pool.run(request.code, stdin=request.stdin, on_output=on_output)
+    record_run(usage, execution["usage"])
+    if execution["error"] is not None:
+        return {"success": False, "error": execution["error"]}
+    output = execution["output"]
+    return {"success": True, "output": output if output else "Code executed successfully (no output)."}
+
+@runners.register("javascript", label="JavaScript", requires=["node"],
+                  missing="Node.js not found. Please install Node.js to run JavaScript code.")
+async def run_javascript_code(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    try:
+        # Run in the warm node daemon (or a node.js subprocess if it is not available)
+        result = await run_javascript(request.code, timeout=5, stdin=request.stdin, on_output=on_output)
+        record_run(usage, result.usage)
+        if result.returncode == 0:
+            return {"success": True, "output": result.stdout if result.stdout else "Code executed successfully (no output)."}
+        else:
+             return {"success": False, "error": result.stderr}
+    except Exception as e:
+        return {"success": False, "error": f"Node.js execution failed: {str(e)}"}
+
+@runners.register("java", label="Java", requires=["javac", "java"],
+                  missing="Java compiler (javac) not found. Please install JDK to run Java code.")
+async def run_java_code(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    try:
+        # Extract class name from code
+        class_name = "Main"
+        for line in request.code.split('\n'):
+            if 'public class' in line:
+                class_name = line.split('public class')[1].split('{')[0].strip()
+                break
+        
+        # Compile
+        compile_start = time.perf_counter()
+        class_dir, compile_error = await build_java(request.code, class_name)
+        usage["compile_ms"] = elapsed_ms(compile_start)
+        if compile_error is not None:
+            return {"success": False, "error": f"Compilation Error:\n{compile_error}"}
+        
+        # Run
+        run_result = await run_java(class_dir, class_name, stdin=request.stdin, on_output=on_output)
+        record_run(usage, run_result.usage)
+        
+        if run_result.returncode == 0:
+            return {"success": True, "output": run_result.stdout if run_result.stdout else "Code executed successfully (no output)."}
+        else:
+            return {"success": False, "error": run_result.stderr}
+    except FileNotFoundError:
+        return {"success": False, "error": "Java compiler (javac) not found. Please install JDK to run Java code."}
+    except Exception as e:
+        return {"success": False, "error": f"Java execution failed: {str(e)}"}
+
+@runners.register("cpp", "c++", label="C++", requires=["g++"],
+                  missing="C++ compiler (g++) not found. Please install GCC/MinGW to run C++ code.")
+async def run_cpp_code(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    try:
+        # Compile with g++
+        compile_start = time.perf_counter()
+        build_dir, compile_error = await build_cpp(request.code)
+        usage["compile_ms"] = elapsed_ms(compile_start)
+        if compile_error is not None:
+            return {"success": False, "error": f"Compilation Error:\n{compile_error}"}
+        
+        # Run
+        run_result = await run_process(
+            [os.path.join(build_dir, CPP_EXE_NAME)], timeout=5, input=request.stdin, on_output=on_output
+        )
+        record_run(usage, run_result.usage)
+        
+        if run_result.returncode == 0:
+            return {"success": True, "output": run_result.stdout if run_result.stdout else "Code executed successfully (no output)."}
+        else:
+            return {"success": False, "error": run_result.stderr}
+    except FileNotFoundError:
+        return {"success": False, "error": "C++ compiler (g++) not found. Please install GCC/MinGW to run C++ code."}
+    except Exception as e:
+        return {"success": False, "error": f"C++ execution failed: {str(e)}"}
+
+CSHARP_MISSING = ".NET SDK not found. Please install .NET SDK with the dotnet-script tool (or csc) to run C# code."
+
+@runners.register("csharp", "c#", label="C#", requires=["dotnet-script"], missing=CSHARP_MISSING)
+async def run_csharp_script(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cs_file = os.path.join(tmpdir, "Program.cs")
             
-            with tempfile.TemporaryDirectory() as tmpdir:
-                cpp_file = os.path.join(tmpdir, "main.cpp")
-                exe_file = os.path.join(tmpdir, "main.exe" if os.name == 'nt' else "main")
-                
-                with open(cpp_file, 'w') as f:
-                    f.write(request.code)
-                
-                # Compile with g++
-                compile_result = subprocess.run(
-                    ["g++", cpp_file, "-o", exe_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if compile_result.returncode != 0:
-                    return {"success": False, "error": f"Compilation Error:\n{compile_result.stderr}"}
-                
-                # Run
-                run_result = subprocess.run(
-                    [exe_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                
-                if run_result.returncode == 0:
-                    return {"success": True, "output": run_result.stdout if run_result.stdout else "Code executed successfully (no output)."}
-                else:
-                    return {"success": False, "error": run_result.stderr}
-        except FileNotFoundError:
-            return {"success": False, "error": "C++ compiler (g++) not found. Please install GCC/MinGW to run C++ code."}
-        except Exception as e:
-            return {"success": False, "error": f"C++ execution failed: {str(e)}"}
-    
-    elif lang == "csharp" or lang == "c#":
-        try:
-            import tempfile
-            import os
+            with open(cs_file, 'w') as f:
+                f.write(request.code)
             
-            with tempfile.TemporaryDirectory() as tmpdir:
-                cs_file = os.path.join(tmpdir, "Program.cs")
-                
-                with open(cs_file, 'w') as f:
-                    f.write(request.code)
-                
-                # Try to compile and run with dotnet
-                compile_result = subprocess.run(
-                    ["dotnet", "script", cs_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=10,
-                    cwd=tmpdir
+            # dotnet script compiles and runs in one go, so it all counts as run time
+            async with compile_slots():
+                compile_result = await run_process(
+                    ["dotnet", "script", cs_file], timeout=10, cwd=tmpdir, input=request.stdin, on_output=on_output
                 )
-                
-                if compile_result.returncode == 0:
-                    return {"success": True, "output": compile_result.stdout if compile_result.stdout else "Code executed successfully (no output)."}
-                else:
-                    # If dotnet script fails, try csc (C# compiler)
-                    try:
-                        exe_file = os.path.join(tmpdir, "program.exe")
-                        compile_csc = subprocess.run(
-                            ["csc", f"/out:{exe_file}", cs_file],
-                            capture_output=True,
-                            text=True,
-                            timeout=10
-                        )
-                        
-                        if compile_csc.returncode != 0:
-                            return {"success": False, "error": f"Compilation Error:\n{compile_csc.stderr}"}
-                        
-                        run_result = subprocess.run(
-                            [exe_file],
-                            capture_output=True,
-                            text=True,
-                            timeout=5
-                        )
-                        
-                        if run_result.returncode == 0:
-                            return {"success": True, "output": run_result.stdout if run_result.stdout else "Code executed successfully (no output)."}
-                        else:
-                            return {"success": False, "error": run_result.stderr}
-                    except FileNotFoundError:
-                        return {"success": False, "error": compile_result.stderr if compile_result.stderr else "C# compiler not found. Please install .NET SDK to run C# code."}
-        except FileNotFoundError:
-            return {"success": False, "error": ".NET SDK not found. Please install .NET SDK to run C# code."}
-        except Exception as e:
-            return {"success": False, "error": f"C# execution failed: {str(e)}"}
-    
-    elif lang == "html":
-        # For HTML, we'll validate and return a preview message
-        try:
-            from html.parser import HTMLParser
-            
-            class HTMLValidator(HTMLParser):
-                def __init__(self):
-                    super().__init__()
-                    self.errors = []
-                
-                def error(self, message):
-                    self.errors.append(message)
+            record_run(usage, compile_result.usage)
             
-            validator = HTMLValidator()
-            validator.feed(request.code)
-            
-            if validator.errors:
-                return {"success": False, "error": f"HTML Validation Errors:\n" + "\n".join(validator.errors)}
-            
-            # Count elements
-            tag_count = request.code.count('<')
-            
-            return {
-                "success": True, 
-                "output": f"✓ HTML code validated successfully!\n\nStats:\n- Total tags: {tag_count}\n- Length: {len(request.code)} characters\n\nNote: To see the rendered output, save this as an .html file and open in a browser."
-            }
-        except Exception as e:
-            return {"success": False, "error": f"HTML validation failed: {str(e)}"}
-    
-    elif lang == "css":
-        # For CSS, we'll validate syntax
-        try:
-            import re
-            
-            # Basic CSS validation
-            # Check for balanced braces
-            open_braces = request.code.count('{')
-            close_braces = request.code.count('}')
+            if compile_result.returncode == 0:
+                return {"success": True, "output": compile_result.stdout if compile_result.stdout else "Code executed successfully (no output)."}
+            else:
+                return {"success": False, "error": compile_result.stderr or compile_result.stdout}
+    except FileNotFoundError:
+        return {"success": False, "error": CSHARP_MISSING}
+    except Exception as e:
+        return {"success": False, "error": f"C# execution failed: {str(e)}"}
+
+@runners.register("csharp", "c#", label="C#", requires=["csc"], missing=CSHARP_MISSING)
+async def run_csharp_csc(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    try:
+        # A csc build from an earlier run of the same source skips the compiler
+        cache_key = compile_cache.key("csharp", request.code, CSC_FLAGS)
+        build_dir = compile_cache.get(cache_key)
+        if build_dir is not None:
+            return await run_csharp_executable(os.path.join(build_dir, "program.exe"), usage, stdin=request.stdin, on_output=on_output)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cs_file = os.path.join(tmpdir, "Program.cs")
+            exe_file = os.path.join(tmpdir, "program.exe")
             
-            if open_braces != close_braces:
-                return {"success": False, "error": f"CSS Syntax Error: Unbalanced braces ({{ {open_braces}, }} {close_braces})"}
+            with open(cs_file, 'w') as f:
+                f.write(request.code)
             
-            # Count rules
-            rules = request.code.count('{')
+            async with compile_slots():
+                compile_csc = await run_process(["csc", *CSC_FLAGS, f"/out:{exe_file}", cs_file], timeout=10)
+            usage["compile_ms"] = compile_csc.usage["wall_ms"]
             
-            # Count properties (approximate)
-            properties = len(re.findall(r'[\w-]+\s*:', request.code))
+            if compile_csc.returncode != 0:
+                return {"success": False, "error": f"Compilation Error:\n{compile_csc.stderr or compile_csc.stdout}"}
             
-            return {
-                "success": True,
-                "output": f"✓ CSS code validated successfully!\n\nStats:\n- CSS Rules: {rules}\n- Properties: {properties}\n- Length: {len(request.code)} characters\n\nNote: To see the styling in action, apply this CSS to an HTML file."
-            }
-        except Exception as e:
-            return {"success": False, "error": f"CSS validation failed: {str(e)}"}
-    
-    else:
-        return {"success": False, "error": f"Execution for '{lang}' is not supported in this environment yet. Supported languages: Python, JavaScript, Java, C++, C#, SQL, HTML, CSS."}
+            build_dir = compile_cache.put(cache_key, [exe_file])
+            return await run_csharp_executable(os.path.join(build_dir, "program.exe"), usage, stdin=request.stdin, on_output=on_output)
+    except FileNotFoundError:
+        return {"success": False, "error": CSHARP_MISSING}
+    except Exception as e:
+        return {"success": False, "error": f"C# execution failed: {str(e)}"}
+
+@runners.register("sql", label="SQL")
+async def run_sql_code(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    try:
+        execution = await run_sql(request.code, request.fixture)
+        record_run(usage, execution["usage"])
+        if execution["error"] is not None:
+            return {"success": False, "error": execution["error"]}
+        final_output = execution["output"]
+        response = {"success": True, "output": final_output if final_output else "SQL executed successfully (no text output)."}
+        if execution["result"] is not None:
+            response["result"] = execution["result"]
+        return response
+        
+    except Exception as e:
+        return {"success": False, "error": f"SQL execution failed: {str(e)}"}
+
+@runners.register("html", label="HTML")
+async def run_html_code(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    # For HTML, we'll validate and return a preview message
+    try:
+        from html.parser import HTMLParser
+
+        class HTMLValidator(HTMLParser):
+            def __init__(self):
+                super().__init__()
+                self.errors = []
+
+            def error(self, message):
+                self.errors.append(message)
+
+        validator = HTMLValidator()
+        validator.feed(request.code)
+
+        if validator.errors:
+            return {"success": False, "error": f"HTML Validation Errors:\n" + "\n".join(validator.errors)}
+
+        # Count elements
+        tag_count = request.code.count('<')
+
+        return {
+            "success": True, 
+            "output": f"✓ HTML code validated successfully!\n\nStats:\n- Total tags: {tag_count}\n- Length: {len(request.code)} characters\n\nNote: To see the rendered output, save this as an .html file and open in a browser."
+        }
+    except Exception as e:
+        return {"success": False, "error": f"HTML validation failed: {str(e)}"}
+
+@runners.register("css", label="CSS")
+async def run_css_code(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback]) -> dict:
+    # For CSS, we'll validate syntax
+    try:
+        import re
+
+        # Basic CSS validation
+        # Check for balanced braces
+        open_braces = request.code.count('{')
+        close_braces = request.code.count('}')
+
+        if open_braces != close_braces:
+            return {"success": False, "error": f"CSS Syntax Error: Unbalanced braces ({{ {open_braces}, }} {close_braces})"}
+
+        # Count rules
+        rules = request.code.count('{')
+
+        # Count properties (approximate)
+        properties = len(re.findall(r'[\w-]+\s*:', request.code))
+
+        return {
+            "success": True,
+            "output": f"✓ CSS code validated successfully!\n\nStats:\n- CSS Rules: {rules}\n- Properties: {properties}\n- Length: {len(request.code)} characters\n\nNote: To see the styling in action, apply this CSS to an HTML file."
+        }
+    except Exception as e:
+        return {"success": False, "error": f"CSS validation failed: {str(e)}"}
+
+async def execute_code(request: CodeExecutionRequest, usage: dict, on_output: Optional[OutputCallback] = None) -> dict:
+    """
+    Runs the submission with its language's runner, filling in `usage` as it goes. With
+    `on_output`, the program's output is also passed to it as (stream, text) while it
+    runs; SQL and HTML, which finish in one step, only return theirs in the response.
+    """
+    lang = request.language.lower()
+    await runners.ready(lang)
+    runner, unavailable = runners.resolve(lang)
+    if runner is None:
+        return {"success": False, "error": unavailable or f"Execution for '{lang}' is not supported in this environment yet. Supported languages: {', '.join(runners.labels())}."}
+    return await runner.run(request, usage, on_output)
+
+# Rendered flowcharts by (goal, steps, theme, format); PNGs are rasterized in worker processes
+FLOWCHART_MAX_AGE = int(os.getenv("FLOWCHART_MAX_AGE", "86400"))
+flowchart_renderer = FlowchartRenderer(
+    workers=int(os.getenv("FLOWCHART_RENDER_WORKERS", "2")),
+    cache_size=int(os.getenv("FLOWCHART_CACHE_SIZE", "256")),
+)
+
+@app.on_event("shutdown")
+async def stop_flowchart_renderer():
+    flowchart_renderer.shutdown()
+
+def check_flowchart_options(theme: str, format: str):
+    if theme not in THEMES:
+        raise HTTPException(status_code=400, detail=f"Unknown theme '{theme}'. Available: {', '.join(THEMES)}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Available: {', '.join(FORMATS)}")
+
+def flowchart_steps(steps: Optional[List[str]], path: Optional[str] = None) -> List[str]:
+    """Explicit steps, else the phases of `path` (a learning path's markdown), else DEFAULT_STEPS."""
+    steps = [step.strip() for step in steps if step.strip()] if steps else []
+    if not steps and path:
+        steps = path_outline(path)["steps"]
+    return steps or DEFAULT_STEPS
 
 @app.get("/generate-flowchart")
-async def generate_flowchart(goal: str = "Learning Path"):
-    
-    # Matplotlib logic from user snippet
-    fig, ax = plt.subplots(figsize=(12, 8))
-    ax.set_xlim(0, 1)
-    ax.set_ylim(0, 1)
-    ax.set_facecolor('#0f172a')
-    fig.patch.set_facecolor('#0f172a')
-    
-    # Draw a winding path
-    x = np.linspace(0.1, 0.9, 100)
-    y = 0.5 + 0.2 * np.sin(x * 10)
-    ax.plot(x, y, color='white', linewidth=4, alpha=0.6)
-    
-    steps = ["Identify Skills", "Resources", "AI Adoption", "Resume", "Dashboard"]
-    colors = ["#3b82f6", "#10b981", "#10b981", "#f59e0b", "#f97316"]
-    
-    for i, (step, color) in enumerate(zip(steps, colors)):
-        px, py = 0.15 + i*0.18, 0.5 + 0.2 * np.sin((0.15 + i*0.18) * 10)
-        circle = Circle((px, py), 0.05, color=color, alpha=0.9)
-        ax.add_patch(circle)
-        ax.text(px, py-0.12, step, color='white', ha='center', fontsize=10, weight='bold')
-
-    ax.axis('off')
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    plt.close()
-    buf.seek(0)
-    
-    return StreamingResponse(buf, media_type="image/png")
+async def generate_flowchart(request: Request, goal: str = "Learning Path", steps: Optional[List[str]] = Query(None),
+                             theme: str = "dark", format: str = "svg"):
+    """
+    The learning path drawn as a winding road with one stop per step (`steps` may be
+    repeated; pass the path outline's "steps" to draw its phases, otherwise
+    DEFAULT_STEPS) and the goal as its title. SVG by default; `format=png` rasterizes
+    with matplotlib.
+
+    The image depends only on the query, so the response carries a strong ETag (the
+    render cache key) and may be cached by the browser; a matching If-None-Match gets
+    304 without rendering.
+    """
+    check_flowchart_options(theme, format)
+    steps = flowchart_steps(steps)
+    etag = f'"{flowchart_key(goal, steps, theme, format)}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={FLOWCHART_MAX_AGE}"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    _, image = await flowchart_renderer.render(goal, steps, theme, format)
+    return Response(content=image, media_type=FORMATS[format], headers=headers)
+
+FLOWCHART_BATCH_MAX = int(os.getenv("FLOWCHART_BATCH_MAX", "200"))
+
+class FlowchartSpec(BaseModel):
+    goal: str = "Learning Path"
+    steps: Optional[List[str]] = None
+    # A learning path's markdown; its phases become the steps when `steps` is not given
+    path: Optional[str] = None
+
+class FlowchartBatchRequest(BaseModel):
+    charts: List[FlowchartSpec]
+    theme: str = "dark"
+    format: str = "svg"
+
+@app.post("/generate-flowchart/batch")
+async def generate_flowchart_batch(request: FlowchartBatchRequest):
+    """
+    Renders many flowcharts (one per user, say) in one call. Each chart comes back with
+    its steps and ETag; the image is SVG markup, or base64 for PNG. Charts share the
+    render cache with GET /generate-flowchart, and PNGs are rendered concurrently in
+    the pool.
+    """
+    check_flowchart_options(request.theme, request.format)
+    if len(request.charts) > FLOWCHART_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {FLOWCHART_BATCH_MAX} charts per batch")
+
+    async def render_chart(spec: FlowchartSpec) -> dict:
+        steps = flowchart_steps(spec.steps, spec.path)
+        key, image = await flowchart_renderer.render(spec.goal, steps, request.theme, request.format)
+        return {
+            "goal": spec.goal,
+            "steps": steps,
+            "etag": f'"{key}"',
+            "image": image.decode("utf-8") if request.format == "svg" else base64.b64encode(image).decode("ascii"),
+        }
+
+    charts = await asyncio.gather(*(render_chart(spec) for spec in request.charts))
+    return {"success": True, "media_type": FORMATS[request.format], "charts": charts}
 
 @app.post("/generate-resume")
 async def generate_resume(request: Dict):
@@ -1502,8 +2269,7 @@ async def generate_resume(request: Dict):
         7. Make it professional yet personal and authentic
         """
         
-        response = model.generate_content(prompt)
-        text = response.text
+        text = await llm.generate(prompt)
         # Clean up possible markdown code blocks
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0].strip()
@@ -1512,6 +2278,8 @@ async def generate_resume(request: Dict):
             
         resume_data = json.loads(text)
         return {"success": True, "resume": resume_data}
+    except QuotaExceeded:
+        raise
     except Exception as e:
         print(f"Resume generation error: {str(e)}")
         # Return a fallback structured resume with all user details
@@ -1599,8 +2367,7 @@ async def process_voice_command(request: VoiceCommandRequest):
         - Example: "Open this page" (if ambiguous) -> {{ "type": "chat", "response": "Which page would you like me to open, sir? I can access the Dashboard, IDE, Profile, or Learning Path." }}
         """
 
-        response = model.generate_content(prompt)
-        text = response.text
+        text = await llm.generate(prompt)
         # Clean markdown
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0].strip()
@@ -1608,10 +2375,114 @@ async def process_voice_command(request: VoiceCommandRequest):
             text = text.split("```")[1].split("```")[0].strip()
             
         return json.loads(text)
+    except QuotaExceeded:
+        raise
     except Exception as e:
         print(f"Voice Command Error: {e}")
         return {"type": "chat", "response": "Processing error, sir. Please repeat."}
 
+# --- Async job API ---
+# Long generations can be submitted as jobs so clients poll or subscribe instead of holding a connection open
+job_manager = JobManager(
+    workers=int(os.getenv("JOB_WORKERS", "8")),
+    max_queue=int(os.getenv("JOB_QUEUE_SIZE", "1000")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", "3600")),
+)
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_manager.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_manager.stop()
+
+def submit_job(kind: str, run) -> dict:
+    try:
+        job = job_manager.submit(kind, run)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Job queue is full: {e}")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+@app.post("/jobs/generate-path", status_code=202)
+async def submit_generate_path_job(request: PathRequest):
+    return submit_job("generate-path", lambda: generate_path(request))
+
+@app.post("/jobs/generate-resume", status_code=202)
+async def submit_generate_resume_job(request: Dict):
+    return submit_job("generate-resume", lambda: generate_resume(request))
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or its result has expired")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """SSE stream of `status` events for a job; the last one carries the result or error."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or its result has expired")
+
+    async def events():
+        while True:
+            # Grab the event before yielding so a change during the send is not missed
+            changed = job.changed
+            yield sse_event("status", job.to_dict())
+            if job.finished:
+                return
+            await changed.wait()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Off by default so a cold start serves /health as soon as possible; set AI_WARMUP=1 to pay for the
+# heavy imports before the first request instead of during it
+AI_WARMUP = os.getenv("AI_WARMUP", "0") == "1"
+warmup_ms: Dict[str, float] = {}
+
+@app.on_event("startup")
+async def warmup():
+    """
+    Preloads what the endpoints otherwise load on first use: the Gemini SDK, the
+    semantic goal index (numpy), the Python workers (numpy/pandas) and the PNG
+    flowchart processes (matplotlib), and waits for the toolchain probe. Startup hooks finish before uvicorn accepts
+    connections, so with AI_WARMUP=1 the first /health answer means all of it is loaded.
+    """
+    if not AI_WARMUP:
+        return
+    loop = asyncio.get_running_loop()
+
+    async def timed(name: str, awaitable):
+        start = time.perf_counter()
+        try:
+            await awaitable
+        except Exception as e:
+            print(f"Warmup of {name} failed; it will load on first use: {e}")
+        warmup_ms[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    steps = [
+        timed("gemini", loop.run_in_executor(None, load_module, genai)),
+        timed("python_pool", python_pool.warmup()),
+        timed("flowchart", flowchart_renderer.warmup()),
+        timed("toolchains", runners.ready()),
+    ]
+    if semantic_cache is not None:
+        steps.append(timed("semantic_cache", loop.run_in_executor(None, lambda: semantic_cache.index)))
+    start = time.perf_counter()
+    await asyncio.gather(*steps)
+    print(f"Warmup done in {(time.perf_counter() - start) * 1000:.0f} ms: {warmup_ms}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
@@ -0,0 +1,190 @@
+import re
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# google.api_core exception classes by name, for instances whose .code is not set
+STATUS_BY_ERROR_CLASS = {
+    "TooManyRequests": 429,
+    "ResourceExhausted": 429,
+    "NotFound": 404,
+    "InternalServerError": 500,
+    "BadGateway": 502,
+    "ServiceUnavailable": 503,
+    "GatewayTimeout": 504,
+    "DeadlineExceeded": 504,
+}
+
+# The SDK formats its errors as "<status> <message>"
+STATUS_PREFIX = re.compile(r"^(\d{3})\b")
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """
+    HTTP status of a Gemini SDK error, if any: google.api_core exceptions carry it as
+    .code (and by class), and SDK messages start with it. Numbers elsewhere in a
+    message ("... 500 tokens ...") are not statuses.
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    for cls in type(error).__mro__:
+        if cls.__name__ in STATUS_BY_ERROR_CLASS:
+            return STATUS_BY_ERROR_CLASS[cls.__name__]
+    match = STATUS_PREFIX.match(str(error))
+    return int(match.group(1)) if match else None
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """429, 5xx and unknown-model (404) errors are the model's fault; another model may succeed."""
+    status = error_status(error)
+    return status is not None and (status == 429 or status == 404 or status >= 500)
+
+
+class ModelHealth:
+    """Rolling latency/error window and circuit breaker state for one model."""
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.trips = 0
+        self.probing = False
+        self.last_error = None
+
+    @property
+    def error_rate(self) -> float:
+        return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    @property
+    def avg_latency(self) -> Optional[float]:
+        return (sum(self.latencies) / len(self.latencies)) if self.latencies else None
+
+    def score(self) -> float:
+        # Untried models score 0 so they get sampled; errors inflate the effective latency
+        latency = self.avg_latency or 0.0
+        return latency * (1.0 + 4.0 * self.error_rate)
+
+    def to_dict(self) -> dict:
+        avg = self.avg_latency
+        return {
+            "state": self.state,
+            "avg_latency_ms": round(avg * 1000, 1) if avg is not None else None,
+            "error_rate": round(self.error_rate, 4),
+            "samples": len(self.outcomes),
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "cooldown_s": self.cooldown if self.state != CLOSED else 0,
+            "last_error": self.last_error,
+        }
+
+
+class ModelRouter:
+    """
+    Ordered pool of Gemini models with per-model health tracking.
+
+    Calls go to the fastest healthy model first. A model whose calls keep failing
+    with 429/5xx has its circuit opened for a cooldown that doubles on each repeat
+    trip; after the cooldown one probe request is let through (half-open) and its
+    result decides whether the circuit closes again. A 404 (model not served for
+    this key) opens the circuit immediately.
+    """
+
+    def __init__(self, models: Dict[str, object], failure_threshold: int = 3, cooldown: float = 30.0,
+                 max_cooldown: float = 600.0, window: int = 50, factory: Optional[Callable[[str], object]] = None):
+        # A model mapped to None is built by `factory` the first time it is picked
+        self.models = dict(models)
+        self.factory = factory
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.health = {name: ModelHealth(name, window) for name in self.models}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_names(cls, names: Iterable[str], factory: Callable[[str], object], **kwargs) -> "ModelRouter":
+        """Models are built on first use, so creating the router does not import the Gemini SDK."""
+        return cls(dict.fromkeys(names), factory=factory, **kwargs)
+
+    def model(self, name: str) -> object:
+        model = self.models[name]
+        if model is None:
+            model = self.models[name] = self.factory(name)
+        return model
+
+    def candidates(self) -> List[Tuple[str, object]]:
+        """Models to try for the next call, best first. Empty when every circuit is open."""
+        now = time.monotonic()
+        closed, probes = [], []
+        with self._lock:
+            for order, (name, health) in enumerate(self.health.items()):
+                if health.state == OPEN and now - health.opened_at >= health.cooldown:
+                    health.state = HALF_OPEN
+                    health.probing = False
+                if health.state == CLOSED:
+                    closed.append((health.score(), order, name))
+                elif health.state == HALF_OPEN and not health.probing:
+                    health.probing = True
+                    probes.append((health.score(), order, name))
+        # A recovering model gets one real request first; if it fails the call falls through to a healthy model
+        ranked = sorted(probes) + sorted(closed)
+        return [(name, self.model(name)) for _, _, name in ranked]
+
+    def record_success(self, name: str, latency: Optional[float] = None):
+        with self._lock:
+            health = self.health[name]
+            if latency is not None:
+                health.latencies.append(latency)
+            health.outcomes.append(True)
+            health.consecutive_failures = 0
+            if health.state != CLOSED:
+                health.state = CLOSED
+                health.cooldown = 0.0
+            health.probing = False
+
+    def record_failure(self, name: str, error: Exception):
+        with self._lock:
+            health = self.health[name]
+            health.outcomes.append(False)
+            health.consecutive_failures += 1
+            health.last_error = str(error)[:200]
+            health.probing = False
+            if health.state == OPEN:
+                # A call that started before the trip; the circuit is already open
+                return
+            if (health.state == HALF_OPEN or error_status(error) == 404
+                    or health.consecutive_failures >= self.failure_threshold):
+                self._trip(health)
+
+    def release_probe(self, name: str):
+        """Frees a half-open model's probe slot when the call never reached it."""
+        with self._lock:
+            self.health[name].probing = False
+
+    def _trip(self, health: ModelHealth):
+        health.cooldown = min(self.max_cooldown, health.cooldown * 2 if health.cooldown else self.base_cooldown)
+        health.state = OPEN
+        health.opened_at = time.monotonic()
+        health.trips += 1
+
+    def mark_unavailable(self, names: Iterable[str]):
+        """Opens the circuit for models that model discovery says this key cannot use."""
+        with self._lock:
+            for name in names:
+                if name in self.health:
+                    self.health[name].last_error = "not listed by models.list"
+                    self._trip(self.health[name])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: health.to_dict() for name, health in self.health.items()}
@@ -0,0 +1,116 @@
+"""
+Bounded capture of program output for /run-code and /evaluate-code.
+
+A program printing in a tight loop must not grow server memory (or the JSON response)
+without limit, so captures keep only the first and last halves of `max_bytes` and
+count what falls in between. The dropped middle is replaced by a marker line saying
+how much was omitted. Used by process_runner for subprocess pipes and by
+sandbox_worker for Python's redirected stdout; the Node and JVM runners implement
+the same policy.
+"""
+import io
+import os
+import time
+from typing import Callable, Optional
+
+# Per stream; 0 disables the cap
+OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_BYTES", str(256 * 1024)))
+
+# Receives ("stdout" | "stderr", text) as a program writes
+OutputCallback = Callable[[str, str], None]
+
+
+def truncation_marker(omitted: int) -> str:
+    return f"\n... [{omitted} bytes of output omitted] ...\n"
+
+
+class OutputCapture:
+    """Keeps the head and tail of a byte stream within `max_bytes` in total."""
+
+    def __init__(self, max_bytes: int = OUTPUT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.head_limit = max_bytes - max_bytes // 2
+        self.tail_limit = max_bytes // 2
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes) -> bool:
+        """Adds `data`; returns False once output is being dropped (the head is full)."""
+        self.total += len(data)
+        if not self.max_bytes:
+            self.head += data
+            return True
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            # bytearray deletes from the front without copying the rest
+            del self.tail[:max(0, len(self.tail) - self.tail_limit)]
+        return self.total <= self.max_bytes
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.head) + len(self.tail)
+
+    def getvalue(self) -> bytes:
+        if not self.truncated:
+            return bytes(self.head + self.tail)
+        omitted = self.total - len(self.head) - len(self.tail)
+        return bytes(self.head) + truncation_marker(omitted).encode("utf-8") + bytes(self.tail)
+
+    def text(self) -> str:
+        return self.getvalue().decode("utf-8", errors="replace")
+
+
+class TextCapture(io.TextIOBase):
+    """
+    File-like text sink over an OutputCapture, for redirect_stdout/redirect_stderr.
+
+    With `on_output`, captured text is also passed on in batches (every `flush_bytes`
+    or `flush_interval` seconds, and on flush) until the cap is reached; what comes
+    after only shows up in the tail of the final output.
+    """
+
+    def __init__(self, max_bytes: int = OUTPUT_MAX_BYTES, on_output: Optional[Callable[[str], None]] = None,
+                 flush_bytes: int = 4096, flush_interval: float = 0.05):
+        super().__init__()
+        self.capture = OutputCapture(max_bytes)
+        self.on_output = on_output
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
+        self._streaming = on_output is not None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        data = text.encode("utf-8", errors="replace")
+        within_cap = self.capture.write(data)
+        if self._streaming:
+            if within_cap:
+                self._pending.append(text)
+                self._pending_size += len(data)
+                if self._pending_size >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+                    self.flush()
+            else:
+                # Over the cap: send what was kept of the head and stop streaming
+                self.flush()
+                self._streaming = False
+        return len(text)
+
+    def flush(self):
+        if self._pending and self.on_output is not None:
+            self.on_output("".join(self._pending))
+        self._pending = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
+
+    def getvalue(self) -> str:
+        self.flush()
+        return self.capture.text()
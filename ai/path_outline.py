@@ -0,0 +1,93 @@
+"""
+Structure of a generated learning path: its phases and week-by-week milestones.
+
+The path is markdown written by Gemini or taken from a curated fallback, and the
+heading style varies between them ("#### 1. Phase 1: Foundations (Weeks 1-8)" vs
+"### 📘 **Phase 1: Foundations** (Weeks 1-8)"). parse_path_outline reads both. The
+outline is a plain JSON-able dict, so it can be cached next to the path and stored
+with the user's saved paths; flowcharts and other views read it instead of the markdown.
+"""
+import re
+from typing import List, Optional
+
+# Part of the outline cache key; bump it whenever the parser's output changes
+PARSER_VERSION = "1"
+
+HEADING = re.compile(r"^\s*(#{1,6})\s+(.*)$")
+PHASE = re.compile(r"\bPhase\s+(\d+)\s*[:.\-–—]?\s*(.*)$", re.IGNORECASE)
+WEEKS = re.compile(r"\(?\s*\bWeeks?\s+(\d+)(?:\s*(?:[-–—]|to)\s*(\d+))?\s*\)?", re.IGNORECASE)
+MILESTONE_ITEM = re.compile(r"^\s*(?:\d+\.|[-*])\s+(.*)$")
+# "**🏁 Milestone Project:** ...", "*   **Focus:** ..."
+FIELD = re.compile(r"^\s*(?:[-*]\s+)?\**\s*\W*\s*(Focus|Milestone Project|Capstone Project)\s*:\s*\**\s*:?\s*(.*)$",
+                   re.IGNORECASE)
+
+
+def clean(text: str) -> str:
+    """Drops markdown emphasis and leading emoji or bullets from a heading or list item."""
+    text = re.sub(r"[*_`]+", "", text)
+    return re.sub(r"^[^\w(\[]+", "", text).strip(" :-–—")
+
+
+def week_range(text: str) -> Optional[List[int]]:
+    match = WEEKS.search(text)
+    if match is None:
+        return None
+    start = int(match.group(1))
+    return [start, int(match.group(2) or start)]
+
+
+def parse_path_outline(markdown: str) -> dict:
+    """
+    {"phases": [{"number", "title", "weeks", "focus", "milestone"}], "milestones":
+    [{"weeks", "text"}], "steps": [...]}. `weeks` is [first, last] or None; `steps` are
+    the flowchart labels, one per phase (or per milestone when there are no phases).
+    """
+    phases: List[dict] = []
+    milestones: List[dict] = []
+    phase = None
+    phase_level = 0
+    for line in markdown.splitlines():
+        heading = HEADING.match(line)
+        if heading:
+            level, text = len(heading.group(1)), clean(heading.group(2))
+            match = PHASE.search(text)
+            if match:
+                title = clean(WEEKS.sub("", match.group(2)))
+                phase = {"number": int(match.group(1)), "title": title or f"Phase {match.group(1)}",
+                         "weeks": week_range(text), "focus": None, "milestone": None}
+                phase_level = level
+                phases.append(phase)
+            elif phase is not None and level <= phase_level:
+                phase = None
+            continue
+
+        field = FIELD.match(line)
+        if phase is not None and field:
+            name, value = field.group(1).lower(), clean(field.group(2))
+            key = "focus" if name == "focus" else "milestone"
+            if value and phase[key] is None:
+                phase[key] = value
+            continue
+
+        item = MILESTONE_ITEM.match(line)
+        if item and re.match(r"\W*Weeks?\s+\d", item.group(1).lstrip("*_ "), re.IGNORECASE):
+            weeks = week_range(item.group(1))
+            text = clean(re.sub(r"^.*?\bWeeks?\s+\d+(?:\s*(?:[-–—]|to)\s*\d+)?\s*\**\s*:?\s*\**", "", item.group(1),
+                                count=1, flags=re.IGNORECASE))
+            if text:
+                milestones.append({"weeks": weeks, "text": text})
+
+    return {"phases": phases, "milestones": milestones, "steps": outline_steps(phases, milestones)}
+
+
+def outline_steps(phases: List[dict], milestones: List[dict]) -> List[str]:
+    def label(text: str, weeks: Optional[List[int]]) -> str:
+        if weeks is None:
+            return text
+        span = f"Week {weeks[0]}" if weeks[0] == weeks[1] else f"Weeks {weeks[0]}-{weeks[1]}"
+        return f"{text} ({span})"
+
+    if phases:
+        return [label(phase["title"], phase["weeks"]) for phase in phases]
+    # Milestone text is a whole sentence; keep the flowchart labels short
+    return [label(" ".join(m["text"].split()[:4]), m["weeks"]) for m in milestones[:8]]
@@ -0,0 +1,258 @@
+import os
+import sys
+import time
+import signal
+import codecs
+import asyncio
+import tempfile
+import subprocess
+from typing import Callable, List, Optional
+
+from output_capture import OUTPUT_MAX_BYTES, OutputCapture
+
+
+class ProcessResult(subprocess.CompletedProcess):
+    """CompletedProcess plus `usage`: what the run cost (see usage_from_rusage)."""
+
+    def __init__(self, args, returncode, stdout, stderr, usage: dict):
+        super().__init__(args, returncode, stdout, stderr)
+        self.usage = usage
+
+
+# Linux: a forked child's ru_maxrss starts at the server's own RSS and survives exec, so
+# the child's peak is sampled from /proc instead
+SAMPLE_PEAK_RSS = os.path.exists("/proc/self/status")
+
+
+def usage_from_rusage(rusage, wall: float, peak_rss_kb: Optional[int]) -> dict:
+    usage = {
+        "wall_ms": round(wall * 1000, 1),
+        "cpu_user_ms": round(rusage.ru_utime * 1000, 1),
+        "cpu_sys_ms": round(rusage.ru_stime * 1000, 1),
+    }
+    if not SAMPLE_PEAK_RSS:
+        # ru_maxrss is bytes on macOS
+        peak_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    if peak_rss_kb is not None:
+        usage["peak_rss_kb"] = peak_rss_kb
+    return usage
+
+
+def _peak_rss_kb(pid: int) -> Optional[int]:
+    """VmHWM of a running process (its own peak RSS since exec), or None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _kill_tree(pid: int):
+    try:
+        if os.name == "posix":
+            # The child leads its own session, so this also takes out anything it spawned
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+# How long to keep reading after the child exits, for output still buffered in the pipes
+DRAIN_TIMEOUT = 1.0
+
+
+async def _read_pipe(pipe, capture: OutputCapture, name: str, on_output: Optional[Callable[[str, str], None]]):
+    """Reads `pipe` into `capture`, passing text to `on_output` until the capture starts dropping output."""
+    reader = asyncio.StreamReader()
+    transport, _ = await asyncio.get_running_loop().connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            streaming = on_output is not None and capture.total <= capture.max_bytes
+            head_room = capture.head_limit - len(capture.head)
+            if not capture.write(chunk) and capture.max_bytes:
+                # Over the cap: pass on the part that made it into the head, then stop
+                chunk = chunk[:head_room] if streaming else b""
+            if streaming and chunk:
+                text = decoder.decode(chunk)
+                if text:
+                    on_output(name, text)
+    finally:
+        transport.close()
+
+
+async def _drain(readers: asyncio.Future):
+    # A grandchild that escaped the process group could keep the pipes open indefinitely
+    await asyncio.wait([readers], timeout=DRAIN_TIMEOUT)
+    readers.cancel()
+    await asyncio.gather(readers, return_exceptions=True)
+
+
+# Longest gap between two /proc samples of a running child's peak RSS (the first ones come sooner)
+RSS_SAMPLE_INTERVAL = 0.02
+
+
+async def _sample_peak_rss(pid: int, peak: List[Optional[int]]):
+    """Keeps peak[0] at the highest VmHWM seen for `pid` until cancelled."""
+    delay = 0.001
+    while True:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RSS_SAMPLE_INTERVAL)
+        sample = _peak_rss_kb(pid)
+        if sample is not None:
+            peak[0] = max(peak[0] or 0, sample)
+
+
+async def _wait4(pid: int):
+    """
+    wait4(pid) without blocking the event loop. Where pidfds exist (Linux 5.3+), the
+    loop is woken when the child exits; elsewhere the child is polled with WNOHANG.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    if pidfd is not None:
+        exited = loop.create_future()
+        try:
+            loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        except NotImplementedError:
+            # An event loop without add_reader
+            os.close(pidfd)
+        else:
+            try:
+                await exited
+            finally:
+                loop.remove_reader(pidfd)
+                os.close(pidfd)
+            return os.wait4(pid, 0)
+
+    delay = 0.001
+    while True:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.02)
+        result = os.wait4(pid, os.WNOHANG)
+        if result[0]:
+            return result
+
+
+async def _reap(process: subprocess.Popen):
+    """
+    Waits for the child with wait4, which also returns its (and its waited-for children's)
+    rusage. Returns (rusage, peak RSS in KiB or None). The peak is sampled from /proc on
+    its own timer while the child runs, so growth in the last sample interval before exit
+    is missed, and it is None for a process that exits before the first sample.
+    """
+    peak: List[Optional[int]] = [None]
+    sampler = asyncio.ensure_future(_sample_peak_rss(process.pid, peak)) if SAMPLE_PEAK_RSS else None
+    try:
+        _, status, rusage = await _wait4(process.pid)
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage, peak[0]
+
+
+async def run_process(args: List[str], timeout: float, cwd: Optional[str] = None, input: Optional[str] = None,
+                      max_output: int = OUTPUT_MAX_BYTES,
+                      on_output: Optional[Callable[[str, str], None]] = None) -> ProcessResult:
+    """
+    Async equivalent of subprocess.run(args, capture_output=True, text=True, timeout=timeout).
+
+    The event loop keeps serving other requests while the process runs. On timeout (or
+    if the awaiting request is cancelled) the process and its children are killed and
+    reaped before subprocess.TimeoutExpired (or CancelledError) propagates. Raises
+    FileNotFoundError if the executable does not exist, like subprocess.run. The
+    result's `usage` has the child's wall time, CPU user/sys time, peak RSS (sampled,
+    see _reap) and stdout bytes; only wall time and stdout bytes where wait4 is not
+    available.
+
+    stdout and stderr each keep their head and tail within `max_output` bytes (see
+    output_capture). With `on_output`, it is called with ("stdout" | "stderr", text)
+    as the process writes, up to that cap.
+    """
+    if not hasattr(os, "wait4"):
+        return await _run_process_portable(args, timeout, cwd, input, max_output)
+
+    stdin = subprocess.DEVNULL
+    if input is not None:
+        # A file rather than a pipe: the child reads it at its own pace and we never block writing
+        stdin = tempfile.TemporaryFile()
+        stdin.write(input.encode("utf-8"))
+        stdin.seek(0)
+    start = time.perf_counter()
+    try:
+        process = subprocess.Popen(
+            args, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, start_new_session=True,
+        )
+    finally:
+        if input is not None:
+            stdin.close()
+
+    stdout, stderr = OutputCapture(max_output), OutputCapture(max_output)
+    readers = asyncio.gather(
+        _read_pipe(process.stdout, stdout, "stdout", on_output), _read_pipe(process.stderr, stderr, "stderr", on_output)
+    )
+    try:
+        rusage, peak_rss_kb = await asyncio.wait_for(_reap(process), timeout=timeout)
+        wall = time.perf_counter() - start
+        # Whatever the program left running in the background would otherwise hold the pipes open
+        _kill_tree(process.pid)
+        await _drain(readers)
+    except asyncio.TimeoutError:
+        _kill_tree(process.pid)
+        await _reap(process)
+        await _drain(readers)
+        raise subprocess.TimeoutExpired(args, timeout)
+    except BaseException:
+        _kill_tree(process.pid)
+        if process.returncode is None:
+            await asyncio.shield(_reap(process))
+        readers.cancel()
+        raise
+
+    usage = usage_from_rusage(rusage, wall, peak_rss_kb)
+    usage["stdout_bytes"] = stdout.total
+    return ProcessResult(args, process.returncode, stdout.text(), stderr.text(), usage)
+
+
+async def _run_process_portable(args: List[str], timeout: float, cwd: Optional[str],
+                                input: Optional[str], max_output: int) -> ProcessResult:
+    """
+    run_process for platforms without wait4 (Windows): same semantics, but wall time
+    only, output is bounded only after the fact and nothing is streamed.
+    """
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(input.encode("utf-8") if input is not None else None), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(args, timeout)
+    except BaseException:
+        process.kill()
+        await process.wait()
+        raise
+    usage = {"wall_ms": round((time.perf_counter() - start) * 1000, 1), "stdout_bytes": len(stdout)}
+    captures = [OutputCapture(max_output), OutputCapture(max_output)]
+    captures[0].write(stdout)
+    captures[1].write(stderr)
+    return ProcessResult(args, process.returncode, captures[0].text(), captures[1].text(), usage)
@@ -0,0 +1,150 @@
+import math
+import time
+import asyncio
+
+
+class QuotaExceeded(Exception):
+    """Raised when a call cannot be admitted within the queue limits; maps to HTTP 429."""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(f"Gemini quota queue {reason}; retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens, refilled continuously at `rate`
+    per second. A rate of 0 means no limit: any amount is available at once.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        if capacity < 0 or rate < 0:
+            raise ValueError(f"Token bucket capacity and rate must not be negative (got {capacity}, {rate})")
+        self.unlimited = rate == 0
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def consume(self, amount: float):
+        if self.unlimited:
+            return
+        self._refill()
+        self.tokens -= amount
+
+
+def estimate_tokens(prompt: str, expected_output_tokens: int) -> int:
+    # ~4 characters per token is the usual rule of thumb for Gemini's tokenizer on English text
+    return len(prompt) // 4 + expected_output_tokens
+
+
+class RateLimiter:
+    """
+    Client-side RPM + TPM limiter shared by every Gemini call in the process.
+
+    Calls are admitted strictly in arrival order. A call that would exceed the quota
+    waits in a bounded queue instead of failing. It is rejected with QuotaExceeded
+    (Retry-After) only when the queue is full, meaning it already holds `max_queue`
+    calls or the projected wait is longer than `max_wait`. An admitted call therefore
+    always gets through within its deadline. An `rpm` or `tpm` of 0 turns that limit off.
+    """
+
+    def __init__(self, rpm: float, tpm: float, max_queue: int = 100, max_wait: float = 30.0):
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        # asyncio.Lock wakes waiters in FIFO order, which is what keeps admission fair
+        self._lock = None
+        self.queued = 0
+        self.queued_tokens = 0
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.charged = 0
+        self.total_wait = 0.0
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def projected_wait(self, tokens: int) -> float:
+        """How long a call arriving now would wait behind everything already queued."""
+        return max(
+            self.requests.time_until(self.queued + 1),
+            self.tokens.time_until(self.queued_tokens + tokens),
+        )
+
+    def try_acquire(self, tokens: int) -> bool:
+        """Takes quota only if it is available right now and nobody is queued; never waits."""
+        tokens = min(tokens, self.tokens.capacity)
+        if self.queued or self.projected_wait(tokens) > 0:
+            return False
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        self.admitted += 1
+        return True
+
+    def charge(self, tokens: int):
+        """
+        Takes quota for a call that is made without being admitted (a failover retry of an
+        admitted call). The buckets may go negative; later callers wait off the debt.
+        """
+        tokens = min(tokens, self.tokens.capacity)
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        self.charged += 1
+
+    async def acquire(self, tokens: int):
+        # A single call larger than the whole bucket could never be admitted otherwise
+        tokens = min(tokens, self.tokens.capacity)
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise QuotaExceeded(math.ceil(self.projected_wait(tokens)) or 1, "full")
+        projected = self.projected_wait(tokens)
+        if projected > self.max_wait:
+            self.rejected += 1
+            raise QuotaExceeded(math.ceil(projected), "full")
+
+        start = time.monotonic()
+        self.queued += 1
+        self.queued_tokens += tokens
+        try:
+            async with self._get_lock():
+                wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                if wait > 0:
+                    self.delayed += 1
+                    await asyncio.sleep(wait)
+                self.requests.consume(1)
+                self.tokens.consume(tokens)
+        finally:
+            self.queued -= 1
+            self.queued_tokens -= tokens
+        self.admitted += 1
+        self.total_wait += time.monotonic() - start
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "charged": self.charged,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+        }
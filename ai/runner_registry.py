@@ -0,0 +1,226 @@
+"""
+Toolchain discovery and the language -> runner registry behind /run-code.
+
+Each runner declares the toolchains it needs (g++, javac, dotnet script, ...). The
+toolchains are probed once at startup, concurrently and in the background, by running
+their version command; a request is then routed straight to the first registered
+runner for its language whose toolchains all answered, and a language with no working
+runner is refused without spawning anything. Requests that arrive while the probe is
+running wait for it in ready(). A toolchain that was not available is probed again,
+at most every `reprobe_interval` seconds, when a request for a language that needs it
+comes in, so one slow startup probe or a toolchain installed later does not leave the
+language refused until a restart. If no probe was started, every toolchain counts as
+available, so runners still work (and fail the slow way) without it.
+"""
+import time
+import shutil
+import asyncio
+import subprocess
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from process_runner import run_process
+
+
+class Toolchain:
+    """
+    An external tool a runner needs, with what its version probe found. `status` is
+    "available", "missing" (not installed or cannot start), "failed" (the version
+    command exited with an error) or "timeout" (it did not answer in time).
+    """
+
+    def __init__(self, name: str, command: List[str]):
+        self.name = name
+        self.command = command
+        self.available: Optional[bool] = None
+        self.status: Optional[str] = None
+        self.probed_at: Optional[float] = None
+        self.version: Optional[str] = None
+        self.path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.probe_ms: Optional[float] = None
+
+    async def probe(self, timeout: float):
+        start = time.perf_counter()
+        try:
+            self.path = shutil.which(self.command[0])
+            if self.path is None:
+                self._fail("missing", f"{self.command[0]} not found on PATH")
+                return
+            try:
+                result = await run_process(self.command, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._fail("timeout", f"`{' '.join(self.command)}` took longer than {timeout:g}s")
+                return
+            except OSError as e:
+                self._fail("missing", str(e))
+                return
+            # javac and java print their version on stderr
+            lines = [line.strip() for line in (result.stdout + "\n" + result.stderr).splitlines() if line.strip()]
+            if result.returncode != 0:
+                self._fail("failed", lines[-1] if lines else f"exit code {result.returncode}")
+            else:
+                self.available, self.status, self.error = True, "available", None
+                self.version = lines[0] if lines else None
+        finally:
+            self.probe_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.probed_at = time.monotonic()
+
+    def _fail(self, status: str, error: str):
+        self.available, self.status, self.error, self.version = False, status, error, None
+
+    def to_dict(self) -> dict:
+        return {
+            "available": self.available,
+            "status": self.status,
+            "version": self.version,
+            "path": self.path,
+            "error": self.error,
+            "probe_ms": self.probe_ms,
+        }
+
+
+RunFunction = Callable[..., Awaitable[dict]]
+
+
+class Runner:
+    def __init__(self, name: str, languages: Sequence[str], label: str, run: RunFunction,
+                 requires: Sequence[str], missing: Optional[str]):
+        self.name = name
+        self.languages = languages
+        self.label = label
+        self.run = run
+        self.requires = requires
+        self.missing = missing
+
+
+class RunnerRegistry:
+    """
+    Runners by language, in registration order. Register the preferred runner for a
+    language first; later ones are fallbacks for hosts without its toolchains.
+    """
+
+    def __init__(self, probe_timeout: float = 15.0, reprobe_interval: float = 60.0):
+        self.probe_timeout = probe_timeout
+        self.reprobe_interval = reprobe_interval
+        self.toolchains: Dict[str, Toolchain] = {}
+        self._runners: Dict[str, List[Runner]] = {}
+        self._probe: Optional[asyncio.Future] = None
+        self._reprobes: Dict[str, asyncio.Future] = {}
+        self.probed = False
+
+    def toolchain(self, name: str, *command: str):
+        self.toolchains[name] = Toolchain(name, list(command))
+
+    def register(self, *languages: str, label: str, requires: Sequence[str] = (), missing: Optional[str] = None):
+        """
+        Decorator registering `run(request, usage, on_output) -> response` for `languages`
+        (the first is the canonical name, the rest aliases). `missing` is the error a
+        request gets when this is the only runner and a toolchain is not available.
+        """
+        unknown = [name for name in requires if name not in self.toolchains]
+        if unknown:
+            raise ValueError(f"Unknown toolchains {unknown}; declare them with toolchain() first")
+
+        def decorator(run: RunFunction) -> RunFunction:
+            runner = Runner(run.__name__, languages, label, run, requires, missing)
+            for language in languages:
+                self._runners.setdefault(language, []).append(runner)
+            return run
+
+        return decorator
+
+    async def probe(self):
+        await asyncio.gather(*(toolchain.probe(self.probe_timeout) for toolchain in self.toolchains.values()))
+        self.probed = True
+
+    def start_probe(self) -> asyncio.Future:
+        """Starts probe() in the background (once) and returns its future."""
+        if self._probe is None:
+            self._probe = asyncio.ensure_future(self.probe())
+        return self._probe
+
+    @property
+    def probing(self) -> bool:
+        return self._probe is not None and not self._probe.done()
+
+    async def ready(self, language: Optional[str] = None):
+        """
+        Waits for a background probe that is still running, then for a new probe of the
+        unavailable toolchains `language` needs if their last one is `reprobe_interval` old.
+        """
+        if self.probing:
+            # Shielded so a request that goes away does not cancel the probe for everyone else
+            await asyncio.shield(self._probe)
+        if language is None or not self.probed:
+            return
+        names = {name for runner in self._runners.get(language, ()) for name in runner.requires}
+        stale = [self._reprobe(self.toolchains[name]) for name in sorted(names) if self._stale(self.toolchains[name])]
+        if stale:
+            await asyncio.shield(asyncio.gather(*stale))
+
+    def _stale(self, toolchain: Toolchain) -> bool:
+        return (toolchain.available is False
+                and (toolchain.probed_at is None or time.monotonic() - toolchain.probed_at >= self.reprobe_interval))
+
+    def _reprobe(self, toolchain: Toolchain) -> asyncio.Future:
+        """One probe per toolchain at a time, however many requests are waiting for it."""
+        future = self._reprobes.get(toolchain.name)
+        if future is None or future.done():
+            future = self._reprobes[toolchain.name] = asyncio.ensure_future(toolchain.probe(self.probe_timeout))
+        return future
+
+    def usable(self, runner: Runner) -> bool:
+        return all(self.toolchains[name].available is not False for name in runner.requires)
+
+    def resolve(self, language: str) -> Tuple[Optional[Runner], Optional[str]]:
+        """
+        (runner, None) for the first usable runner, (None, reason) if the language is
+        known but none of its runners can work here, and (None, None) if it is unknown.
+        """
+        runners = self._runners.get(language)
+        if not runners:
+            return None, None
+        for runner in runners:
+            if self.usable(runner):
+                return runner, None
+        first = runners[0]
+        down = [self.toolchains[name] for name in first.requires if not self.toolchains[name].available]
+        # A toolchain that only answered too slowly is not missing: it is probed again later
+        slow = [toolchain for toolchain in down if toolchain.status == "timeout"]
+        if slow:
+            errors = "; ".join(toolchain.error for toolchain in slow)
+            return None, f"{first.label} is temporarily unavailable here ({errors}); please try again shortly"
+        return None, first.missing or f"{first.label} is not available here ({', '.join(t.name for t in down)} missing)"
+
+    def labels(self) -> List[str]:
+        """Display names of the supported languages, in registration order."""
+        labels = []
+        for runners in self._runners.values():
+            if runners[0].label not in labels:
+                labels.append(runners[0].label)
+        return labels
+
+    def version(self, language: str) -> Optional[str]:
+        """Versions of the toolchains behind the runner `language` resolves to, for cache keys."""
+        runner, _ = self.resolve(language)
+        if runner is None:
+            return None
+        return "; ".join(f"{name} {self.toolchains[name].version}" for name in runner.requires)
+
+    def stats(self) -> dict:
+        languages = {}
+        for language, runners in self._runners.items():
+            runner, reason = self.resolve(language)
+            languages[language] = {
+                "label": runners[0].label,
+                "available": runner is not None,
+                "runner": runner.name if runner is not None else None,
+                "requires": list(runner.requires) if runner is not None else list(runners[0].requires),
+                "reason": reason,
+            }
+        return {
+            "status": "probing" if self.probing else ("probed" if self.probed else "not probed"),
+            "probed": self.probed,
+            "languages": languages,
+            "toolchains": {name: toolchain.to_dict() for name, toolchain in self.toolchains.items()},
+        }
@@ -0,0 +1,262 @@
+import os
+import re
+import base64
+import shutil
+import asyncio
+import secrets
+import subprocess
+from typing import Callable, List, Optional, Tuple
+
+from sandbox import WORKER_ENV_KEYS, PIPE_LIMIT
+from output_capture import OUTPUT_MAX_BYTES
+
+RUNTIMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtimes")
+
+
+class RuntimeUnavailable(Exception):
+    """The daemon did not take the job; callers fall back to a one-off subprocess."""
+
+
+def encode_fields(fields: List[str]) -> bytes:
+    return ("\t".join(base64.b64encode(str(f).encode("utf-8")).decode("ascii") for f in fields) + "\n").encode("ascii")
+
+
+def decode_fields(line: bytes) -> List[str]:
+    return [base64.b64decode(f).decode("utf-8", errors="replace") for f in line.rstrip(b"\r\n").split(b"\t")]
+
+
+class RuntimeDaemon:
+    """
+    Supervises one long-lived language runtime (see runtimes/) that executes jobs sent
+    over a localhost socket.
+
+    The daemon is started at startup and restarted with backoff whenever it exits. It is
+    recycled after passing `max_rss_mb` or `max_jobs`, and after a job it reports as
+    TIMEOUT when `recycle_on_timeout` is set (the runtime cannot stop a runaway job); a
+    recycled daemon gets no new jobs and is replaced once the jobs it already has finish,
+    or killed after `drain_timeout` seconds if they have not. A job the runtime does not
+    answer in time (it is supposed to enforce the limit itself) also recycles the daemon
+    this way, so other users' jobs on it still complete.
+    Job output is capped by the runtime itself at `max_output` bytes per stream, keeping
+    head and tail like output_capture. If the runtime is not installed, supervision stops
+    and every call raises RuntimeUnavailable so the caller can use its subprocess path instead.
+    """
+
+    def __init__(self, name: str, command: List[str], prepare: Optional[Callable[[], None]] = None,
+                 max_rss_mb: int = 512, max_jobs: int = 1000, startup_timeout: float = 30.0,
+                 max_output: int = OUTPUT_MAX_BYTES, recycle_on_timeout: bool = False,
+                 drain_timeout: float = 30.0):
+        self.name = name
+        self.drain_timeout = drain_timeout
+        self.recycle_on_timeout = recycle_on_timeout
+        self.max_output = max_output
+        self.command = command
+        self.prepare = prepare
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.max_jobs = max_jobs
+        self.startup_timeout = startup_timeout
+        self.token = secrets.token_hex(16)
+        self.process = None
+        self.port = None
+        self.unavailable = None
+        self.rss = 0
+        self._jobs_since_start = 0
+        self._in_flight = 0
+        self._retiring = False
+        self._ready = None
+        self._supervisor = None
+        self._stopping = False
+        self.jobs = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycles = 0
+        self.restarts = 0
+
+    def start(self):
+        if self._supervisor is None:
+            self._ready = asyncio.Event()
+            self._supervisor = asyncio.ensure_future(self._supervise())
+
+    async def stop(self):
+        self._stopping = True
+        self._kill()
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+            self._supervisor = None
+
+    async def _spawn(self):
+        if self.prepare is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.prepare)
+        env = {key: os.environ[key] for key in WORKER_ENV_KEYS if key in os.environ}
+        env["RUNNER_TOKEN"] = self.token
+        env["OUTPUT_MAX_BYTES"] = str(self.max_output)
+        if "RUNNER_MEMORY_MB" in os.environ:
+            env["RUNNER_MEMORY_MB"] = os.environ["RUNNER_MEMORY_MB"]
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            stdin=asyncio.subprocess.DEVNULL, env=env, cwd=RUNTIMES_DIR,
+        )
+        line = await asyncio.wait_for(self.process.stdout.readline(), timeout=self.startup_timeout)
+        if not line.startswith(b"LISTENING "):
+            self._kill()
+            raise RuntimeError(f"unexpected startup output {line[:100]!r}")
+        self.port = int(line.split()[1])
+        self._jobs_since_start = 0
+        self._retiring = False
+
+    async def _supervise(self):
+        delay = 0.5
+        while not self._stopping:
+            try:
+                await self._spawn()
+            except FileNotFoundError as e:
+                self.unavailable = f"{self.name} runtime not installed ({e})"
+                print(f"Runtime daemon disabled: {self.unavailable}")
+                return
+            except Exception as e:
+                print(f"{self.name} runtime daemon failed to start: {e}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            delay = 0.5
+            self._ready.set()
+            returncode = await self.process.wait()
+            self._ready.clear()
+            if not self._stopping:
+                self.restarts += 1
+                print(f"{self.name} runtime daemon exited with code {returncode}; restarting")
+
+    def _retire(self):
+        """
+        Stops sending jobs to the current process and kills it once its in-flight jobs are
+        done, or after `drain_timeout` seconds if they are not.
+        """
+        self.recycles += 1
+        self._retiring = True
+        self._ready.clear()
+        if self._in_flight == 0:
+            self._kill()
+        else:
+            asyncio.get_running_loop().call_later(self.drain_timeout, self._kill, self.process)
+
+    def _kill(self, process=None):
+        process = process or self.process
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def call(self, fields: List[str], timeout: float) -> Tuple[str, str, str, dict]:
+        """
+        Sends one job and returns (status, stdout, stderr, usage); status is OK, ERROR or
+        TIMEOUT. `usage` has the job's CPU time as measured by the runtime and the
+        daemon's RSS after the job as `peak_rss_kb` (the runtime's own footprint included).
+
+        Raises RuntimeUnavailable only when the job was never handed to the daemon, so the
+        caller's fallback cannot run it a second time. A job lost with the daemon after it
+        was sent comes back as ERROR.
+        """
+        self.start()
+        if self.unavailable:
+            raise RuntimeUnavailable(self.unavailable)
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=self.startup_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeUnavailable(f"{self.name} runtime daemon is not ready")
+
+        self._in_flight += 1
+        try:
+            return await self._send(fields, timeout)
+        finally:
+            self._in_flight -= 1
+            if self._retiring and self._in_flight == 0:
+                self._kill()
+
+    async def _send(self, fields: List[str], timeout: float) -> Tuple[str, str, str, dict]:
+        writer = None
+        sent = False
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.port, limit=PIPE_LIMIT)
+            sent = True
+            writer.write(encode_fields([self.token, *fields]))
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        except asyncio.TimeoutError:
+            # The runtime enforces the job's limit itself; no answer past it means it is
+            # wedged, but other jobs on it may still finish, so drain it instead of killing
+            self.timeouts += 1
+            if not self._retiring:
+                self._retire()
+            return "TIMEOUT", "", "", {}
+        except (OSError, asyncio.IncompleteReadError) as e:
+            if not sent:
+                raise RuntimeUnavailable(f"{self.name} runtime daemon connection failed: {e}")
+            line = b""
+        finally:
+            if writer is not None:
+                writer.close()
+        if not line:
+            self.crashes += 1
+            self._kill()
+            return "ERROR", "", f"The {self.name} runtime stopped while running this job", {}
+
+        status, rss, stdout, stderr, cpu = decode_fields(line)
+        if status == "UNSUPPORTED":
+            raise RuntimeUnavailable(f"{self.name} runtime daemon declined the job: {stderr}")
+        self.jobs += 1
+        self._jobs_since_start += 1
+        self.rss = int(rss)
+        usage = {"peak_rss_kb": self.rss // 1024}
+        if cpu:
+            user_us, sys_us = cpu.split()
+            usage["cpu_user_ms"] = round(int(user_us) / 1000, 1)
+            usage["cpu_sys_ms"] = round(int(sys_us) / 1000, 1)
+        if status == "TIMEOUT":
+            self.timeouts += 1
+        if not self._retiring and (self.rss > self.max_rss or self._jobs_since_start >= self.max_jobs
+                                   or (status == "TIMEOUT" and self.recycle_on_timeout)):
+            self._retire()
+        return status, stdout, stderr, usage
+
+    def stats(self) -> dict:
+        return {
+            "running": self._ready is not None and self._ready.is_set(),
+            "unavailable": self.unavailable,
+            "jobs": self.jobs,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "recycles": self.recycles,
+            "restarts": self.restarts,
+            "rss_mb": round(self.rss / 1024 / 1024, 1),
+        }
+
+
+def node_daemon(**kwargs) -> RuntimeDaemon:
+    return RuntimeDaemon("node", ["node", os.path.join(RUNTIMES_DIR, "node_runner.js")], **kwargs)
+
+
+def java_daemon(build_dir: str, **kwargs) -> RuntimeDaemon:
+    """JVM daemon; JavaRunner.java is compiled into `build_dir` the first time it starts."""
+    source = os.path.join(RUNTIMES_DIR, "JavaRunner.java")
+
+    # Serial GC and a small heap keep the idle daemon cheap; submissions are small programs
+    command = ["java", "-XX:+UseSerialGC", "-Xms32m", "-Xss8m", "-cp", build_dir, "JavaRunner"]
+
+    def prepare():
+        if shutil.which("javac") is None:
+            raise FileNotFoundError("javac")
+        # The daemon's System.exit guard is a security manager: JDK 18-23 only allow one with
+        # this flag, and JDK 24+ refuse to start with it (RUN then falls back to `java`)
+        version = subprocess.run(["javac", "-version"], capture_output=True, text=True, timeout=60)
+        match = re.search(r"javac (?:1\.)?(\d+)", version.stdout + version.stderr)
+        allow = "-Djava.security.manager=allow"
+        if match and 18 <= int(match.group(1)) <= 23 and allow not in command:
+            command.insert(1, allow)
+        compiled = os.path.join(build_dir, "JavaRunner.class")
+        if not os.path.exists(compiled) or os.path.getmtime(compiled) < os.path.getmtime(source):
+            os.makedirs(build_dir, exist_ok=True)
+            subprocess.run(["javac", "-d", build_dir, source], check=True, capture_output=True, timeout=120)
+
+    return RuntimeDaemon("java", command, prepare=prepare, recycle_on_timeout=True, **kwargs)
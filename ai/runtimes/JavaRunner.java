@@ -0,0 +1,341 @@
+// Warm JVM for /run-code, supervised by runtime_daemons.py.
+//
+// Listens on a localhost port (announced as "LISTENING <port>" on stdout). COMPILE runs the
+// in-process javac (same output as `javac -d outDir file`) and RUN loads the classes with a
+// fresh class loader per job, so neither pays for a JVM startup. Jobs run concurrently:
+// System.out/err/in are installed once and route to the streams of whichever job the
+// writing thread belongs to, and each job's time limit starts when the job does. A security
+// manager turns System.exit in a job into the end of that job instead of the daemon's, and
+// stops jobs from swapping the shared streams; on a JVM that no longer allows one, RUN
+// answers UNSUPPORTED and the caller runs the program in a `java` process instead. A job
+// that overruns its time limit cannot be stopped safely, so the daemon answers TIMEOUT and
+// leaves the thread running; the supervisor replaces the daemon once its other jobs finish.
+// Protocol: one line per message, tab-separated base64 fields.
+//   request:  token, "COMPILE", sourceFile, outDir   |   token, "RUN", classDir, className, timeoutMs[, stdin]
+//   response: status (OK | ERROR | TIMEOUT | UNSUPPORTED), rssBytes, stdout, stderr, "cpuUserMicros cpuSysMicros"
+import javax.tools.JavaCompiler;
+import javax.tools.ToolProvider;
+import java.io.*;
+import java.lang.management.ManagementFactory;
+import java.lang.management.ThreadMXBean;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.*;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Paths;
+import java.security.Permission;
+import java.util.Base64;
+
+public class JavaRunner {
+    private static final PrintStream REAL_OUT = System.out;
+    private static final PrintStream REAL_ERR = System.err;
+    private static final InputStream REAL_IN = System.in;
+    // The job the current thread is running for; threads a job starts inherit it
+    private static final InheritableThreadLocal<Job> CURRENT = new InheritableThreadLocal<>();
+    private static final JavaCompiler COMPILER = ToolProvider.getSystemJavaCompiler();
+    private static final ThreadMXBean THREADS = ManagementFactory.getThreadMXBean();
+    private static final String TOKEN = System.getenv().getOrDefault("RUNNER_TOKEN", "");
+    // Per stream, same policy as output_capture.py; 0 disables the cap
+    private static final int OUTPUT_MAX = Integer.parseInt(System.getenv().getOrDefault("OUTPUT_MAX_BYTES", "262144"));
+    private static boolean exitGuarded;
+
+    /** Output, input and exit status of one RUN. */
+    static final class Job {
+        final BoundedOutputStream stdout = new BoundedOutputStream(OUTPUT_MAX);
+        final BoundedOutputStream stderr = new BoundedOutputStream(OUTPUT_MAX);
+        final InputStream stdin;
+        volatile Integer exitStatus;
+
+        Job(String stdin) {
+            this.stdin = new ByteArrayInputStream(stdin.getBytes(StandardCharsets.UTF_8));
+        }
+    }
+
+    /** Thrown by System.exit in a job: ends the job's thread with the requested status. */
+    static final class ExitRequest extends SecurityException {
+        ExitRequest(int status) {
+            super("System.exit(" + status + ")");
+        }
+    }
+
+    /** Allows everything except exiting the JVM and replacing the shared streams from a job. */
+    static final class JobSecurityManager extends SecurityManager {
+        @Override
+        public void checkExit(int status) {
+            Job job = CURRENT.get();
+            if (job != null) {
+                job.exitStatus = status;
+                throw new ExitRequest(status);
+            }
+        }
+
+        @Override
+        public void checkPermission(Permission perm) {
+            if (CURRENT.get() != null && perm instanceof RuntimePermission
+                    && ("setIO".equals(perm.getName()) || "setSecurityManager".equals(perm.getName()))) {
+                throw new SecurityException(perm.getName() + " is not allowed");
+            }
+        }
+
+        @Override
+        public void checkPermission(Permission perm, Object context) {
+            checkPermission(perm);
+        }
+    }
+
+    /** System.out or System.err: writes go to the writing thread's job, or to the daemon's own stream. */
+    static final class RoutedOutputStream extends OutputStream {
+        private final boolean error;
+
+        RoutedOutputStream(boolean error) {
+            this.error = error;
+        }
+
+        private OutputStream target() {
+            Job job = CURRENT.get();
+            if (job == null) return error ? REAL_ERR : REAL_OUT;
+            return error ? job.stderr : job.stdout;
+        }
+
+        @Override
+        public void write(int b) throws IOException {
+            target().write(b);
+        }
+
+        @Override
+        public void write(byte[] b, int off, int len) throws IOException {
+            target().write(b, off, len);
+        }
+
+        @Override
+        public void flush() throws IOException {
+            target().flush();
+        }
+    }
+
+    /** System.in: reads come from the reading thread's job stdin. */
+    static final class RoutedInputStream extends InputStream {
+        private InputStream source() {
+            Job job = CURRENT.get();
+            return job == null ? REAL_IN : job.stdin;
+        }
+
+        @Override
+        public int read() throws IOException {
+            return source().read();
+        }
+
+        @Override
+        public int read(byte[] b, int off, int len) throws IOException {
+            return source().read(b, off, len);
+        }
+
+        @Override
+        public int available() throws IOException {
+            return source().available();
+        }
+    }
+
+    /** Keeps the head and tail of a job's output within `max` bytes and counts what falls in between. */
+    static final class BoundedOutputStream extends OutputStream {
+        private final int max;
+        private final ByteArrayOutputStream head = new ByteArrayOutputStream();
+        private final byte[] tail;
+        private int tailStart;
+        private int tailSize;
+        private long total;
+
+        BoundedOutputStream(int max) {
+            this.max = max;
+            this.tail = new byte[max / 2];
+        }
+
+        @Override
+        public synchronized void write(int b) {
+            write(new byte[]{(byte) b}, 0, 1);
+        }
+
+        @Override
+        public synchronized void write(byte[] b, int off, int len) {
+            total += len;
+            int room = max == 0 ? len : Math.min(len, max - max / 2 - head.size());
+            if (room > 0) {
+                head.write(b, off, room);
+                off += room;
+                len -= room;
+            }
+            // Ring buffer of the last tail.length bytes
+            for (int i = Math.max(0, len - tail.length); i < len; i++) {
+                tail[(tailStart + tailSize) % tail.length] = b[off + i];
+                if (tailSize < tail.length) {
+                    tailSize++;
+                } else {
+                    tailStart = (tailStart + 1) % tail.length;
+                }
+            }
+        }
+
+        @Override
+        public synchronized String toString() {
+            byte[] last = new byte[tailSize];
+            for (int i = 0; i < tailSize; i++) {
+                last[i] = tail[(tailStart + i) % tail.length];
+            }
+            long omitted = total - head.size() - tailSize;
+            String marker = omitted > 0 ? "\n... [" + omitted + " bytes of output omitted] ...\n" : "";
+            return new String(head.toByteArray(), StandardCharsets.UTF_8) + marker + new String(last, StandardCharsets.UTF_8);
+        }
+    }
+
+    public static void main(String[] args) throws IOException {
+        System.setOut(new PrintStream(new RoutedOutputStream(false), true, StandardCharsets.UTF_8));
+        System.setErr(new PrintStream(new RoutedOutputStream(true), true, StandardCharsets.UTF_8));
+        System.setIn(new RoutedInputStream());
+        // Like the default handler, but an exit from a job's extra thread is not an error
+        Thread.setDefaultUncaughtExceptionHandler((thread, e) -> {
+            if (e instanceof ExitRequest) return;
+            System.err.print("Exception in thread \"" + thread.getName() + "\" ");
+            e.printStackTrace();
+        });
+        try {
+            // Needs -Djava.security.manager=allow on JDK 18-23 and fails on 24+
+            System.setSecurityManager(new JobSecurityManager());
+            exitGuarded = true;
+        } catch (UnsupportedOperationException | SecurityException e) {
+            exitGuarded = false;
+        }
+        ServerSocket server = new ServerSocket(0, 50, InetAddress.getLoopbackAddress());
+        REAL_OUT.println("LISTENING " + server.getLocalPort());
+        REAL_OUT.flush();
+        while (true) {
+            Socket socket = server.accept();
+            Thread handler = new Thread(() -> handle(socket));
+            handler.setDaemon(true);
+            handler.start();
+        }
+    }
+
+    private static String encode(String value) {
+        return Base64.getEncoder().encodeToString(value.getBytes(StandardCharsets.UTF_8));
+    }
+
+    private static String decode(String value) {
+        return new String(Base64.getDecoder().decode(value), StandardCharsets.UTF_8);
+    }
+
+    private static void handle(Socket socket) {
+        try (Socket s = socket;
+             BufferedReader in = new BufferedReader(new InputStreamReader(s.getInputStream(), StandardCharsets.UTF_8));
+             Writer out = new OutputStreamWriter(s.getOutputStream(), StandardCharsets.UTF_8)) {
+            String line = in.readLine();
+            if (line == null) return;
+            String[] raw = line.split("\t", -1);
+            String[] fields = new String[raw.length];
+            for (int i = 0; i < raw.length; i++) fields[i] = decode(raw[i]);
+            if (fields.length < 4 || !TOKEN.equals(fields[0])) return;
+
+            String[] result;
+            if ("COMPILE".equals(fields[1])) {
+                result = compile(fields[2], fields[3]);
+            } else if ("RUN".equals(fields[1]) && fields.length >= 5 && !exitGuarded) {
+                result = new String[]{"UNSUPPORTED", "", "This JVM cannot stop System.exit in a job", ""};
+            } else if ("RUN".equals(fields[1]) && fields.length >= 5) {
+                result = run(fields[2], fields[3], Long.parseLong(fields[4]), fields.length >= 6 ? fields[5] : "");
+            } else {
+                return;
+            }
+            out.write(encode(result[0]) + "\t" + encode(Long.toString(rss())) + "\t"
+                    + encode(result[1]) + "\t" + encode(result[2]) + "\t" + encode(result[3]) + "\n");
+            out.flush();
+        } catch (IOException | RuntimeException e) {
+            // The supervisor treats a dropped connection as a failed job
+        }
+    }
+
+    private static long rss() {
+        try {
+            String[] statm = new String(Files.readAllBytes(Paths.get("/proc/self/statm")), StandardCharsets.UTF_8).trim().split(" ");
+            return Long.parseLong(statm[1]) * 4096;
+        } catch (IOException | RuntimeException e) {
+            Runtime runtime = Runtime.getRuntime();
+            return runtime.totalMemory() - runtime.freeMemory();
+        }
+    }
+
+    // CPU time the calling thread has used since the given readings, as "userMicros sysMicros"
+    private static String cpuSince(long userStart, long totalStart) {
+        long user = THREADS.getCurrentThreadUserTime() - userStart;
+        long total = THREADS.getCurrentThreadCpuTime() - totalStart;
+        return (user / 1000) + " " + (Math.max(0, total - user) / 1000);
+    }
+
+    private static String[] compile(String sourceFile, String outDir) {
+        if (COMPILER == null) {
+            return new String[]{"ERROR", "", "No in-process Java compiler available (JRE without javac)", ""};
+        }
+        long userStart = THREADS.getCurrentThreadUserTime();
+        long totalStart = THREADS.getCurrentThreadCpuTime();
+        ByteArrayOutputStream diagnostics = new ByteArrayOutputStream();
+        int code = COMPILER.run(null, null, diagnostics, "-d", outDir, sourceFile);
+        return new String[]{code == 0 ? "OK" : "ERROR", "", new String(diagnostics.toByteArray(), StandardCharsets.UTF_8),
+                cpuSince(userStart, totalStart)};
+    }
+
+    private static String[] run(String classDir, String className, long timeoutMs, String stdin) {
+        Job job = new Job(stdin);
+        Throwable[] failure = new Throwable[1];
+        String[] cpu = {""};
+        final URLClassLoader loader;
+        try {
+            // Parent is the platform loader, so submissions cannot see this class
+            loader = new URLClassLoader(new URL[]{new File(classDir).toURI().toURL()}, ClassLoader.getPlatformClassLoader());
+        } catch (MalformedURLException e) {
+            return new String[]{"ERROR", "", e.toString(), ""};
+        }
+
+        Thread worker = new Thread(() -> {
+            CURRENT.set(job);
+            long userStart = THREADS.getCurrentThreadUserTime();
+            long totalStart = THREADS.getCurrentThreadCpuTime();
+            try {
+                Class<?> mainClass = Class.forName(className, true, loader);
+                Method main = mainClass.getMethod("main", String[].class);
+                main.invoke(null, (Object) new String[0]);
+            } catch (InvocationTargetException e) {
+                if (!(e.getCause() instanceof ExitRequest)) failure[0] = e.getCause();
+            } catch (Throwable e) {
+                failure[0] = e;
+            } finally {
+                cpu[0] = cpuSince(userStart, totalStart);
+                System.out.flush();
+                System.err.flush();
+            }
+        }, "main");
+        worker.setDaemon(true);
+        worker.setContextClassLoader(loader);
+        try {
+            worker.start();
+            worker.join(timeoutMs);
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+        }
+
+        if (worker.isAlive()) {
+            return new String[]{"TIMEOUT", job.stdout.toString(), job.stderr.toString(), ""};
+        }
+        try {
+            loader.close();
+        } catch (IOException ignored) {
+        }
+        if (failure[0] != null) {
+            // Same shape as the message `java` prints for an uncaught exception
+            StringWriter trace = new StringWriter();
+            failure[0].printStackTrace(new PrintWriter(trace));
+            return new String[]{"ERROR", job.stdout.toString(), job.stderr.toString() + "Exception in thread \"main\" " + trace, cpu[0]};
+        }
+        Integer exitStatus = job.exitStatus;
+        String status = exitStatus == null || exitStatus == 0 ? "OK" : "ERROR";
+        return new String[]{status, job.stdout.toString(), job.stderr.toString(), cpu[0]};
+    }
+}
@@ -0,0 +1,137 @@
+// Warm JavaScript runtime for /run-code and /evaluate-code, supervised by runtime_daemons.py.
+//
+// Listens on a localhost port (announced as "LISTENING <port>" on stdout) and runs each job
+// in its own worker thread, the way `node -e` would run it, so a job pays for a worker
+// instead of a whole Node startup. A worker has its own V8 realm, globals, module cache,
+// `require` and `process.exit`, and serves exactly one job, so nothing a job changes
+// (builtins, modules, prototypes) is seen by the next one. One spare worker is kept
+// started ahead of the next job.
+// Protocol: one line per message, tab-separated base64 fields.
+//   request:  token, "RUN", code, timeoutMs
+//   response: status (OK | ERROR | TIMEOUT), rssBytes, stdout, stderr, "cpuUserMicros cpuSysMicros"
+const net = require('net');
+const { Worker } = require('worker_threads');
+
+const TOKEN = process.env.RUNNER_TOKEN || '';
+// Per stream, same policy as output_capture.py; 0 disables the cap
+const OUTPUT_MAX = parseInt(process.env.OUTPUT_MAX_BYTES || String(256 * 1024), 10);
+// V8 heap per job; a job past it loses its worker, not the daemon
+const MEMORY_MB = parseInt(process.env.RUNNER_MEMORY_MB || '256', 10);
+
+const encode = (value) => Buffer.from(String(value), 'utf8').toString('base64');
+const decode = (value) => Buffer.from(value, 'base64').toString('utf8');
+
+// Runs inside each worker: waits for the job's code, then runs it as `node -e` runs [eval].
+// The port is closed first, so the job cannot message the daemon.
+const BOOTSTRAP = `
+const { parentPort } = require('worker_threads');
+const vm = require('vm');
+parentPort.once('message', (code) => {
+    parentPort.close();
+    Object.assign(globalThis, { require, module, exports, __filename: '[eval]', __dirname: '.' });
+    vm.runInThisContext(code, { filename: '[eval]' });
+});
+`;
+
+// Keeps the head and tail of a job's output within `max` characters (UTF-16 units, which is
+// close enough to bytes for a cap) and counts what falls in between
+class OutputCapture {
+    constructor(max) {
+        this.max = max;
+        this.headLimit = max - Math.floor(max / 2);
+        this.tailLimit = Math.floor(max / 2);
+        this.head = [];
+        this.headSize = 0;
+        this.tail = '';
+        this.total = 0;
+    }
+
+    push(text) {
+        this.total += text.length;
+        if (!this.max || this.headSize < this.headLimit) {
+            const room = this.max ? this.headLimit - this.headSize : text.length;
+            this.head.push(text.slice(0, room));
+            this.headSize += Math.min(room, text.length);
+            text = text.slice(room);
+        }
+        if (text && this.tailLimit) this.tail = (this.tail + text).slice(-this.tailLimit);
+    }
+
+    join() {
+        const omitted = this.total - this.headSize - this.tail.length;
+        const marker = omitted > 0 ? `\n... [${omitted} bytes of output omitted] ...\n` : '';
+        return this.head.join('') + marker + this.tail;
+    }
+}
+
+// Drops the worker's bootstrap frames so the trace looks like one from `node -e`
+function formatError(error) {
+    if (!error || !error.stack) return String(error);
+    return error.stack.split('\n').filter((line) => !line.includes('[worker eval]') && !/\(node:|at node:/.test(line)).join('\n');
+}
+
+// A started worker with its output already being captured, waiting for a job
+function startWorker() {
+    const worker = new Worker(BOOTSTRAP, {
+        eval: true, stdout: true, stderr: true, env: {}, argv: [],
+        resourceLimits: { maxOldGenerationSizeMb: MEMORY_MB },
+    });
+    const job = { worker, stdout: new OutputCapture(OUTPUT_MAX), stderr: new OutputCapture(OUTPUT_MAX), error: null };
+    worker.stdout.setEncoding('utf8');
+    worker.stderr.setEncoding('utf8');
+    worker.stdout.on('data', (chunk) => job.stdout.push(chunk));
+    worker.stderr.on('data', (chunk) => job.stderr.push(chunk));
+    const ended = (stream) => new Promise((resolve) => stream.once('end', resolve));
+    const exited = new Promise((resolve) => worker.once('exit', resolve));
+    worker.on('error', (error) => { job.error = job.error || error; });
+    // Exit code, once the worker has exited and its output is fully read
+    job.done = Promise.all([exited, ended(worker.stdout), ended(worker.stderr)]).then(([code]) => code);
+    return job;
+}
+
+let spare = null;
+
+function runJob(code, timeoutMs) {
+    // Daemon-wide CPU time, so it includes other jobs that happened to run at the same time
+    const cpuStart = process.cpuUsage();
+    const job = spare || startWorker();
+    spare = null;
+    setImmediate(() => { spare = spare || startWorker(); });
+
+    let timedOut = false;
+    const deadline = setTimeout(() => { timedOut = true; job.worker.terminate(); }, timeoutMs);
+    job.worker.postMessage(code);
+    return job.done.then((exitCode) => {
+        clearTimeout(deadline);
+        if (job.error && !timedOut) job.stderr.push(`${formatError(job.error)}\n`);
+        const status = timedOut ? 'TIMEOUT' : (job.error || exitCode !== 0 ? 'ERROR' : 'OK');
+        const cpu = process.cpuUsage(cpuStart);
+        return [status, job.stdout.join(), job.stderr.join(), `${cpu.user} ${cpu.system}`];
+    });
+}
+
+const server = net.createServer((socket) => {
+    let buffer = '';
+    socket.setEncoding('utf8');
+    socket.on('error', () => {});
+    socket.on('data', (data) => {
+        buffer += data;
+        const newline = buffer.indexOf('\n');
+        if (newline === -1) return;
+        const fields = buffer.slice(0, newline).split('\t').map(decode);
+        buffer = '';
+        if (fields[0] !== TOKEN || fields[1] !== 'RUN') {
+            socket.destroy();
+            return;
+        }
+        runJob(fields[2], parseInt(fields[3], 10) || 5000).then(([status, out, err, cpu]) => {
+            const reply = [status, process.memoryUsage().rss, out, err, cpu].map(encode).join('\t');
+            socket.end(reply + '\n');
+        });
+    });
+});
+
+server.listen(0, '127.0.0.1', () => {
+    spare = startWorker();
+    process.stdout.write(`LISTENING ${server.address().port}\n`);
+});
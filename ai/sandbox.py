@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import asyncio
+import tempfile
+from collections import deque
+from typing import Callable, List, Optional
+
+from output_capture import OUTPUT_MAX_BYTES
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+# Workers get just enough environment to run Python, so the service's API keys are not in
+# user code's environment. This is not filesystem isolation: workers run as the service's
+# user, and anything that user can read (a .env file included) user code can read too.
+WORKER_ENV_KEYS = ("PATH", "LANG", "LC_ALL", "SYSTEMROOT", "TEMP", "TMP")
+# Results are single JSON lines; the default 64 KiB StreamReader limit is too small for chatty programs
+PIPE_LIMIT = 16 * 1024 * 1024
+
+
+class PythonWorker:
+    """One warm worker process running sandbox_worker.py, spoken to over its stdin/stdout pipes."""
+
+    def __init__(self, process: asyncio.subprocess.Process, workdir: str):
+        self.process = process
+        self.workdir = workdir
+        self.runs = 0
+        self.rss = 0
+
+    @classmethod
+    async def spawn(cls, memory_mb: int, startup_timeout: float = 60.0) -> "PythonWorker":
+        workdir = tempfile.mkdtemp(prefix="sandbox-")
+        env = {key: os.environ[key] for key in WORKER_ENV_KEYS if key in os.environ}
+        env["SANDBOX_MEMORY_MB"] = str(memory_mb)
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        # Jobs are forked from the worker; a BLAS thread pool started before the fork would not survive it
+        for key in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            env[key] = "1"
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            cwd=workdir, env=env, limit=PIPE_LIMIT,
+            # Its own process group, so kill() also takes down the job it has forked
+            start_new_session=hasattr(os, "killpg"),
+        )
+        worker = cls(process, workdir)
+        try:
+            # The worker announces itself once pandas/numpy are imported
+            line = await asyncio.wait_for(process.stdout.readline(), timeout=startup_timeout)
+            if not line:
+                raise RuntimeError(f"worker exited during startup (code {await process.wait()})")
+            worker.rss = json.loads(line).get("rss", 0)
+        except BaseException:
+            worker.kill()
+            raise
+        return worker
+
+    async def run(self, job: dict, on_output: Optional[Callable[[str, str], None]] = None) -> dict:
+        self.process.stdin.write((json.dumps(job) + "\n").encode("utf-8"))
+        await self.process.stdin.drain()
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise EOFError("worker exited")
+            message = json.loads(line)
+            if "stream" not in message:
+                return message
+            if on_output is not None:
+                on_output(message["stream"], message["data"])
+
+    def kill(self):
+        try:
+            if hasattr(os, "killpg"):
+                # The worker may already be gone while its forked job still runs
+                os.killpg(self.process.pid, signal.SIGKILL)
+            elif self.process.returncode is None:
+                self.process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class PythonWorkerPool:
+    """
+    Pool of pre-started Python processes that run user code for /run-code and /evaluate-code.
+
+    Each job runs in a process forked from a worker that already has pandas and numpy
+    imported (see sandbox_worker.py), with a CPU-time rlimit and a wall-clock timeout
+    enforced from here. A job that crashes or hits its CPU limit only loses its own
+    process; a worker whose job times out is killed and replaced in the background.
+    A healthy worker is also replaced after `max_runs` jobs or once its RSS passes
+    `max_rss_mb`, so leaked state and memory do not accumulate. User code never runs
+    in the service process, so a runaway submission cannot stall the event loop.
+
+    When every worker is busy, single runs (/run-code) get the next free worker ahead
+    of test suites (/evaluate-code), mirroring the execution scheduler's classes.
+    """
+
+    def __init__(self, size: int, wall_timeout: float = 10.0, cpu_limit: float = 5.0, max_runs: int = 100,
+                 max_rss_mb: int = 512, memory_mb: int = 1024, max_output: int = OUTPUT_MAX_BYTES,
+                 queue_timeout: float = 30.0):
+        self.size = size
+        self.wall_timeout = wall_timeout
+        self.cpu_limit = cpu_limit
+        self.max_runs = max_runs
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.memory_mb = memory_mb
+        self.max_output = max_output
+        self.queue_timeout = queue_timeout
+        # Created in start() so they bind to the server's running loop
+        self._idle = None
+        # Futures of jobs waiting for a worker; urgent ones are handed workers first
+        self._urgent_waiters = deque()
+        self._waiters = deque()
+        self._workers = set()
+        self._spawning = set()
+        self.runs = 0
+        self.timeouts = 0
+        self.cpu_limit_kills = 0
+        self.crashes = 0
+        self.recycled = 0
+        self.busy = 0
+        self.total_run_time = 0.0
+
+    def start(self):
+        if self._idle is not None:
+            return
+        self._idle = []
+        for _ in range(self.size):
+            self._replace()
+
+    async def warmup(self):
+        """Starts the pool and waits until its first workers have imported numpy/pandas and are idle."""
+        self.start()
+        await asyncio.gather(*list(self._spawning), return_exceptions=True)
+
+    async def stop(self):
+        for task in list(self._spawning):
+            task.cancel()
+        for worker in list(self._workers):
+            worker.kill()
+        self._workers.clear()
+        self._idle = None
+
+    def _replace(self):
+        task = asyncio.ensure_future(self._spawn())
+        self._spawning.add(task)
+        task.add_done_callback(self._spawning.discard)
+
+    async def _spawn(self):
+        delay = 0.5
+        while True:
+            try:
+                worker = await PythonWorker.spawn(self.memory_mb)
+                break
+            except Exception as e:
+                print(f"Python worker failed to start: {e}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+        self._workers.add(worker)
+        self._put_idle(worker)
+
+    def _put_idle(self, worker: PythonWorker):
+        for waiters in (self._urgent_waiters, self._waiters):
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    future.set_result(worker)
+                    return
+        self._idle.append(worker)
+
+    async def _get_idle(self, urgent: bool) -> PythonWorker:
+        if self._idle:
+            return self._idle.pop()
+        future = asyncio.get_running_loop().create_future()
+        (self._urgent_waiters if urgent else self._waiters).append(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # Handed a worker just as the wait ended
+                self._put_idle(future.result())
+            future.cancel()
+            raise
+
+    def _retire(self, worker: PythonWorker):
+        self._workers.discard(worker)
+        worker.kill()
+        self._replace()
+
+    async def run(self, code: str, stdin: Optional[str] = None,
+                  on_output: Optional[Callable[[str, str], None]] = None) -> dict:
+        """
+        Runs `code` in a worker. Returns {"output", "error", "usage"}; `error` is None on
+        success and `usage` is the job's resource usage (see sandbox_worker.run_job).
+        With `on_output`, it is called with ("stdout", text) as the program prints.
+        """
+        job = {"code": code}
+        if stdin is not None:
+            job["stdin"] = stdin
+        if on_output is not None:
+            job["stream"] = True
+        result = await self._execute(job, on_output, urgent=True)
+        return {"output": result.get("output", ""), "error": result.get("error"), "usage": result["usage"]}
+
+    async def run_cases(self, code: str, inputs: List[str]) -> List[dict]:
+        """
+        Loads `code` once and prints each input expression against it, all in one worker.
+        Returns one {"output", "error", "usage"} per input; `usage` covers the whole job.
+        """
+        result = await self._execute({"code": code, "cases": inputs})
+        usage = result["usage"]
+        if "cases" not in result:
+            # The whole run failed (timeout, CPU limit, crash); every case gets that error
+            return [{"output": "", "error": result["error"], "usage": usage} for _ in inputs]
+        return [{**case, "usage": usage} for case in result["cases"]]
+
+    async def _execute(self, job: dict, on_output: Optional[Callable[[str, str], None]] = None,
+                       urgent: bool = False) -> dict:
+        start = time.perf_counter()
+        result = await self._dispatch(job, on_output, urgent)
+        # Jobs that never finished in a worker (busy pool, timeout, crash) still report their wall time
+        result.setdefault("usage", {"wall_ms": round((time.perf_counter() - start) * 1000, 1)})
+        return result
+
+    async def _dispatch(self, job: dict, on_output: Optional[Callable[[str, str], None]], urgent: bool) -> dict:
+        self.start()
+        try:
+            worker = await self._get_idle(urgent)
+        except asyncio.TimeoutError:
+            return {"output": "", "error": f"All {self.size} Python workers are busy; please try again"}
+
+        job = {**job, "cpu_limit": self.cpu_limit, "max_output": self.max_output}
+        self.busy += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(worker.run(job, on_output), timeout=self.wall_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._retire(worker)
+            return {"output": "", "error": f"Time limit exceeded: execution took longer than {self.wall_timeout:g}s"}
+        except (EOFError, ConnectionError):
+            returncode = await worker.process.wait()
+            self._retire(worker)
+            if returncode == -getattr(signal, "SIGXCPU", 0):
+                self.cpu_limit_kills += 1
+                return {"output": "", "error": f"CPU time limit exceeded ({self.cpu_limit:g}s)"}
+            self.crashes += 1
+            return {"output": "", "error": f"Execution process crashed (exit code {returncode})"}
+        except BaseException:
+            # Cancelled mid-job: the worker's state is unknown, so it is not reused
+            self._retire(worker)
+            raise
+        finally:
+            self.busy -= 1
+            self.total_run_time += time.perf_counter() - start
+
+        exit_reason = result.pop("exit", None)
+        if exit_reason == "cpu_limit":
+            self.cpu_limit_kills += 1
+            result["error"] = f"CPU time limit exceeded ({self.cpu_limit:g}s)"
+        elif exit_reason == "crashed":
+            self.crashes += 1
+        else:
+            self.runs += 1
+        worker.runs += 1
+        worker.rss = result.get("rss", 0)
+        if worker.runs >= self.max_runs or (self.max_rss and worker.rss > self.max_rss):
+            self.recycled += 1
+            self._retire(worker)
+        else:
+            self._put_idle(worker)
+        return result
+
+    def stats(self) -> dict:
+        finished = self.runs + self.timeouts + self.cpu_limit_kills + self.crashes
+        return {
+            "workers": self.size,
+            "idle": len(self._idle) if self._idle is not None else 0,
+            "busy": self.busy,
+            "starting": len(self._spawning),
+            "runs": self.runs,
+            "timeouts": self.timeouts,
+            "cpu_limit_kills": self.cpu_limit_kills,
+            "crashes": self.crashes,
+            "recycled": self.recycled,
+            "avg_run_ms": round(self.total_run_time / finished * 1000, 1) if finished else 0.0,
+            "max_rss_mb": round(max((w.rss for w in self._workers), default=0) / 1024 / 1024, 1),
+        }
@@ -0,0 +1,242 @@
+"""
+Python execution worker, started and supervised by sandbox.PythonWorkerPool.
+
+Reads one JSON job per line from stdin and writes one JSON result per line back;
+a streaming job's output is sent ahead of its result as {"stream", "data"} lines.
+pandas and numpy are imported once at startup, so each job starts warm.
+
+The worker is a zygote: every job runs in a child forked from it, and the child
+closes the protocol pipes before running user code. Whatever a job does to its
+process (threads left running, patched builtins, writes to stray fds) dies with
+the child, and the only channel it can write to is its own job's result pipe,
+which the worker reads to EOF before taking the next job. Where fork is not
+available the job runs in the worker itself, with its own copy of the builtins.
+"""
+import io
+import os
+import sys
+import json
+import time
+import signal
+import builtins
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from typing import Callable, Optional
+
+from output_capture import TextCapture
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, only the pool's wall-clock timeout applies
+    resource = None
+
+PRELOADED = {}
+try:
+    import numpy as np
+    PRELOADED["np"] = np
+    import pandas as pd
+    PRELOADED["pd"] = pd
+except ImportError:
+    pass
+
+
+def current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        # Peak rather than current RSS, but good enough to decide on recycling
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else 0
+
+
+def reset_peak_rss():
+    """Linux: resets VmHWM (the peak RSS) so the next job's peak is measured on its own."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+FORK = hasattr(os, "fork")
+
+
+def peak_rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+
+
+def limit_cpu(seconds: float):
+    """Lets the next job use `seconds` more CPU time; the kernel sends SIGXCPU past that."""
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def execute(source: str, filename: str, exec_globals: dict, max_output: int,
+            on_output: Optional[Callable[[str], None]] = None):
+    """
+    Runs `source` in `exec_globals`. Returns (captured stdout+stderr, error message or
+    None, bytes printed); the capture keeps the head and tail within `max_output` bytes.
+    """
+    stdout = TextCapture(max_output, on_output=on_output)
+    error = None
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stdout):
+            exec(compile(source, filename, "exec"), exec_globals)
+    except SystemExit:
+        pass
+    except BaseException as e:
+        error = str(e) or type(e).__name__
+    return stdout.getvalue(), error, stdout.capture.total
+
+
+def run_job(job: dict, emit: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Executes the submission once. With "cases", each case expression is then printed
+    in the same globals, so the program is loaded once for the whole test suite. A
+    case's output is the program's own output followed by the printed expression,
+    the same text a separate run of `code + print(case)` would produce. sys.stdin
+    reads the job's "stdin" text (empty if it has none). With "stream", the
+    submission's output is also passed to `emit` while it runs.
+
+    "usage" reports the job's wall and CPU time, the worker's peak RSS during the job
+    (preloaded libraries included) and the bytes the job printed.
+    """
+    limit_cpu(job.get("cpu_limit", 0))
+    reset_peak_rss()
+    start = time.perf_counter()
+    before = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+    sys.stdin = io.StringIO(job.get("stdin", ""))
+    max_output = job.get("max_output", 0)
+    # A copy, so rebinding a builtin only affects this job (a forked job's changes die with it anyway)
+    exec_globals = {"__builtins__": dict(builtins.__dict__), "__name__": "__main__", **PRELOADED}
+    output, error, stdout_bytes = execute(
+        job["code"], "<submission>", exec_globals, max_output, on_output=emit if job.get("stream") else None
+    )
+    result = {"output": output, "error": error}
+    if "cases" in job:
+        cases = []
+        for source in job["cases"]:
+            if error is not None or not source:
+                cases.append({"output": result["output"], "error": error})
+                continue
+            case_output, case_error, case_bytes = execute(f"print({source})", "<test case>", exec_globals, max_output)
+            stdout_bytes += case_bytes
+            cases.append({"output": output + case_output, "error": case_error})
+        result["cases"] = cases
+
+    usage = {"wall_ms": round((time.perf_counter() - start) * 1000, 1)}
+    if before is not None:
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        usage["cpu_user_ms"] = round((after.ru_utime - before.ru_utime) * 1000, 1)
+        usage["cpu_sys_ms"] = round((after.ru_stime - before.ru_stime) * 1000, 1)
+    usage["peak_rss_kb"] = peak_rss_kb()
+    usage["stdout_bytes"] = stdout_bytes
+    result["usage"] = usage
+    return result
+
+
+def write_message(stream, message: dict):
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+
+def run_forked(job: dict, protocol_fds: list, forward: Callable[[str], None]) -> dict:
+    """
+    Runs the job in a forked child and returns its result. The child's stream lines
+    go to `forward` as they arrive; its last other line is the result. A child that
+    dies without one (CPU limit, crash) gets an error result with "exit" set.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            os.close(read_fd)
+            for fd in protocol_fds:
+                os.close(fd)
+            results = os.fdopen(write_fd, "w", encoding="utf-8")
+
+            def emit(text: str):
+                write_message(results, {"stream": "stdout", "data": text})
+
+            try:
+                result = run_job(job, emit)
+            except BaseException:
+                result = {"output": "", "error": traceback.format_exc(limit=1)}
+            write_message(results, result)
+        except BaseException:
+            status = 1
+        finally:
+            # Skips atexit handlers and kills any threads the job left behind
+            os._exit(status)
+
+    os.close(write_fd)
+    result = None
+    with os.fdopen(read_fd, "r", encoding="utf-8", errors="replace") as results:
+        for line in results:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            if "stream" in message:
+                if isinstance(message.get("data"), str):
+                    forward(message["data"])
+            else:
+                result = message
+    _, status = os.waitpid(pid, 0)
+    if os.WIFSIGNALED(status) and os.WTERMSIG(status) == getattr(signal, "SIGXCPU", None):
+        return {"output": "", "error": None, "exit": "cpu_limit"}
+    if result is None or not isinstance(result.get("usage"), dict):
+        code = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        return {"output": "", "error": f"Execution process crashed (exit code {code})", "exit": "crashed"}
+    return result
+
+
+def main():
+    memory_mb = int(os.getenv("SANDBOX_MEMORY_MB", "0"))
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    responses = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    write_message(responses, {"ready": True, "rss": current_rss()})
+
+    def emit(text: str):
+        write_message(responses, {"stream": "stdout", "data": text})
+
+    for line in requests:
+        try:
+            job = json.loads(line)
+            if FORK:
+                result = run_forked(job, [requests.fileno(), responses.fileno()], emit if job.get("stream") else lambda _: None)
+            else:
+                result = run_job(job, emit)
+        except BaseException:
+            result = {"output": "", "error": traceback.format_exc(limit=1)}
+        result["rss"] = current_rss()
+        write_message(responses, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one upstream call.
+
+    The first caller for a key (the leader) starts the work as its own task; every
+    caller, leader included, awaits it through asyncio.shield. If the leader's client
+    disconnects, only the leader's await is cancelled and the other waiters still get
+    the result. The upstream task is cancelled only once nobody is waiting for it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, k=key, f=flight: self._forget(k, f))
+            self.upstream_calls += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Drop the key first so a new caller starts fresh instead of joining a cancelled task
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                self.abandoned += 1
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Retrieve the exception so abandoned failures are not reported as "never retrieved"
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": {key: flight.waiters for key, flight in self._flights.items()},
+        }
@@ -0,0 +1,325 @@
+"""
+SQL execution for /run-code and /evaluate-code.
+
+Named fixture databases (FIXTURES) are built once into in-memory SQLite databases;
+each run gets a private copy through the SQLite backup API, which copies pages
+instead of replaying the fixture's SQL. Scripts are split with
+sqlite3.complete_statement, so semicolons inside strings, comments and trigger
+bodies do not break statements apart. Result rows are read incrementally: only the
+first `max_rows` are formatted, while every row feeds a ResultHasher so /evaluate-code
+can compare whole result sets by hash.
+
+Submitted SQL runs under an authorizer that keeps it inside its private database: no
+ATTACH or DETACH (which would open any file the service can read or write, including
+the judge cache, and which also covers VACUUM INTO), no pragmas beyond schema
+introspection, and no load_extension.
+"""
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+FIXTURES: Dict[str, str] = {
+    "company": """
+        CREATE TABLE departments (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            location TEXT
+        );
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            department_id INTEGER REFERENCES departments(id),
+            manager_id INTEGER REFERENCES employees(id),
+            title TEXT,
+            salary INTEGER,
+            hire_date TEXT
+        );
+        CREATE TABLE customers (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            city TEXT,
+            signup_date TEXT
+        );
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY,
+            customer_id INTEGER REFERENCES customers(id),
+            employee_id INTEGER REFERENCES employees(id),
+            order_date TEXT,
+            status TEXT,
+            amount REAL
+        );
+        INSERT INTO departments VALUES
+            (1, 'Engineering', 'Bengaluru'), (2, 'Sales', 'Mumbai'),
+            (3, 'Marketing', 'Mumbai'), (4, 'Support', 'Chennai');
+        INSERT INTO employees VALUES
+            (1, 'Asha Rao', 1, NULL, 'CTO', 250000, '2018-01-15'),
+            (2, 'Vikram Iyer', 1, 1, 'Senior Engineer', 160000, '2019-03-01'),
+            (3, 'Meera Nair', 1, 2, 'Engineer', 110000, '2021-07-19'),
+            (4, 'Rahul Verma', 1, 2, 'Engineer', 105000, '2022-02-07'),
+            (5, 'Priya Shah', 2, 1, 'Sales Manager', 140000, '2018-11-05'),
+            (6, 'Arjun Das', 2, 5, 'Account Executive', 85000, '2020-05-11'),
+            (7, 'Kavya Menon', 2, 5, 'Account Executive', 82000, '2023-01-09'),
+            (8, 'Rohan Gupta', 3, 1, 'Marketing Lead', 120000, '2019-09-23'),
+            (9, 'Sneha Pillai', 3, 8, 'Content Writer', 70000, '2022-08-29'),
+            (10, 'Imran Khan', 4, 1, 'Support Lead', 90000, '2020-10-12'),
+            (11, 'Divya Reddy', 4, 10, 'Support Engineer', 65000, '2023-04-03'),
+            (12, 'Karan Mehta', NULL, 1, 'Intern', 30000, '2024-06-01');
+        INSERT INTO customers VALUES
+            (1, 'Acme Traders', 'Mumbai', '2021-02-10'),
+            (2, 'Globex Retail', 'Delhi', '2021-06-22'),
+            (3, 'Initech Labs', 'Bengaluru', '2022-01-05'),
+            (4, 'Umbrella Foods', 'Chennai', '2022-09-14'),
+            (5, 'Stark Supplies', 'Pune', '2023-03-30'),
+            (6, 'Wayne Logistics', 'Delhi', '2024-01-18');
+        INSERT INTO orders VALUES
+            (1, 1, 6, '2024-01-03', 'delivered', 1200.00),
+            (2, 2, 6, '2024-01-11', 'delivered', 540.50),
+            (3, 1, 7, '2024-02-02', 'shipped', 2300.00),
+            (4, 3, 6, '2024-02-15', 'delivered', 780.25),
+            (5, 4, 7, '2024-03-01', 'cancelled', 150.00),
+            (6, 2, 5, '2024-03-09', 'delivered', 3100.00),
+            (7, 5, 7, '2024-03-21', 'pending', 620.00),
+            (8, 3, 6, '2024-04-04', 'shipped', 980.75),
+            (9, 1, 5, '2024-04-18', 'delivered', 1750.00),
+            (10, 4, 6, '2024-05-02', 'pending', 430.00);
+    """,
+}
+
+# String literals, quoted identifiers and comments are skipped whole so their contents
+# cannot open parentheses or spell ORDER BY
+SQL_TOKEN = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)|\w+|\S""",
+                       re.DOTALL)
+
+
+def has_top_level_order_by(statement: str) -> bool:
+    """
+    Whether the statement's own result is sorted: an ORDER BY outside all parentheses,
+    which SQL only allows at the end of the statement. Those inside subqueries, CTEs and
+    window definitions (`OVER (ORDER BY ...)`) do not order the rows returned.
+    """
+    depth = 0
+    previous = None
+    for token in SQL_TOKEN.findall(statement):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0 and token.lower() == "by" and previous == "order":
+            return True
+        if token[0].isalnum() or token[0] == "_":
+            previous = token.lower() if depth == 0 else None
+        elif token[0] not in "-/":
+            previous = None
+    return False
+
+
+def split_statements(script: str) -> List[str]:
+    """Splits a script into complete statements, each with its trailing semicolon."""
+    statements = []
+    buffer = ""
+    for piece in script.split(";"):
+        buffer += piece + ";"
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip(" \t\r\n;"):
+                statements.append(buffer.strip())
+            buffer = ""
+    # Whatever is left after the last complete statement had no semicolon of its own
+    remainder = buffer[:-1].strip()
+    if remainder:
+        statements.append(remainder)
+    return statements
+
+
+# Schema introspection only; every other pragma can change how the connection or database behaves
+READ_ONLY_PRAGMAS = {"table_info", "table_xinfo", "table_list", "index_list", "index_info", "index_xinfo",
+                     "foreign_key_list"}
+# SQL functions that reach outside the database
+BLOCKED_FUNCTIONS = {"load_extension"}
+# Not exported by the sqlite3 module of every Python version
+SQLITE_FUNCTION = getattr(sqlite3, "SQLITE_FUNCTION", 31)
+
+
+def authorize(action: int, arg1: Optional[str], arg2: Optional[str], database: Optional[str],
+              trigger: Optional[str]) -> int:
+    """sqlite3 authorizer for submitted SQL."""
+    if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH):
+        return sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_PRAGMA and (arg1 or "").lower() not in READ_ONLY_PRAGMAS:
+        return sqlite3.SQLITE_DENY
+    if action == SQLITE_FUNCTION and (arg2 or "").lower() in BLOCKED_FUNCTIONS:
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+def format_cell(value) -> str:
+    return "NULL" if value is None else str(value)
+
+
+class ResultHasher:
+    """
+    Digest of a result set, computed one row at a time.
+
+    `ordered` depends on row order; `unordered` (a sum of per-row digests) does not,
+    so results of queries without ORDER BY compare equal in any order.
+    """
+
+    def __init__(self):
+        self._ordered = hashlib.sha256()
+        self._unordered = 0
+        self.rows = 0
+
+    def update(self, cells: List[str]):
+        digest = hashlib.sha256(json.dumps([cell.strip() for cell in cells]).encode("utf-8")).digest()
+        self._ordered.update(digest)
+        self._unordered = (self._unordered + int.from_bytes(digest, "big")) % (1 << 256)
+        self.rows += 1
+
+    def digest(self, ordered: bool) -> str:
+        return self._ordered.hexdigest() if ordered else f"{self._unordered:064x}"
+
+
+def hash_rows(rows: List[List[str]], ordered: bool) -> str:
+    hasher = ResultHasher()
+    for row in rows:
+        hasher.update(row)
+    return hasher.digest(ordered)
+
+
+def parse_expected_rows(text: str) -> List[List[str]]:
+    """Rows from an expected output written like the runner's own output (cells separated by `|`)."""
+    rows = []
+    for line in text.strip().splitlines():
+        if not line.strip() or set(line.strip()) <= set("-+| "):
+            continue
+        rows.append([cell.strip() for cell in line.split("|")])
+    return rows
+
+
+class SQLRunner:
+    """Builds the fixture databases and runs scripts against private copies of them."""
+
+    def __init__(self, fixtures: Dict[str, str], max_rows: int = 200, time_limit: float = 5.0):
+        self.fixtures = fixtures
+        self.max_rows = max_rows
+        self.time_limit = time_limit
+        self._databases: Dict[str, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.clones = 0
+        self.clone_seconds = 0.0
+
+    def build(self):
+        """Creates every fixture database; called once at startup (or by the first run)."""
+        with self._lock:
+            for name, script in self.fixtures.items():
+                if name not in self._databases:
+                    database = sqlite3.connect(":memory:", check_same_thread=False)
+                    database.executescript(script)
+                    database.commit()
+                    self._databases[name] = database
+
+    def tables(self) -> Dict[str, List[str]]:
+        self.build()
+        with self._lock:
+            return {
+                name: [row[0] for row in database.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+                for name, database in self._databases.items()
+            }
+
+    def connect(self, fixture: Optional[str]) -> sqlite3.Connection:
+        """A private in-memory database, empty or a copy of the named fixture, locked down by authorize()."""
+        conn = sqlite3.connect(":memory:", isolation_level=None)
+        if fixture:
+            if fixture not in self.fixtures:
+                conn.close()
+                raise ValueError(f"Unknown SQL fixture '{fixture}'. Available: {', '.join(sorted(self.fixtures))}")
+            self.build()
+            start = time.perf_counter()
+            with self._lock:
+                self._databases[fixture].backup(conn)
+            self.clones += 1
+            self.clone_seconds += time.perf_counter() - start
+        conn.set_authorizer(authorize)
+        if hasattr(conn, "setlimit"):  # Python 3.11+
+            conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+        return conn
+
+    def run(self, script: str, fixture: Optional[str] = None) -> dict:
+        """
+        Runs every statement in `script`. Returns {"output", "error", "result", "usage"}: `error` is
+        set only when the run could not start, and `result` describes the last result set
+        or is None if no statement returned rows. `result["ordered"]` says whether the
+        query had a top-level ORDER BY; `result["hashes"]` holds both ResultHasher digests.
+        """
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            conn = self.connect(fixture)
+        except ValueError as e:
+            return {"output": "", "error": str(e), "result": None, "usage": {}}
+        self.runs += 1
+        deadline = time.monotonic() + self.time_limit
+        # Aborts the running statement with "interrupted" once the time limit has passed
+        conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+
+        output_buffer = []
+        result = None
+        try:
+            for statement in split_statements(script):
+                try:
+                    cursor = conn.execute(statement)
+                    if cursor.description is None:
+                        output_buffer.append(f"Executed: {statement[:50]}... (Rows affected: {cursor.rowcount})")
+                        continue
+                    columns = [description[0] for description in cursor.description]
+                    output_buffer.append(f"Result for: {statement[:50]}...")
+                    output_buffer.append(" | ".join(columns))
+                    output_buffer.append("-" * 30)
+                    hasher = ResultHasher()
+                    while True:
+                        rows = cursor.fetchmany(100)
+                        if not rows:
+                            break
+                        for row in rows:
+                            cells = [format_cell(value) for value in row]
+                            hasher.update(cells)
+                            if hasher.rows <= self.max_rows:
+                                output_buffer.append(" | ".join(cells))
+                    if hasher.rows > self.max_rows:
+                        output_buffer.append(f"... ({hasher.rows - self.max_rows} more rows not shown, {hasher.rows} total)")
+                    output_buffer.append("\n")
+                    ordered = has_top_level_order_by(statement)
+                    result = {
+                        "columns": columns,
+                        "rows": hasher.rows,
+                        "ordered": ordered,
+                        "hashes": {"ordered": hasher.digest(True), "unordered": hasher.digest(False)},
+                    }
+                except Exception as stmt_err:
+                    output_buffer.append(f"Error executing statement '{statement[:30]}...': {str(stmt_err)}")
+                    if time.monotonic() > deadline:
+                        output_buffer.append(f"Time limit of {self.time_limit:g}s exceeded; remaining statements skipped.")
+                        break
+        finally:
+            conn.close()
+        output = "\n".join(output_buffer)
+        # The runner thread's CPU time; thread_time does not split it into user and system time
+        usage = {
+            "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+            "cpu_user_ms": round((time.thread_time() - cpu_start) * 1000, 1),
+            "stdout_bytes": len(output.encode("utf-8")),
+        }
+        return {"output": output, "error": None, "result": result, "usage": usage}
+
+    def stats(self) -> dict:
+        return {
+            "fixtures": sorted(self.fixtures),
+            "built": sorted(self._databases),
+            "runs": self.runs,
+            "clones": self.clones,
+            "clone_ms_avg": round(self.clone_seconds * 1000 / self.clones, 3) if self.clones else 0.0,
+        }
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from exec_scheduler import ExecutionScheduler, SchedulerBusy, INTERACTIVE, GRADING
+
+
+async def run_in_order(scheduler, requests):
+    """Queues `requests` [(user, priority)] behind a held slot and returns the order they start in."""
+    started = []
+    await scheduler.acquire("holder", INTERACTIVE)
+
+    async def run(user, priority):
+        async with scheduler.slot(user, priority):
+            started.append(user)
+            await asyncio.sleep(0)
+
+    tasks = []
+    for user, priority in requests:
+        tasks.append(asyncio.ensure_future(run(user, priority)))
+        await asyncio.sleep(0)
+    scheduler.release("holder", INTERACTIVE)
+    await asyncio.gather(*tasks)
+    return started
+
+
+def test_user_with_one_submission_is_not_starved_by_a_backlog():
+    scheduler_order = asyncio.run(run_in_order(
+        ExecutionScheduler(slots=1),
+        [("alice", INTERACTIVE)] * 5 + [("bob", INTERACTIVE)],
+    ))
+    # Bob's only run starts right after Alice's first, not after all five
+    assert scheduler_order.index("bob") == 1
+
+
+def test_interactive_runs_overtake_queued_grading():
+    order = asyncio.run(run_in_order(
+        ExecutionScheduler(slots=1),
+        [("grader", GRADING)] * 4 + [("student", INTERACTIVE)],
+    ))
+    assert order.index("student") <= 1
+
+
+def test_per_user_queue_limit_rejects():
+    async def main():
+        scheduler = ExecutionScheduler(slots=1, max_user_queue=2)
+        await scheduler.acquire("holder", INTERACTIVE)
+        waiting = [asyncio.ensure_future(scheduler.acquire("alice", INTERACTIVE)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy):
+            await scheduler.acquire("alice", INTERACTIVE)
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.queued == 0
+
+
+def test_queue_timeout_raises_busy_and_frees_the_queue():
+    async def main():
+        scheduler = ExecutionScheduler(slots=1, queue_timeout=0.05)
+        await scheduler.acquire("holder", INTERACTIVE)
+        with pytest.raises(SchedulerBusy):
+            await scheduler.acquire("alice", INTERACTIVE)
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.queued == 0 and scheduler.running == 1
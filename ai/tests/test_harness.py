@@ -0,0 +1,62 @@
+import shutil
+import subprocess
+
+import pytest
+
+from harness import RESULT_MARKER, build_javascript_harness, parse_harness_output
+from output_capture import OutputCapture
+
+needs_node = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+
+def run_node(source, count=2, max_output=0):
+    """Runs the harness and reads its stdout through the same cap the runners apply."""
+    result = subprocess.run(["node", "-e", source], capture_output=True, timeout=30)
+    capture = OutputCapture(max_output)
+    capture.write(result.stdout)
+    return parse_harness_output(capture.text(), result.stderr.decode(), result.returncode, count)
+
+
+def test_missing_result_line_fails_every_case_with_stderr():
+    results = parse_harness_output("partial output", "SyntaxError: bad", 1, 3)
+    assert results == [{"output": "", "error": "SyntaxError: bad"}] * 3
+
+
+def test_result_line_is_found_after_program_output():
+    stdout = f"hello\n{RESULT_MARKER}" + '{"program": "top\\n", "cases": [{"output": "1\\n", "error": null}]}'
+    assert parse_harness_output(stdout, "", 0, 1) == [{"output": "top\n1\n", "error": None}]
+
+
+def test_unreadable_result_line_is_a_harness_error_for_every_case():
+    stdout = f"{RESULT_MARKER}" + '{"program": "abc'
+    results = parse_harness_output(stdout, "", 0, 2)
+    assert len(results) == 2
+    assert all("harness results" in result["error"] for result in results)
+
+
+@needs_node
+def test_javascript_cases_run_against_one_load_of_the_program():
+    code = "function add(a, b) { return a + b; }\nconsole.log('loaded');"
+    results = run_node(build_javascript_harness(code, ["add(1, 2)", "missing()"]))
+    assert results[0] == {"output": "loaded\n3\n", "error": None}
+    assert "ReferenceError" in results[1]["error"]
+
+
+@needs_node
+def test_large_top_level_output_survives_the_output_cap():
+    max_output = 256 * 1024
+    code = "for (let i = 0; i < 300; i++) console.log('x'.repeat(98));\nconst square = (n) => n * n;"
+    inputs = [f"square({i})" for i in range(10)]
+    results = run_node(build_javascript_harness(code, inputs, max_output), count=10, max_output=max_output)
+    assert [result["error"] for result in results] == [None] * 10
+    assert all(result["output"].endswith(f"\n{i * i}\n") for i, result in enumerate(results))
+    assert results[0]["output"].startswith("x" * 98)
+
+
+@needs_node
+def test_huge_case_output_is_cut_down_instead_of_breaking_the_report():
+    max_output = 64 * 1024
+    code = "process.stdout.write('y'.repeat(200000));\nconst spam = (n) => 'z'.repeat(n);"
+    results = run_node(build_javascript_harness(code, ["spam(100000)", "1 + 1"], max_output), max_output=max_output)
+    assert "characters of output omitted" in results[0]["output"]
+    assert results[1] == {"output": "2\n", "error": None}
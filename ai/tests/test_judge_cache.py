@@ -0,0 +1,21 @@
+import json
+import sqlite3
+
+from response_cache import TwoTierCache
+from sql_runner import FIXTURES, SQLRunner
+
+
+def test_submitted_sql_cannot_read_or_forge_cached_verdicts(tmp_path):
+    db_path = tmp_path / "judge.sqlite3"
+    judge_cache = TwoTierCache("judge", db_path=str(db_path))
+    verdict = json.dumps({"success": True, "all_passed": False})
+    judge_cache.set("submission", verdict)
+
+    runner = SQLRunner(FIXTURES)
+    read = runner.run(f"ATTACH DATABASE '{db_path}' AS judge; SELECT key, value FROM judge.cache;")
+    assert "submission" not in read["output"]
+    assert read["result"] is None
+    runner.run(f"ATTACH DATABASE '{db_path}' AS judge; UPDATE judge.cache SET value = '{{\"all_passed\": true}}';")
+
+    with sqlite3.connect(str(db_path)) as conn:
+        assert conn.execute("SELECT value FROM cache WHERE key = 'submission'").fetchone()[0] == verdict
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from model_router import CLOSED, HALF_OPEN, OPEN, ModelRouter, error_status, is_retryable_error
+
+
+class ApiError(Exception):
+    def __init__(self, code, message="error"):
+        super().__init__(message)
+        self.code = code
+
+
+def names(router):
+    return [name for name, _ in router.candidates()]
+
+
+def test_breaker_trips_after_repeated_failures_and_probes_after_cooldown():
+    router = ModelRouter({"a": object(), "b": object()}, failure_threshold=3, cooldown=0.05)
+    for _ in range(3):
+        router.record_failure("a", ApiError(503))
+    assert router.health["a"].state == OPEN
+    assert names(router) == ["b"]
+
+    time.sleep(0.06)
+    # One probe is let through, ahead of the healthy model
+    assert names(router) == ["a", "b"]
+    assert router.health["a"].state == HALF_OPEN
+    assert names(router) == ["b"]
+    router.record_success("a", 0.1)
+    assert router.health["a"].state == CLOSED
+
+
+def test_failed_probe_reopens_with_a_longer_cooldown():
+    router = ModelRouter({"a": object()}, failure_threshold=1, cooldown=0.05)
+    router.record_failure("a", ApiError(429))
+    first_cooldown = router.health["a"].cooldown
+    time.sleep(0.06)
+    assert names(router) == ["a"]
+    router.record_failure("a", ApiError(429))
+    assert router.health["a"].state == OPEN
+    assert router.health["a"].cooldown == 2 * first_cooldown
+
+
+def test_unknown_model_trips_at_once():
+    router = ModelRouter({"a": object()}, failure_threshold=3)
+    router.record_failure("a", ApiError(404))
+    assert router.health["a"].state == OPEN
+
+
+def test_retryable_statuses():
+    assert is_retryable_error(ApiError(429))
+    assert is_retryable_error(ApiError(503))
+    assert is_retryable_error(ApiError(404))
+    assert not is_retryable_error(ApiError(400))
+    assert not is_retryable_error(ValueError("bad prompt"))
+
+
+def test_numbers_inside_a_message_are_not_statuses():
+    assert error_status(ValueError("prompt is 500 tokens over the 4290 limit")) is None
+    assert not is_retryable_error(RuntimeError("Response blocked after 429 characters"))
+    assert error_status(RuntimeError("503 The service is currently unavailable")) == 503
+
+
+def test_api_core_errors_are_read_by_code_and_class():
+    exceptions = pytest.importorskip("google.api_core.exceptions")
+    assert error_status(exceptions.ResourceExhausted("Quota exceeded for 500 requests")) == 429
+    assert error_status(exceptions.NotFound("models/gemini-x is not found")) == 404
+    assert error_status(exceptions.DeadlineExceeded("took 429 s")) == 504
+    assert error_status(exceptions.InvalidArgument("field 503 is invalid")) == 400
+
+    class UncodedUnavailable(exceptions.ServiceUnavailable):
+        code = None
+
+    assert error_status(UncodedUnavailable("overloaded")) == 503
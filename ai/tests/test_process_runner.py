@@ -0,0 +1,41 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import process_runner
+from process_runner import run_process
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "wait4"), reason="wait4 path only")
+
+
+def python(code, **kwargs):
+    return asyncio.run(run_process([sys.executable, "-c", code], **kwargs))
+
+
+def test_exit_status_output_and_usage():
+    result = python("import sys; print('hi'); sys.exit(3)", timeout=10)
+    assert result.returncode == 3 and result.stdout == "hi\n"
+    assert result.usage["stdout_bytes"] == 3 and "cpu_user_ms" in result.usage
+
+
+def test_timeout_kills_and_reaps_the_child():
+    start = time.perf_counter()
+    with pytest.raises(subprocess.TimeoutExpired):
+        python("import time; time.sleep(30)", timeout=0.3)
+    assert time.perf_counter() - start < 5
+
+
+@pytest.mark.skipif(not process_runner.SAMPLE_PEAK_RSS, reason="needs /proc")
+def test_peak_rss_is_sampled_while_the_child_runs():
+    result = python("import time; block = bytearray(64 * 1024 * 1024); time.sleep(0.3)", timeout=10)
+    assert result.usage["peak_rss_kb"] >= 60 * 1024
+
+
+def test_exit_is_noticed_without_pidfds(monkeypatch):
+    monkeypatch.delattr(os, "pidfd_open", raising=False)
+    result = python("print(42)", timeout=10)
+    assert result.returncode == 0 and result.stdout == "42\n"
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from rate_limiter import QuotaExceeded, RateLimiter
+
+
+def test_try_acquire_takes_quota_only_while_it_lasts():
+    limiter = RateLimiter(rpm=2, tpm=1000)
+    assert limiter.try_acquire(10)
+    assert limiter.try_acquire(10)
+    assert not limiter.try_acquire(10)
+    assert limiter.admitted == 2
+
+
+def test_acquire_rejects_when_the_projected_wait_is_too_long():
+    async def main():
+        limiter = RateLimiter(rpm=1, tpm=1000, max_wait=1.0)
+        await limiter.acquire(10)
+        with pytest.raises(QuotaExceeded) as excinfo:
+            await limiter.acquire(10)
+        return limiter, excinfo.value
+
+    limiter, error = asyncio.run(main())
+    assert limiter.rejected == 1
+    assert error.retry_after >= 1
+
+
+def test_charged_retries_delay_later_callers():
+    limiter = RateLimiter(rpm=60, tpm=100000)
+    for _ in range(60):
+        limiter.charge(10)
+    assert limiter.charged == 60
+    assert not limiter.try_acquire(10)
+    assert limiter.projected_wait(10) > 0
+
+
+def test_zero_limit_means_unlimited():
+    async def main():
+        limiter = RateLimiter(rpm=0, tpm=1000)
+        for _ in range(50):
+            await limiter.acquire(10)
+        limiter.charge(10)
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert limiter.admitted == 50 and limiter.delayed == 0
+    assert limiter.try_acquire(10)
+    assert RateLimiter(rpm=15, tpm=0).try_acquire(10 ** 9)
+
+
+def test_negative_limit_is_rejected():
+    with pytest.raises(ValueError):
+        RateLimiter(rpm=-1, tpm=1000)
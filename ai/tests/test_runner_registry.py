@@ -0,0 +1,52 @@
+import asyncio
+import sys
+
+from runner_registry import RunnerRegistry
+
+
+def registry(delay_file, reprobe_interval=0.0):
+    """A registry with one toolchain whose version command sleeps for the seconds in `delay_file`."""
+    runners = RunnerRegistry(probe_timeout=0.5, reprobe_interval=reprobe_interval)
+    script = f"import time; time.sleep(float(open({str(delay_file)!r}).read())); print('tool 1.0')"
+    runners.toolchain("tool", sys.executable, "-c", script)
+
+    @runners.register("lang", label="Lang", requires=["tool"], missing="Install tool")
+    async def run_lang(request, usage, on_output):
+        return {"success": True}
+
+    return runners
+
+
+def test_slow_toolchain_is_reported_as_slow_and_probed_again_on_use(tmp_path):
+    delay = tmp_path / "delay"
+    delay.write_text("2")
+    runners = registry(delay)
+
+    async def scenario():
+        await runners.start_probe()
+        first = runners.resolve("lang")
+        status = runners.toolchains["tool"].status
+        delay.write_text("0")
+        await runners.ready("lang")
+        return first, status, runners.resolve("lang")
+
+    (runner, reason), status, (runner_after, _) = asyncio.run(scenario())
+    assert runner is None and status == "timeout"
+    assert "temporarily unavailable" in reason and "Install tool" not in reason
+    assert runner_after is not None and runners.toolchains["tool"].version == "tool 1.0"
+
+
+def test_missing_toolchain_is_not_probed_again_before_the_interval(tmp_path):
+    runners = RunnerRegistry(reprobe_interval=3600)
+    runners.toolchain("tool", "definitely-not-an-installed-tool", "--version")
+    runners.register("lang", label="Lang", requires=["tool"])(lambda request, usage, on_output: None)
+
+    async def scenario():
+        await runners.start_probe()
+        probed_at = runners.toolchains["tool"].probed_at
+        await runners.ready("lang")
+        return probed_at
+
+    probed_at = asyncio.run(scenario())
+    assert runners.toolchains["tool"].status == "missing"
+    assert runners.toolchains["tool"].probed_at == probed_at
@@ -0,0 +1,64 @@
+import asyncio
+import sys
+import textwrap
+
+from runtime_daemons import RuntimeDaemon
+
+# Stands in for runtimes/: each job is a number of seconds to sleep before answering OK
+FAKE_RUNTIME = textwrap.dedent("""
+    import base64, os, socket, threading, time
+
+    def encode(fields):
+        return ("\\t".join(base64.b64encode(f.encode()).decode() for f in fields) + "\\n").encode()
+
+    def serve(conn):
+        with conn, conn.makefile("rb") as stream:
+            token, seconds = [base64.b64decode(f).decode() for f in stream.readline().split(b"\\t")]
+            time.sleep(float(seconds))
+            conn.sendall(encode(["OK", "0", f"slept {seconds}", "", ""]))
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    print("LISTENING", server.getsockname()[1], flush=True)
+    while True:
+        threading.Thread(target=serve, args=(server.accept()[0],), daemon=True).start()
+""")
+
+
+def fake_daemon(tmp_path, **kwargs):
+    script = tmp_path / "fake_runtime.py"
+    script.write_text(FAKE_RUNTIME)
+    return RuntimeDaemon("fake", [sys.executable, str(script)], **kwargs)
+
+
+def test_unanswered_job_drains_the_daemon_instead_of_dropping_other_jobs(tmp_path):
+    async def scenario():
+        daemon = fake_daemon(tmp_path)
+        try:
+            other = asyncio.ensure_future(daemon.call(["1.0"], timeout=10))
+            await asyncio.sleep(0.2)
+            wedged = await daemon.call(["60"], timeout=0.3)
+            return wedged, await other, daemon.stats()
+        finally:
+            await daemon.stop()
+
+    wedged, other, stats = asyncio.run(scenario())
+    assert wedged[0] == "TIMEOUT"
+    assert other[:2] == ("OK", "slept 1.0")
+    assert stats["timeouts"] == 1 and stats["recycles"] == 1
+
+
+def test_retired_daemon_is_killed_when_draining_takes_too_long(tmp_path):
+    async def scenario():
+        daemon = fake_daemon(tmp_path, drain_timeout=0.5)
+        try:
+            other = asyncio.ensure_future(daemon.call(["60"], timeout=30))
+            await asyncio.sleep(0.2)
+            await daemon.call(["60"], timeout=0.3)
+            return await asyncio.wait_for(other, timeout=5)
+        finally:
+            await daemon.stop()
+
+    status, _, stderr, _ = asyncio.run(scenario())
+    assert status == "ERROR" and "stopped" in stderr
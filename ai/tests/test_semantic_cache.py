@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from semantic_cache import GoalIndex, SemanticCache, embed_goal, normalize_goal
+
+GROUP = "profile:" + "a" * 16
+
+
+def test_abbreviations_and_filler_are_normalized():
+    assert normalize_goal("I want to become an ML Engineer") == "machine learning engineer"
+    assert normalize_goal("AI/ML developer") == "machine learning developer"
+
+
+def test_near_duplicate_goal_hits_within_its_profile_group(tmp_path):
+    cache = SemanticCache(str(tmp_path / "goals"))
+    cache.add("Machine learning engineer", GROUP, "key-1")
+    match = cache.lookup("ML engineer", GROUP)
+    assert match is not None and match[0] == "key-1"
+    assert cache.lookup("ML engineer", "profile:" + "b" * 16) is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Software Engineer", "Software Engineer in Test"),
+    ("Junior web developer", "Senior web developer"),
+    ("Lead data analyst", "Data analyst"),
+])
+def test_goals_for_a_different_role_or_seniority_do_not_match(tmp_path, cached, asked):
+    cache = SemanticCache(str(tmp_path / "goals"))
+    cache.add(cached, GROUP, "key-1")
+    assert cache.lookup(asked, GROUP) is None
+    assert cache.lookup(cached, GROUP)[0] == "key-1"
+
+
+def test_default_threshold_rejects_the_near_misses_on_similarity_alone():
+    threshold = SemanticCache("unused").threshold
+    assert embed_goal("Software Engineer") @ embed_goal("Software Engineer in Test") < threshold
+    assert embed_goal("Junior web developer") @ embed_goal("Senior web developer") < threshold
+
+
+def test_index_is_mapped_back_after_a_restart(tmp_path):
+    prefix = str(tmp_path / "goals")
+    index = GoalIndex(prefix, initial_capacity=2)
+    for i, goal in enumerate(["data analyst", "ios developer", "game designer"]):
+        index.add(embed_goal(goal), f"key-{i}", 0, goal)
+    reopened = GoalIndex(prefix)
+    assert reopened.count == 3
+    assert reopened.query(embed_goal("game designer"), 0, 0.99)[0] == "key-2"
+    assert os.path.exists(prefix + ".npy")
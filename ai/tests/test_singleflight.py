@@ -0,0 +1,62 @@
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        flights = SingleFlight("test")
+        results = await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+        return flights, results
+
+    flights, results = asyncio.run(main())
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert flights.upstream_calls == 1 and flights.coalesced == 4
+    assert flights.stats()["in_flight"] == {}
+
+
+def test_cancelled_leader_does_not_cancel_the_other_waiters():
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        flights = SingleFlight("test")
+        leader = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, flights
+
+    result, flights = asyncio.run(main())
+    assert result == "value"
+    assert flights.abandoned == 0
+
+
+def test_upstream_is_cancelled_once_nobody_waits():
+    started = []
+
+    async def fetch():
+        started.append(1)
+        await asyncio.sleep(10)
+
+    async def main():
+        flights = SingleFlight("test")
+        waiter = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return flights
+
+    flights = asyncio.run(main())
+    assert flights.abandoned == 1
+    assert flights.stats()["in_flight"] == {}
@@ -0,0 +1,59 @@
+from sql_runner import FIXTURES, SQLRunner, has_top_level_order_by, hash_rows, split_statements
+
+
+def test_unordered_hash_ignores_row_order():
+    rows = [["1", "a"], ["2", "b"], ["3", "c"]]
+    shuffled = [rows[2], rows[0], rows[1]]
+    assert hash_rows(rows, ordered=False) == hash_rows(shuffled, ordered=False)
+    assert hash_rows(rows, ordered=True) != hash_rows(shuffled, ordered=True)
+    # Padding around cells, as in hand-written expected output, does not matter
+    assert hash_rows([[" 1 ", "a"]], ordered=True) == hash_rows([["1", "a"]], ordered=True)
+
+
+def test_only_a_top_level_order_by_orders_the_result():
+    assert has_top_level_order_by("SELECT * FROM t ORDER BY a")
+    assert has_top_level_order_by("SELECT a FROM t UNION SELECT b FROM u ORDER BY 1")
+    assert not has_top_level_order_by("SELECT a, row_number() OVER (ORDER BY b) FROM t")
+    assert not has_top_level_order_by("SELECT * FROM (SELECT * FROM t ORDER BY a) x")
+    assert not has_top_level_order_by("SELECT 'order by' FROM t -- order by a")
+
+
+def test_statements_split_on_semicolons_outside_strings():
+    assert split_statements("SELECT 'a;b'; SELECT 2") == ["SELECT 'a;b';", "SELECT 2;"]
+
+
+def test_runs_get_private_copies_of_the_fixture():
+    runner = SQLRunner(FIXTURES)
+    runner.run("DELETE FROM employees;", fixture="company")
+    result = runner.run("SELECT COUNT(*) FROM employees;", fixture="company")
+    assert result["error"] is None
+    assert result["output"].splitlines()[3] == "12"
+
+
+def test_result_reports_hashes_and_order():
+    runner = SQLRunner(FIXTURES)
+    result = runner.run("SELECT name FROM departments ORDER BY name;", fixture="company")["result"]
+    assert result["ordered"] is True
+    assert set(result["hashes"]) == {"ordered", "unordered"}
+
+
+def test_attach_is_rejected_and_creates_no_file(tmp_path):
+    target = tmp_path / "outside.db"
+    runner = SQLRunner(FIXTURES)
+    result = runner.run(f"ATTACH DATABASE '{target}' AS outside; CREATE TABLE outside.t (a);")
+    assert "not authorized" in result["output"]
+    assert not target.exists()
+
+
+def test_vacuum_into_is_rejected(tmp_path):
+    target = tmp_path / "copy.db"
+    result = SQLRunner(FIXTURES).run(f"VACUUM INTO '{target}';", fixture="company")
+    assert "authorization denied" in result["output"]
+    assert not target.exists()
+
+
+def test_only_introspection_pragmas_and_safe_functions_are_allowed():
+    runner = SQLRunner(FIXTURES)
+    assert "not authorized" not in runner.run("PRAGMA table_info(employees);", fixture="company")["output"]
+    assert "not authorized" in runner.run("PRAGMA journal_mode = OFF;")["output"]
+    assert "not authorized" in runner.run("SELECT load_extension('x');")["output"]
@@ -11,6 +11,11 @@ dotenv.config();
 const app = express();
 const PORT = process.env.PORT || 5000;
 const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'http://localhost:8001';
+// Upper bound for a synchronous AI call; long generations should go through the /api/jobs routes instead.
+// By default it outlasts the AI service's worst case (Gemini quota queue wait + one generation, same
+// settings as ai/main.py) plus a margin, so callers get the service's fallback or 429 rather than a gateway timeout.
+const AI_SERVICE_BUDGET_MS = (parseFloat(process.env.LLM_QUEUE_MAX_WAIT || '30') + parseFloat(process.env.LLM_TIMEOUT_SECONDS || '60')) * 1000;
+const AI_REQUEST_TIMEOUT_MS = parseInt(process.env.AI_REQUEST_TIMEOUT_MS || String(AI_SERVICE_BUDGET_MS + 10000), 10);
 const DATA_FILE = path.join(__dirname, 'data', 'users.json');
 
 app.use(cors());
@@ -113,7 +118,7 @@ app.post('/api/user/profile', (req, res) => {
 });
 
 app.post('/api/user/save-path', (req, res) => {
-    const { username, path } = req.body;
+    const { username, path, outline } = req.body;
     const users = loadUsers();
     if (!users[username]) return res.status(404).json({ message: "User not found" });
 
@@ -123,6 +128,8 @@ app.post('/api/user/save-path', (req, res) => {
     users[username].learning_paths.push({
         id: Date.now(),
         content: path,
+        // Phases and milestones parsed by the AI service; views read these instead of re-parsing the markdown
+        outline: outline || null,
         created_at: new Date().toISOString()
     });
     saveUsers(users);
@@ -218,32 +225,72 @@ app.post('/api/user/complete-task', (req, res) => {
     res.json({ success: true, user: users[username] });
 });
 
+// The AI service schedules executions fairly per user and keys them on this header alone. There are no
+// server-side sessions, so the key is the browser's address; a user id from the request body could be anything
+const clientHeaders = (req) => ({ 'X-Execution-User': `ip:${req.ip}` });
+
 app.post('/api/run-code', async (req, res) => {
     try {
-        const response = await axios.post(`${AI_SERVICE_URL}/run-code`, req.body);
+        const response = await axios.post(`${AI_SERVICE_URL}/run-code`, req.body, { headers: clientHeaders(req) });
         res.json(response.data);
     } catch (error) {
+        if (error.response?.status === 429) {
+            res.set('Retry-After', error.response.headers['retry-after'] || '5');
+            return res.status(429).json(error.response.data);
+        }
         console.error("Exec Error:", error.response?.data || error.message);
         res.status(500).json({ success: false, error: "Execution server failed" });
     }
 });
 
+// Program output as Server-Sent Events while it runs; closing the connection stops the program
+app.post('/api/run-code/stream', async (req, res) => {
+    try {
+        const response = await axios.post(`${AI_SERVICE_URL}/run-code/stream`, req.body, {
+            responseType: 'stream',
+            headers: clientHeaders(req)
+        });
+        res.setHeader('Content-Type', 'text/event-stream');
+        res.setHeader('Cache-Control', 'no-cache');
+        res.setHeader('X-Accel-Buffering', 'no');
+        res.flushHeaders();
+        response.data.pipe(res);
+        res.on('close', () => response.data.destroy());
+    } catch (error) {
+        console.error("Exec Stream Error:", error.message);
+        res.status(500).json({ success: false, error: "Execution server failed" });
+    }
+});
+
 app.post('/api/evaluate-code', async (req, res) => {
     try {
-        const response = await axios.post(`${AI_SERVICE_URL}/evaluate-code`, req.body);
+        const response = await axios.post(`${AI_SERVICE_URL}/evaluate-code`, req.body, { headers: clientHeaders(req) });
         res.json(response.data);
     } catch (error) {
+        if (error.response?.status === 429) {
+            res.set('Retry-After', error.response.headers['retry-after'] || '5');
+            return res.status(429).json(error.response.data);
+        }
         console.error("Eval Error:", error.response?.data || error.message);
         res.status(500).json({ success: false, error: "Evaluation server failed" });
     }
 });
 
 // --- AI Proxy Routes ---
+// The AI service answers 429 + Retry-After only when its Gemini quota queue is full; pass that through
+const forwardQuotaError = (error, res) => {
+    if (error.response?.status !== 429) return false;
+    res.set('Retry-After', error.response.headers['retry-after'] || '5');
+    res.status(429).json({ success: false, error: "AI service is busy, please retry shortly" });
+    return true;
+};
+
 app.post('/api/generate-path', async (req, res) => {
     try {
-        const response = await axios.post(`${AI_SERVICE_URL}/generate-path`, req.body);
+        const response = await axios.post(`${AI_SERVICE_URL}/generate-path`, req.body, { timeout: AI_REQUEST_TIMEOUT_MS });
         res.json(response.data);
     } catch (error) {
+        if (forwardQuotaError(error, res)) return;
         console.error("AI Service Error:", error.response?.data || error.message);
         res.status(500).json({
             message: "AI Service connection failed",
@@ -253,11 +300,35 @@ app.post('/api/generate-path', async (req, res) => {
     }
 });
 
+// Streams the learning path as Server-Sent Events straight through from the AI service
+app.post('/api/generate-path/stream', async (req, res) => {
+    try {
+        const response = await axios.post(`${AI_SERVICE_URL}/generate-path/stream`, req.body, {
+            responseType: 'stream'
+        });
+        res.setHeader('Content-Type', 'text/event-stream');
+        res.setHeader('Cache-Control', 'no-cache');
+        res.setHeader('X-Accel-Buffering', 'no');
+        res.flushHeaders();
+        response.data.pipe(res);
+        // Stop pulling from the AI service if the browser goes away mid-stream
+        res.on('close', () => response.data.destroy());
+    } catch (error) {
+        if (forwardQuotaError(error, res)) return;
+        console.error("AI Service Stream Error:", error.message);
+        res.status(500).json({
+            message: "AI Service connection failed",
+            error: error.message
+        });
+    }
+});
+
 app.post('/api/generate-tasks', async (req, res) => {
     try {
-        const response = await axios.post(`${AI_SERVICE_URL}/generate-tasks`, req.body);
+        const response = await axios.post(`${AI_SERVICE_URL}/generate-tasks`, req.body, { timeout: AI_REQUEST_TIMEOUT_MS });
         res.json(response.data);
     } catch (error) {
+        if (forwardQuotaError(error, res)) return;
         console.error("AI Service Task Error:", error.response?.data || error.message);
         res.status(500).json({
             message: "AI Service connection failed",
@@ -268,9 +339,10 @@ app.post('/api/generate-tasks', async (req, res) => {
 
 app.post('/api/generate-resume', async (req, res) => {
     try {
-        const response = await axios.post(`${AI_SERVICE_URL}/generate-resume`, req.body);
+        const response = await axios.post(`${AI_SERVICE_URL}/generate-resume`, req.body, { timeout: AI_REQUEST_TIMEOUT_MS });
         res.json(response.data);
     } catch (error) {
+        if (forwardQuotaError(error, res)) return;
         console.error("AI Service Resume Error:", error.response?.data || error.message);
         res.status(500).json({
             message: "AI Service connection failed",
@@ -279,6 +351,62 @@ app.post('/api/generate-resume', async (req, res) => {
     }
 });
 
+// --- Async job routes ---
+// Submitting returns 202 with a job id right away; poll /api/jobs/:id or subscribe to /api/jobs/:id/events
+const submitJob = (kind) => async (req, res) => {
+    try {
+        const response = await axios.post(`${AI_SERVICE_URL}/jobs/${kind}`, req.body, { timeout: 10000 });
+        res.status(202).json({
+            ...response.data,
+            status_url: `/api/jobs/${response.data.job_id}`,
+            events_url: `/api/jobs/${response.data.job_id}/events`
+        });
+    } catch (error) {
+        if (forwardQuotaError(error, res)) return;
+        console.error("AI Service Job Error:", error.response?.data || error.message);
+        res.status(500).json({
+            message: "AI Service connection failed",
+            error: error.response?.data || error.message
+        });
+    }
+};
+
+app.post('/api/jobs/generate-path', submitJob('generate-path'));
+app.post('/api/jobs/generate-resume', submitJob('generate-resume'));
+
+app.get('/api/jobs/:id', async (req, res) => {
+    try {
+        const response = await axios.get(`${AI_SERVICE_URL}/jobs/${encodeURIComponent(req.params.id)}`, { timeout: 10000 });
+        res.json(response.data);
+    } catch (error) {
+        if (error.response?.status === 404) {
+            return res.status(404).json({ success: false, error: "Job not found or expired" });
+        }
+        console.error("AI Service Job Error:", error.message);
+        res.status(500).json({ message: "AI Service connection failed", error: error.message });
+    }
+});
+
+app.get('/api/jobs/:id/events', async (req, res) => {
+    try {
+        const response = await axios.get(`${AI_SERVICE_URL}/jobs/${encodeURIComponent(req.params.id)}/events`, {
+            responseType: 'stream'
+        });
+        res.setHeader('Content-Type', 'text/event-stream');
+        res.setHeader('Cache-Control', 'no-cache');
+        res.setHeader('X-Accel-Buffering', 'no');
+        res.flushHeaders();
+        response.data.pipe(res);
+        res.on('close', () => response.data.destroy());
+    } catch (error) {
+        if (error.response?.status === 404) {
+            return res.status(404).json({ success: false, error: "Job not found or expired" });
+        }
+        console.error("AI Service Job Stream Error:", error.message);
+        res.status(500).json({ message: "AI Service connection failed", error: error.message });
+    }
+});
+
 const http = require('http');
 const { WebSocketServer } = require('ws');
 const pty = require('node-pty');
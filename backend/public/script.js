@@ -415,11 +415,18 @@ function restorePath() {
             document.getElementById('path-text').innerHTML = marked.parse(lastPath.content);
             const goal = currentUser.profile.learning_goals[0] || "Learning Path";
             // Flowchart might need goal context, using last goal or default
-            document.getElementById('flowchart-img').src = `http://localhost:8001/generate-flowchart?goal=${encodeURIComponent(goal)}&t=${Date.now()}`;
+            document.getElementById('flowchart-img').src = flowchartUrl(goal, lastPath.outline);
         }
     }
 }
 
+// The flowchart draws the path's phases from its outline (parsed by the AI service); older saved paths have none
+function flowchartUrl(goal, outline) {
+    const params = new URLSearchParams({ goal });
+    for (const step of outline?.steps || []) params.append('steps', step);
+    return `http://localhost:8001/generate-flowchart?${params}`;
+}
+
 function updateProfileUI() {
     document.getElementById('prof-user').innerText = currentUser.username;
     document.getElementById('prof-email').innerText = currentUser.email || 'not_provided@example.com';
@@ -439,7 +446,7 @@ async function generatePath() {
     btn.disabled = true;
 
     try {
-        const res = await fetch(`${API_BASE}/generate-path`, {
+        const res = await fetch(`${API_BASE}/generate-path/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -448,21 +455,22 @@ async function generatePath() {
                 use_previous_skills: usePrev
             })
         });
-        const data = await res.json();
 
-        if (!res.ok) {
+        if (!res.ok || !res.body) {
+            const data = await res.json().catch(() => ({}));
             throw new Error(data.message || data.error || data.detail || "Server Error");
         }
 
         document.getElementById('path-result').style.display = 'block';
 
-        // Typing effect for the path
-        typeMarkedContent('path-text', data.path);
+        // Render the path as it streams in
+        let outline = null;
+        const pathText = await streamMarkedContent('path-text', res, done => { outline = done.outline || null; });
 
         // Also display in terminal if connected
         if (xterm && terminalSocket && terminalSocket.readyState === WebSocket.OPEN) {
             xterm.write('\r\n\x1b[36m[ AI: Generating Learning Path... ]\x1b[0m\r\n');
-            const cleanText = data.path.replace(/\n/g, '\r\n');
+            const cleanText = pathText.replace(/\n/g, '\r\n');
             // Write to terminal with a slight delay imitation if desired, or just dump it
             xterm.write(cleanText + '\r\n');
         }
@@ -471,15 +479,15 @@ async function generatePath() {
         await fetch(`${API_BASE}/user/save-path`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ username: currentUser.username, path: data.path })
+            body: JSON.stringify({ username: currentUser.username, path: pathText, outline })
         });
         // Update local user
         if (!currentUser.learning_paths) currentUser.learning_paths = [];
-        currentUser.learning_paths.push({ content: data.path, created_at: new Date().toISOString() });
+        currentUser.learning_paths.push({ content: pathText, outline, created_at: new Date().toISOString() });
         localStorage.setItem('bugbuster_user', JSON.stringify(currentUser));
 
         // Load Flowchart directly from AI service
-        document.getElementById('flowchart-img').src = `http://localhost:8001/generate-flowchart?goal=${encodeURIComponent(goal)}&t=${Date.now()}`;
+        document.getElementById('flowchart-img').src = flowchartUrl(goal, outline);
 
         btn.innerHTML = originalContent;
         btn.disabled = false;
@@ -655,31 +663,66 @@ function buildPremiumResume(data) {
     `;
 }
 
-function typeMarkedContent(elementId, fullText) {
+// Reads a Server-Sent Events response from /generate-path/stream into the element.
+// Re-renders at most once per animation frame and resolves with the full markdown.
+// Sections generated in parallel can arrive out of order; they are slotted in by index.
+async function streamMarkedContent(elementId, response, onDone) {
     const element = document.getElementById(elementId);
-    if (!element) return;
-    element.innerHTML = '';
-    let currentText = '';
-    let index = 0;
-    const speed = 2; // Fast typing speed
-
-    function type() {
-        if (index < fullText.length) {
-            currentText += fullText[index];
-            element.innerHTML = marked.parse(currentText);
-            index++;
-
-            // Auto-scroll to bottom of the content
-            const container = element.parentElement;
-            if (container) container.scrollTop = container.scrollHeight;
-
-            setTimeout(type, speed);
-        } else {
-            element.innerHTML = marked.parse(fullText);
-            if (window.lucide) window.lucide.createIcons();
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let fullText = '';
+    let sections = [];
+    let renderQueued = false;
+
+    const render = () => {
+        renderQueued = false;
+        if (!element) return;
+        element.innerHTML = marked.parse(fullText);
+        const container = element.parentElement;
+        if (container) container.scrollTop = container.scrollHeight;
+    };
+
+    if (element) element.innerHTML = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = 'message';
+            let payload = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) payload += line.slice(5).trim();
+            }
+
+            if (eventName === 'chunk') {
+                fullText += JSON.parse(payload).text;
+            } else if (eventName === 'section') {
+                const section = JSON.parse(payload);
+                sections[section.index] = section.text;
+                fullText = sections.filter(Boolean).join('');
+            } else if (eventName === 'reset') {
+                fullText = '';
+                sections = [];
+            } else if (eventName === 'done' && onDone) {
+                onDone(JSON.parse(payload));
+            }
+            if (!renderQueued) {
+                renderQueued = true;
+                requestAnimationFrame(render);
+            }
         }
     }
-    type();
+
+    render();
+    if (window.lucide) window.lucide.createIcons();
+    return fullText;
 }
 
 
@@ -968,6 +1011,7 @@ async function submitTask() {
                 if (data.results && data.results.length > 0) {
                     let breakdown = '<div style="font-size: 0.8rem; margin-top: 5px; color: #94a3b8;">' +
                         data.results.map(r => `Test ${r.test_id}: Passed`).join(' | ') +
+                        (formatUsage(data.usage) ? ` · ⏱ ${formatUsage(data.usage)}` : '') +
                         '</div>';
                     resultDiv.innerHTML += breakdown;
                 }
@@ -998,6 +1042,9 @@ async function submitTask() {
                 list += '</ul>';
                 resultDiv.innerHTML += list;
             }
+            if (data.cached) {
+                resultDiv.innerHTML += '<div style="font-size: 0.75rem; margin-top: 4px; color: #94a3b8;">♻️ Cached result: this code was already evaluated against these tests</div>';
+            }
         } else {
             resultDiv.innerText = `Evaluation Error: ${data.error}`;
             resultDiv.style.color = "#ef4444";
@@ -1009,6 +1056,17 @@ async function submitTask() {
     }
 }
 
+// "Ran in 12 ms / 3.1 MB" from the usage the AI service reports with each execution
+function formatUsage(usage) {
+    if (!usage) return '';
+    const ms = usage.run_ms !== undefined ? usage.run_ms : usage.wall_ms;
+    if (ms === undefined) return '';
+    let text = `Ran in ${ms} ms`;
+    if (usage.peak_rss_kb) text += ` / ${(usage.peak_rss_kb / 1024).toFixed(1)} MB`;
+    if (usage.compile_ms >= 1) text += ` (compiled in ${usage.compile_ms} ms)`;
+    return text;
+}
+
 async function runCode() {
     const code = codeEditor.getValue();
     const lang = document.getElementById('language-select').value;
@@ -1048,7 +1106,8 @@ async function runCode() {
         const data = await res.json();
 
         if (data.success) {
-            resultDiv.innerText = `> Output:\n${data.output}`;
+            const usage = formatUsage(data.usage);
+            resultDiv.innerText = `> Output:\n${data.output}` + (usage ? `\n\n⏱ ${usage}` : '');
             resultDiv.style.display = 'block';
             resultDiv.style.color = "#93c5fd"; // light blue
             resultDiv.style.whiteSpace = "pre-wrap";